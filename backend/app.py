@@ -6,16 +6,27 @@ shared state in ``state``, configuration in ``config``, and reusable helpers in
 ``helpers`` / ``validators``.
 """
 
+import logging
+
 from flask import Flask
 from flask_cors import CORS
 
-from config import MAX_CONTENT_LENGTH, FLASK_HOST, FLASK_PORT, FLASK_DEBUG, CORS_ORIGINS
+from config import (
+    MAX_CONTENT_LENGTH, FLASK_HOST, FLASK_PORT, FLASK_DEBUG, CORS_ORIGINS, LOG_LEVEL,
+)
+from json_provider import OrjsonProvider
 from middleware import register_security
 from routes import all_blueprints
 
+# One stderr handler for every module logger; routine progress is INFO
+logging.basicConfig(
+    level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+
 # ── Application factory ───────────────────────────────────────────
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app, origins=CORS_ORIGINS.split(","))
 
 # Security: cap upload size (was previously unlimited)
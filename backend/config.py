@@ -11,15 +11,34 @@ import os
 # ── Flask ──────────────────────────────────────────────────────────
 FLASK_HOST = os.environ.get("FLASK_HOST", "0.0.0.0")
 FLASK_PORT = int(os.environ.get("FLASK_PORT", "5000"))
-FLASK_DEBUG = os.environ.get("FLASK_DEBUG", "true").lower() in ("1", "true", "yes")
+# Debug (reloader-free Werkzeug debugger) is opt-in: FLASK_DEBUG=1
+FLASK_DEBUG = os.environ.get("FLASK_DEBUG", "false").lower() in ("1", "true", "yes")
+# Level of the stderr log handler; INFO shows upload/parse progress
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "WARNING").upper()
 
 # ── Upload limits ──────────────────────────────────────────────────
 MAX_UPLOAD_SIZE_MB = int(os.environ.get("MAX_UPLOAD_SIZE_MB", "500"))
 MAX_CONTENT_LENGTH = MAX_UPLOAD_SIZE_MB * 1024 * 1024  # bytes
+# Worker processes used to parse large WSDL uploads (1 = parse in-process)
+UPLOAD_PARSE_WORKERS = int(os.environ.get("UPLOAD_PARSE_WORKERS", os.cpu_count() or 1))
 
 # ── Ollama / LLM ──────────────────────────────────────────────────
 OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.2:3b")
+# Concurrent requests the Ollama server is configured to run (its own
+# OLLAMA_NUM_PARALLEL); used as the default LLM annotation worker count.
+OLLAMA_NUM_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+# How long Ollama keeps the model loaded between requests ("30m", "-1", ...)
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+# Optional on-disk cache of Ollama responses (re-runs skip identical
+# prompts).  Off unless set; one small file per distinct prompt, never
+# evicted, so point it at a directory you clear between datasets.
+OLLAMA_CACHE_DIR = os.environ.get("OLLAMA_CACHE_DIR") or None
+
+# Optional on-disk cache of parsed WSDL fields (inputs, outputs, QoS),
+# keyed by content hash, so re-uploads of the same file skip parsing.
+# Off unless set; entries are small but never evicted.
+WSDL_CACHE_DIR = os.environ.get("WSDL_CACHE_DIR") or None
 
 # ── Interaction history persistence ───────────────────────────────
 INTERACTION_HISTORY_FILE = os.path.join(
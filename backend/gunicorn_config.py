@@ -1,16 +1,26 @@
 """
 Gunicorn configuration for massive uploads
+
+    gunicorn -c gunicorn_config.py wsgi:app
+
+Services, annotations and composers live in the process-local ``app_state``,
+so the server runs a single worker process and gets its concurrency from
+threads: a long /api/compose/* or /api/annotate/start call no longer blocks
+other requests, and every request sees the same state.  CPU-heavy WSDL
+parsing already fans out to its own process pool (UPLOAD_PARSE_WORKERS).
 """
 
 import multiprocessing
+import os
 
 # Server socket
 bind = "0.0.0.0:5000"
 backlog = 2048
 
-# Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+# Worker processes — keep at 1 while app_state is held in memory
+workers = int(os.environ.get("GUNICORN_WORKERS", "1"))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", multiprocessing.cpu_count() * 4))
 worker_connections = 1000
 timeout = 0  # Infinite timeout for large uploads
 keepalive = 5
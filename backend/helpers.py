@@ -5,224 +5,401 @@ Extracted here to avoid duplication (DRY principle) and keep route
 files focused on request handling.
 """
 
-import os
-import tempfile
+import io
+import json
+import logging
+import multiprocessing
 import threading
-import traceback
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, partial
+from itertools import repeat
+
+from lxml import etree
+
+from config import UPLOAD_PARSE_WORKERS
+from services.wsdl_parser import parse_wsdl_content
+
+_log = logging.getLogger(__name__)
+
+# orjson (optional) builds large response bodies several times faster
+# than the stdlib encoder used by jsonify.
+try:
+    import orjson
+
+    def json_bytes(obj):
+        return orjson.dumps(obj)
+except ImportError:  # pragma: no cover - stdlib fallback
+    def json_bytes(obj):
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def service_json(service):
+    """``json_bytes(service.to_dict())``, memoised per QoS/annotations object.
+
+    Annotation progress bumps the list version once per service; re-encoding
+    only the services whose annotations changed keeps each rebuild of the
+    GET /api/services body down to a join.
+    """
+    qos, annotations = service.qos, service.annotations
+    cached = service._json_cache
+    if cached is None or cached[0] is not qos or cached[1] is not annotations:
+        cached = service._json_cache = (qos, annotations, json_bytes(service.to_dict()))
+    return cached[2]
+
+
+def read_upload(file_obj):
+    """Return an uploaded file's bytes and release Werkzeug's copy.
+
+    Small uploads are spooled in memory, so until the request ends each
+    file would otherwise be held twice: once in its spool and once as the
+    bytes handed to the parser.
+    """
+    try:
+        return file_obj.read()
+    finally:
+        file_obj.close()
 
 
 def parse_xml_upload(file_obj, parser_fn):
-    """Write an uploaded file to a temp file, parse it, and clean up.
+    """Parse an uploaded file straight from its stream.
+
+    Werkzeug already holds the upload in memory or in its own spooled temp
+    file, so it is handed to the parser as a file object: no extra copy on
+    disk, no fsync, and nothing shared between concurrent uploads.
 
     Args:
         file_obj:   Werkzeug FileStorage from ``request.files``
-        parser_fn:  callable(filepath) -> parsed result
+        parser_fn:  callable(path_or_file) -> parsed result
 
     Returns:
-        The result of ``parser_fn(filepath)``.
+        The result of ``parser_fn(file_obj.stream)``.
     """
-    with tempfile.NamedTemporaryFile(mode="wb", suffix=".xml", delete=False) as tmp:
-        content = file_obj.read()
-        tmp.write(content)
-        tmp.flush()
-        os.fsync(tmp.fileno())
-        tmp_path = tmp.name
+    _log.info("Parsing upload: %s", file_obj.filename)
+    return parser_fn(file_obj.stream)
 
-    try:
-        print(f"Parsing from temp file: {tmp_path} ({os.path.getsize(tmp_path)} bytes)")
-        return parser_fn(tmp_path)
-    finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
 
+_WSDL_NS = "http://schemas.xmlsoap.org/wsdl/"
+_SOCIAL_NS = "http://social-ws/annotations"
+_XSD_NS = "http://www.w3.org/2001/XMLSchema"
+_S = "{%s}" % _SOCIAL_NS
+
+# Clark-notation names and nsmaps for the fallback description, built once
+_WSDL_DEFINITIONS = "{%s}definitions" % _WSDL_NS
+_WSDL_TYPES = "{%s}types" % _WSDL_NS
+_XSD_SCHEMA = "{%s}schema" % _XSD_NS
+_XSD_ELEMENT = "{%s}element" % _XSD_NS
+_FALLBACK_NSMAP = {None: _WSDL_NS, "social": _SOCIAL_NS}
+_XSD_NSMAP = {"xsd": _XSD_NS}
+
+# ``social:`` Clark names by local tag.  The extension uses a fixed set of
+# tags plus the QoS keys, so each name is built once rather than per element.
+_S_TAGS = {}
+
+# Fixed names of one <social:Association>, which repeats per association
+_ASSOCIATION_TAGS = tuple(
+    _S + tag for tag in ("Association", "sourceNode", "targetNode", "type", "weight")
+)
+
+
+def _dict_items(obj):
+    return obj.to_dict().items()
+
+
+def _vars_items(obj):
+    return vars(obj).items()
 
-def generate_enriched_wsdl(service):
-    """Generate an enriched WSDL/XML with social annotations."""
 
-    # Start with original WSDL if available
+@lru_cache(maxsize=None)
+def _items_getter(cls):
+    """Pick, once per class, how ``(tag, value)`` pairs are read from it."""
+    if callable(getattr(cls, "to_xml_items", None)):
+        return cls.to_xml_items
+    if callable(getattr(cls, "to_dict", None)):
+        return _dict_items
+    if issubclass(cls, dict):
+        return dict.items
+    return _vars_items
+
+
+def _qos_texts(service):
+    """``(tag, "%.2f" text)`` pairs for *service*'s QoS, memoised per QoS object.
+
+    QoS objects are replaced rather than edited, so repeat downloads of a
+    service reuse the formatted values until it gets a new QoS.  Plain dicts
+    can be edited in place and are formatted every time.
+    """
+    qos = service.qos
+    cached = service._qos_texts_cache
+    if cached is not None and cached[0] is qos:
+        return cached[1]
+    texts = tuple((key, f"{value:.2f}") for key, value in _items_getter(type(qos))(qos))
+    if not isinstance(qos, dict):
+        service._qos_texts_cache = (qos, texts)
+    return texts
+
+
+def _fields(obj):
+    """Return a ``get(name, default)`` reader for a model object or a plain dict.
+
+    The type check is made once per annotation block, not once per field.
+    """
+    if isinstance(obj, dict):
+        return obj.get
+    return partial(getattr, obj)
+
+
+def _sub(parent, tag, text=None, **attrib):
+    """Append a ``social:<tag>`` child and set its text."""
+    # lxml copies an attrib mapping even when empty; most elements have none
+    name = _S_TAGS.get(tag)
+    if name is None:
+        name = _S_TAGS[tag] = _S + tag
+    el = etree.SubElement(parent, name, attrib) if attrib else etree.SubElement(parent, name)
+    if text is not None:
+        el.text = str(text)
+    return el
+
+
+def _enriched_root(service):
+    """Return the ``<definitions>`` root the social extension is added to.
+
+    The original WSDL is reused when it parses; otherwise a minimal
+    description is built from the service inputs and outputs.  Either way
+    the root declares the ``social`` prefix so it is not repeated on every
+    extension element.
+    """
     if service.wsdl_content:
-        original_lines = service.wsdl_content.split("\n")
-        definitions_closing_index = -1
-        for i in range(len(original_lines) - 1, -1, -1):
-            if "</definitions>" in original_lines[i]:
-                definitions_closing_index = i
-                break
-
-        if definitions_closing_index > 0:
-            xml_lines = original_lines[:definitions_closing_index]
-            xml_lines.append("")
-            xml_lines.append(
-                "  <!-- ========== Social Annotations Extension ========== -->"
-            )
-        else:
-            xml_lines = ['<?xml version="1.0" encoding="UTF-8"?>']
-            xml_lines.append(f'<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"')
-            xml_lines.append(
-                '             xmlns:social="http://social-ws/annotations"'
-            )
-            xml_lines.append(f'             name="{service.id}">')
-    else:
-        xml_lines = ['<?xml version="1.0" encoding="UTF-8"?>']
-        xml_lines.append(f'<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"')
-        xml_lines.append('             xmlns:social="http://social-ws/annotations"')
-        xml_lines.append(f'             name="{service.id}">')
-        xml_lines.append("")
-        xml_lines.append(
-            "  <!-- ========== Basic Service Description ========== -->"
-        )
-        xml_lines.append("  <types>")
-        xml_lines.append(
-            '    <xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema">'
-        )
-        for inp in service.inputs:
-            xml_lines.append(f'      <xsd:element name="{inp}" type="xsd:string"/>')
-        for out in service.outputs:
-            xml_lines.append(f'      <xsd:element name="{out}" type="xsd:string"/>')
-        xml_lines.append("    </xsd:schema>")
-        xml_lines.append("  </types>")
+        try:
+            parser = etree.XMLParser(remove_blank_text=True, resolve_entities=False)
+            original = etree.fromstring(service.wsdl_content.encode("utf-8"), parser)
+        except (etree.XMLSyntaxError, ValueError):
+            original = None
+        if original is not None and original.tag.rpartition("}")[2] == "definitions":
+            nsmap = dict(original.nsmap)
+            nsmap.setdefault("social", _SOCIAL_NS)
+            root = etree.Element(original.tag, original.attrib, nsmap=nsmap)
+            root.text = original.text
+            root.extend(original)
+            root.append(etree.Comment(" ========== Social Annotations Extension ========== "))
+            return root
+
+    root = etree.Element(_WSDL_DEFINITIONS, name=str(service.id), nsmap=_FALLBACK_NSMAP)
+    if service.wsdl_content:
+        return root
+    root.append(etree.Comment(" ========== Basic Service Description ========== "))
+    types = etree.SubElement(root, _WSDL_TYPES)
+    schema = etree.SubElement(types, _XSD_SCHEMA, nsmap=_XSD_NSMAP)
+    for name in list(service.inputs) + list(service.outputs):
+        etree.SubElement(schema, _XSD_ELEMENT, name=str(name), type="xsd:string")
+    return root
+
+
+# ── Parallel WSDL parsing ──────────────────────────────────────────
+
+# Below this many files, starting worker processes costs more than it saves
+PARALLEL_PARSE_MIN_FILES = 32
+
+# Upload filenames accepted as WSDL; others are skipped before being read
+WSDL_SUFFIXES = (".wsdl", ".xml")
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def _get_parse_pool():
+    """Create the WSDL parsing process pool on first use.
+
+    Workers come from a fork server where available: the app process runs
+    request and annotation threads, and forking it directly could copy a
+    lock held by one of them into the child.
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            ctx = None
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                ctx = multiprocessing.get_context("forkserver")
+            _parse_pool = ProcessPoolExecutor(max_workers=UPLOAD_PARSE_WORKERS, mp_context=ctx)
+        return _parse_pool
+
+
+def parse_wsdl_contents(items, parser):
+    """Parse ``(content, filename)`` pairs into services, preserving order.
+
+    *content* is text or raw UTF-8 bytes, as accepted by ``parse_content``.
+
+    Large batches are spread over a process pool (parsing is CPU-bound and
+    independent per file); small batches, or environments where worker
+    processes cannot start, use *parser* in-process.  As with
+    ``parser.parse_content``, failed files yield ``None``.
+    """
+    global _parse_pool
+    if UPLOAD_PARSE_WORKERS > 1 and len(items) >= PARALLEL_PARSE_MIN_FILES:
+        contents = [content for content, _ in items]
+        filenames = [filename for _, filename in items]
+        chunksize = max(1, len(items) // (UPLOAD_PARSE_WORKERS * 4))
+        try:
+            return list(_get_parse_pool().map(
+                parse_wsdl_content, contents, filenames,
+                repeat(parser.cache_dir), chunksize=chunksize,
+            ))
+        except (OSError, BrokenProcessPool) as e:
+            _log.warning("Parallel WSDL parsing unavailable (%s); parsing in-process", e)
+            with _parse_pool_lock:
+                _parse_pool = None
+    return [parser.parse_content(content, filename) for content, filename in items]
+
+
+def parse_wsdl_uploads(items, parser):
+    """Parse uploaded ``(raw bytes, filename)`` pairs into services, in order.
+
+    The bytes go to libxml2 as-is (UTF-8, with or without BOM) through
+    ``parse_wsdl_contents``, so large batches use the process pool; only a
+    file that is not valid UTF-8 is retried in-process as Latin-1 text.
+    Failed files yield ``None``.
+    """
+    services = parse_wsdl_contents(items, parser)
+    for i, service in enumerate(services):
+        if service is not None:
+            continue
+        raw, filename = items[i]
+        try:
+            raw.decode("utf-8")
+        except UnicodeDecodeError:
+            services[i] = parser.parse_content(raw.decode("latin-1"), filename)
+    return services
+
+
+def generate_enriched_wsdl(service):
+    """Generate an enriched WSDL/XML with social annotations.
+
+    Returns UTF-8 encoded bytes; all values are escaped by the serializer.
+    """
+    root = _enriched_root(service)
 
     # QoS extension
-    xml_lines.append("")
-    xml_lines.append("  <!-- ========== QoS Properties ========== -->")
-    xml_lines.append("  <social:QoS>")
-    qos_dict = (
-        service.qos.to_dict()
-        if hasattr(service.qos, "to_dict")
-        else (service.qos if isinstance(service.qos, dict) else vars(service.qos))
-    )
-    for key, value in qos_dict.items():
-        xml_lines.append(f"    <social:{key}>{value:.2f}</social:{key}>")
-    xml_lines.append("  </social:QoS>")
-    xml_lines.append("")
+    root.append(etree.Comment(" ========== QoS Properties ========== "))
+    qos_el = _sub(root, "QoS")
+    for key, text in _qos_texts(service):
+        _sub(qos_el, key, text)
 
     # Social annotations
-    if hasattr(service, "annotations") and service.annotations:
-        xml_lines.append("  <!-- ========== Social Annotations ========== -->")
-        annotations = service.annotations
+    annotations = getattr(service, "annotations", None)
+    if annotations:
+        root.append(etree.Comment(" ========== Social Annotations ========== "))
         social_node = annotations.social_node
 
-        xml_lines.append("  <social:SocialNode>")
-        xml_lines.append(f"    <social:nodeId>{social_node.node_id}</social:nodeId>")
-        xml_lines.append(
-            f"    <social:nodeType>{social_node.node_type}</social:nodeType>"
-        )
-        xml_lines.append(f"    <social:state>{social_node.state}</social:state>")
-        xml_lines.append("")
+        node_el = _sub(root, "SocialNode")
+        _sub(node_el, "nodeId", social_node.node_id)
+        _sub(node_el, "nodeType", social_node.node_type)
+        _sub(node_el, "state", social_node.state)
 
-        xml_lines.append("    <social:NodeProperties>")
-        xml_lines.append(
-            f"      <social:trustDegree>{social_node.trust_degree.value:.3f}"
-            f"</social:trustDegree>"
-        )
-        xml_lines.append(
-            f"      <social:reputation>{social_node.reputation.value:.3f}"
-            f"</social:reputation>"
-        )
-        xml_lines.append(
-            f"      <social:cooperativeness>{social_node.cooperativeness.value:.3f}"
-            f"</social:cooperativeness>"
-        )
+        props_el = _sub(node_el, "NodeProperties")
+        _sub(props_el, "trustDegree", f"{social_node.trust_degree.value:.3f}")
+        _sub(props_el, "reputation", f"{social_node.reputation.value:.3f}")
+        _sub(props_el, "cooperativeness", f"{social_node.cooperativeness.value:.3f}")
         for prop in social_node.properties:
-            xml_lines.append(
-                f'      <social:property name="{prop.prop_name}" '
-                f'value="{prop.value:.3f}"/>'
-            )
-        xml_lines.append("    </social:NodeProperties>")
-        xml_lines.append("")
+            _sub(props_el, "property", name=str(prop.prop_name), value=f"{prop.value:.3f}")
 
         if social_node.associations:
-            xml_lines.append("    <social:Associations>")
+            # One block per association: skip _sub and its tag lookup
+            assocs_el = _sub(node_el, "Associations")
+            sub_element = etree.SubElement
+            association, source, target, type_, weight = _ASSOCIATION_TAGS
             for assoc in social_node.associations:
-                xml_lines.append("      <social:Association>")
-                xml_lines.append(
-                    f"        <social:sourceNode>{assoc.source_node}</social:sourceNode>"
-                )
-                xml_lines.append(
-                    f"        <social:targetNode>{assoc.target_node}</social:targetNode>"
-                )
-                xml_lines.append(
-                    f"        <social:type>{assoc.association_type.type_name}</social:type>"
-                )
-                xml_lines.append(
-                    f"        <social:weight>{assoc.association_weight.value:.3f}"
-                    f"</social:weight>"
-                )
-                xml_lines.append("      </social:Association>")
-            xml_lines.append("    </social:Associations>")
-
-        xml_lines.append("  </social:SocialNode>")
-        xml_lines.append("")
+                assoc_el = sub_element(assocs_el, association)
+                sub_element(assoc_el, source).text = str(assoc.source_node)
+                sub_element(assoc_el, target).text = str(assoc.target_node)
+                sub_element(assoc_el, type_).text = str(assoc.association_type.type_name)
+                sub_element(assoc_el, weight).text = f"{assoc.association_weight.value:.3f}"
 
         # Interaction annotations
-        xml_lines.append("  <social:Interaction>")
-        inter = annotations.interaction
-        inter_dict = (
-            inter.to_dict()
-            if hasattr(inter, "to_dict")
-            else (inter if isinstance(inter, dict) else {"role": "worker"})
-        )
-        xml_lines.append(
-            f'    <social:role>{inter_dict.get("role", "worker")}</social:role>'
-        )
-        if inter_dict.get("collaboration_associations"):
-            xml_lines.append("    <social:collaborations>")
-            for svc_id in inter_dict["collaboration_associations"][:5]:
-                xml_lines.append(f"      <social:service>{svc_id}</social:service>")
-            xml_lines.append("    </social:collaborations>")
-        xml_lines.append("  </social:Interaction>")
-        xml_lines.append("")
+        inter = _fields(annotations.interaction)
+        inter_el = _sub(root, "Interaction")
+        _sub(inter_el, "role", inter("role", "worker"))
+        collaborations = inter("collaboration_associations", None)
+        if collaborations:
+            collab_el = _sub(inter_el, "collaborations")
+            for svc_id in collaborations[:5]:
+                _sub(collab_el, "service", svc_id)
 
         # Context annotations
-        xml_lines.append("  <social:Context>")
-        ctx = annotations.context
-        ctx_dict = (
-            ctx.to_dict()
-            if hasattr(ctx, "to_dict")
-            else (ctx if isinstance(ctx, dict) else {})
-        )
-        xml_lines.append(
-            f"    <social:contextAware>"
-            f'{str(ctx_dict.get("context_aware", False)).lower()}'
-            f"</social:contextAware>"
-        )
-        xml_lines.append(
-            f'    <social:timeCritical>{ctx_dict.get("time_critical", "low")}'
-            f"</social:timeCritical>"
-        )
-        xml_lines.append(
-            f'    <social:interactionCount>{ctx_dict.get("interaction_count", 0)}'
-            f"</social:interactionCount>"
-        )
-        xml_lines.append("  </social:Context>")
-        xml_lines.append("")
+        ctx = _fields(annotations.context)
+        ctx_el = _sub(root, "Context")
+        _sub(ctx_el, "contextAware", str(ctx("context_aware", False)).lower())
+        _sub(ctx_el, "timeCritical", ctx("time_critical", "low"))
+        _sub(ctx_el, "interactionCount", ctx("interaction_count", 0))
 
         # Policy annotations
-        xml_lines.append("  <social:Policy>")
-        pol = annotations.policy
-        pol_dict = (
-            pol.to_dict()
-            if hasattr(pol, "to_dict")
-            else (pol if isinstance(pol, dict) else {})
-        )
-        xml_lines.append(
-            f"    <social:gdprCompliant>"
-            f'{str(pol_dict.get("gdpr_compliant", True)).lower()}'
-            f"</social:gdprCompliant>"
-        )
-        xml_lines.append(
-            f'    <social:securityLevel>{pol_dict.get("security_level", "medium")}'
-            f"</social:securityLevel>"
-        )
-        xml_lines.append(
-            f"    <social:dataRetentionDays>"
-            f'{pol_dict.get("data_retention_days", 30)}'
-            f"</social:dataRetentionDays>"
-        )
-        xml_lines.append("  </social:Policy>")
+        pol = _fields(annotations.policy)
+        pol_el = _sub(root, "Policy")
+        _sub(pol_el, "gdprCompliant", str(pol("gdpr_compliant", True)).lower())
+        _sub(pol_el, "securityLevel", pol("security_level", "medium"))
+        _sub(pol_el, "dataRetentionDays", pol("data_retention_days", 30))
+
+    return etree.tostring(
+        root, pretty_print=True, xml_declaration=True, encoding="UTF-8"
+    )
 
-    xml_lines.append("")
-    xml_lines.append("</definitions>")
-    return "\n".join(xml_lines)
+
+class _ChunkWriter(io.RawIOBase):
+    """Write-only, unseekable sink that hands written bytes back in chunks.
+
+    ``zipfile`` falls back to data descriptors on unseekable output, so an
+    archive can be produced entry by entry without holding all of it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        """Return everything written since the last call as one chunk."""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_enriched_wsdl_zip(services):
+    """Yield a ZIP archive of ``<id>_enriched.xml`` files, one entry at a time.
+
+    Only the entry being compressed is held in memory, so download-all can
+    start sending before the last service is serialised.
+    """
+    sink = _ChunkWriter()
+    # Enriched WSDL is repetitive XML: the fastest deflate level already
+    # gets within ~5% of the default level's size in ~75% of the time
+    with zipfile.ZipFile(
+        sink, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=1,
+    ) as zf:
+        for svc in services:
+            zf.writestr(f"{svc.id}_enriched.xml", generate_enriched_wsdl(svc))
+            yield sink.drain()
+    yield sink.drain()  # central directory
+
+
+def _accumulate(t, r):
+    """Add one successful result to a method's running totals; return its utility."""
+    u = r["utility_value"]
+    t[0] += 1
+    t[1] += u
+    if t[2] is None or u > t[2]:
+        t[2] = u
+    if t[3] is None or u < t[3]:
+        t[3] = u
+    t[4] += r["computation_time"]
+    t[5] += len(r.get("services", ()))
+    t[6] += r.get("states_explored", 0)
+    return u
 
 
 def calculate_statistics(comparisons):
@@ -244,59 +421,43 @@ def calculate_statistics(comparisons):
         },
     }
 
-    classic_results = [
-        c["classic"] for c in comparisons
-        if c["classic"] and c["classic"].get("success")
-    ]
-    llm_results = [
-        c["llm"] for c in comparisons
-        if c["llm"] and c["llm"].get("success")
-    ]
+    # Single pass: running sums per method plus the head-to-head tally.
+    # Per method: [count, utility_sum, max, min, time_sum, services_sum, states_sum]
+    acc = {"classic": [0, 0, None, None, 0, 0, 0], "llm": [0, 0, None, None, 0, 0, 0]}
+    totals_c, totals_l = acc["classic"], acc["llm"]
+    head = stats["comparison"]
 
-    if classic_results:
-        utilities = [r["utility_value"] for r in classic_results]
-        n = len(classic_results)
-        stats["classic"]["success_rate"] = n / max(len(comparisons), 1) * 100
-        stats["classic"]["avg_utility"] = sum(utilities) / n
-        stats["classic"]["max_utility"] = max(utilities)
-        stats["classic"]["min_utility"] = min(utilities)
-        stats["classic"]["avg_time"] = sum(
-            r["computation_time"] for r in classic_results
-        ) / n
-        stats["classic"]["total_composed"] = n
-        stats["classic"]["avg_services_used"] = sum(
-            len(r.get("services", [])) for r in classic_results
-        ) / n
-        stats["classic"]["avg_states_explored"] = sum(
-            r.get("states_explored", 0) for r in classic_results
-        ) / n
-
-    if llm_results:
-        utilities = [r["utility_value"] for r in llm_results]
-        n = len(llm_results)
-        stats["llm"]["success_rate"] = n / max(len(comparisons), 1) * 100
-        stats["llm"]["avg_utility"] = sum(utilities) / n
-        stats["llm"]["max_utility"] = max(utilities)
-        stats["llm"]["min_utility"] = min(utilities)
-        stats["llm"]["avg_time"] = sum(
-            r["computation_time"] for r in llm_results
-        ) / n
-        stats["llm"]["total_composed"] = n
-        stats["llm"]["avg_services_used"] = sum(
-            len(r.get("services", [])) for r in llm_results
-        ) / n
-
-    # Head-to-head
     for comp in comparisons:
         c, l = comp["classic"], comp["llm"]
-        if c and l and c.get("success") and l.get("success"):
-            cu, lu = c["utility_value"], l["utility_value"]
+        c_ok = bool(c and c.get("success"))
+        l_ok = bool(l and l.get("success"))
+        if c_ok:
+            cu = _accumulate(totals_c, c)
+        if l_ok:
+            lu = _accumulate(totals_l, l)
+
+        # Head-to-head
+        if c_ok and l_ok:
             if cu > lu:
-                stats["comparison"]["classic_wins"] += 1
+                head["classic_wins"] += 1
             elif lu > cu:
-                stats["comparison"]["llm_wins"] += 1
+                head["llm_wins"] += 1
             else:
-                stats["comparison"]["ties"] += 1
+                head["ties"] += 1
+
+    for method, (n, utility_sum, u_max, u_min, time_sum, services_sum, states_sum) in acc.items():
+        if not n:
+            continue
+        m = stats[method]
+        m["success_rate"] = n / max(len(comparisons), 1) * 100
+        m["avg_utility"] = utility_sum / n
+        m["max_utility"] = u_max
+        m["min_utility"] = u_min
+        m["avg_time"] = time_sum / n
+        m["total_composed"] = n
+        m["avg_services_used"] = services_sum / n
+        if method == "classic":
+            m["avg_states_explored"] = states_sum / n
 
     if stats["classic"]["avg_utility"] > 0 and stats["llm"]["avg_utility"] > 0:
         stats["comparison"]["avg_utility_gap"] = (
@@ -347,13 +508,15 @@ def _single_request_metrics(composed_ids, best_ids, composed_utility, best_utili
         # No ground truth — cannot evaluate
         return None
 
+    # Everything follows from the three set sizes: no union set is built,
+    # and F1 = 2PR/(P+R) reduces to 2tp/(|composed|+|best|)
     tp = len(composed_ids & best_ids)
-    precision = tp / len(composed_ids) if composed_ids else 0.0
-    recall = tp / len(best_ids) if best_ids else 0.0
-    f1 = (2 * precision * recall / (precision + recall)) if (precision + recall) > 0 else 0.0
-    exact_match = 1.0 if composed_ids == best_ids else 0.0
-    union = composed_ids | best_ids
-    jaccard = tp / len(union) if union else 0.0
+    n_composed, n_best = len(composed_ids), len(best_ids)
+    precision = tp / n_composed
+    recall = tp / n_best
+    f1 = 2 * tp / (n_composed + n_best)
+    exact_match = 1.0 if tp == n_composed == n_best else 0.0
+    jaccard = tp / (n_composed + n_best - tp)
 
     if best_utility and best_utility > 0:
         utility_ratio = composed_utility / best_utility
@@ -724,9 +887,9 @@ def run_background_task(
                 state_dict["is_trained"] = True
                 if on_success:
                     on_success(state_dict)
-            print(f"[{name}] Background task complete")
+            _log.info("[%s] Background task complete", name)
         except Exception as exc:
-            traceback.print_exc()
+            _log.exception("[%s] Background task failed", name)
             with state_lock:
                 state_dict["is_training"] = False
                 if on_error:
@@ -0,0 +1,78 @@
+"""
+orjson-backed JSON provider for Flask.
+
+Every route returns ``jsonify(...)`` and reads ``request.json``; installing
+this provider on the app moves that encoding and decoding into orjson
+without touching the routes.  When orjson is not installed, or a payload
+holds something orjson refuses (e.g. integers wider than 64 bits),
+Flask's stdlib provider is used instead.
+
+One deliberate difference: non-finite floats (NaN, +/-inf) are written as
+``null``.  The stdlib would emit bare ``NaN``/``Infinity``, which is not
+JSON and makes the browser's ``JSON.parse`` reject the whole response.
+
+Model objects (services, requests, results, annotations) expose
+``to_dict()``; the provider calls it itself, so a route can hand them to
+``jsonify`` without building an intermediate list of dicts first.
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+    # Dates go through Flask's default hook so they keep the HTTP-date format.
+    _OPTS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_SERIALIZE_NUMPY
+        | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """``DefaultJSONProvider`` with orjson doing the encoding."""
+
+    @staticmethod
+    def default(o):
+        """Serialize model objects through ``to_dict()``, else Flask's hook."""
+        to_dict = getattr(o, "to_dict", None)
+        if to_dict is not None:
+            return to_dict()
+        return DefaultJSONProvider.default(o)
+
+    def _encode(self, obj, indent=False):
+        """Return *obj* as UTF-8 JSON bytes, or None if orjson cannot encode it."""
+        if orjson is None:
+            return None
+        option = _OPTS | orjson.OPT_INDENT_2 if indent else _OPTS
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:
+            data = self._encode(obj)
+            if data is not None:
+                return data.decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass  # let the stdlib accept or reject it
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        data = self._encode(obj, indent)
+        if data is None:
+            return super().response(obj)
+        return self._app.response_class(data + b"\n", mimetype=self.mimetype)
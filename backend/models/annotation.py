@@ -222,11 +222,15 @@ class ServiceAnnotation:
     Complete annotation of a service (based on MOF-based Social Web Services).
     Corresponds to the S-WSDL model from the paper.
     """
-    __slots__ = ('social_node', 'interaction', 'context', 'policy')
+    __slots__ = ('social_node', 'interaction', 'context', 'policy', 'history_stamp')
 
     def __init__(self, service_id=""):
         # Main social node
         self.social_node = SNNode(service_id)
+
+        # Interaction-history count the annotation was derived from; used to
+        # detect stale annotations (None = unknown, e.g. loaded from file)
+        self.history_stamp = None
         
         # Complementary annotations (model extension)
         self.interaction = InteractionAnnotation()
@@ -14,6 +14,17 @@ import threading
 from collections import defaultdict
 from datetime import datetime, timedelta
 
+# orjson (optional) serialises the history several times faster than the
+# stdlib; both produce the same indented JSON document.
+try:
+    import orjson
+
+    def _dump_bytes(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:  # pragma: no cover - stdlib fallback
+    def _dump_bytes(obj):
+        return json.dumps(obj, indent=2).encode("utf-8")
+
 
 _HISTORY_FILE = os.path.join(
     os.path.dirname(os.path.dirname(__file__)), "interaction_history.json"
@@ -88,6 +99,9 @@ class InteractionHistoryStore:
         self._path = path or _HISTORY_FILE
         self._lock = threading.Lock()
         self._records: list[InteractionRecord] = []
+        # to_dict() of _records[:len(...)]: records are append-only, so each
+        # save only converts the ones added since the previous save
+        self._record_dicts: list[dict] = []
         # Caches invalidated on each record()
         self._collaboration_cache: dict | None = None
         self._interaction_count_cache: dict | None = None
@@ -96,6 +110,7 @@ class InteractionHistoryStore:
         self._usage_pattern_cache: dict | None = None
         self._context_cache: dict | None = None
         self._avg_utility_cache: dict | None = None
+        self._summary_cache: dict | None = None
         self._load()
 
     # ------------------------------------------------------------------
@@ -111,9 +126,19 @@ class InteractionHistoryStore:
                 self._records = []
 
     def _save(self):
+        # Serialise in one shot and write a single buffer (json.dump issues
+        # one write per token); replace atomically so readers never see a
+        # half-written file.
         try:
-            with open(self._path, "w", encoding="utf-8") as f:
-                json.dump([r.to_dict() for r in self._records], f, indent=2)
+            dicts = self._record_dicts
+            if len(dicts) > len(self._records):  # cleared since the last save
+                dicts.clear()
+            dicts.extend(r.to_dict() for r in self._records[len(dicts):])
+            data = _dump_bytes(dicts)
+            tmp = f"{self._path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path)
         except Exception as exc:
             print(f"[InteractionHistoryStore] save error: {exc}")
 
@@ -204,6 +229,7 @@ class InteractionHistoryStore:
         self._usage_pattern_cache = None
         self._context_cache = None
         self._avg_utility_cache = None
+        self._summary_cache = None
 
     # ------------------------------------------------------------------
     # Query helpers (used by annotator)
@@ -422,12 +448,19 @@ class InteractionHistoryStore:
             self._save()
 
     def summary(self) -> dict:
-        """Quick summary for the /status API."""
-        unique_services = set(r.service_id for r in self._records)
-        unique_compositions = set(r.composition_id for r in self._records if r.composition_id)
-        return {
-            "total_records": len(self._records),
-            "unique_services": len(unique_services),
-            "unique_compositions": len(unique_compositions),
-            "has_history": self.has_history,
-        }
+        """Quick summary for the /status API.
+
+        Polled with every health check; the distinct-id counts are kept
+        until the next record() rather than rescanning the history.
+        """
+        if self._summary_cache is None:
+            records = self._records
+            self._summary_cache = {
+                "total_records": len(records),
+                "unique_services": len({r.service_id for r in records}),
+                "unique_compositions": len(
+                    {r.composition_id for r in records if r.composition_id}
+                ),
+                "has_history": bool(records),
+            }
+        return self._summary_cache
@@ -3,6 +3,10 @@ Data models for web services.
 """
 
 class QoS:
+    __slots__ = ('response_time', 'availability', 'throughput', 'successability',
+                 'reliability', 'compliance', 'best_practices', 'latency',
+                 'documentation')
+
     def __init__(self, data=None, **kwargs):
         """
         Initialize QoS with either:
@@ -50,6 +54,20 @@ class QoS:
             'Latency': self.latency,
             'Documentation': self.documentation
         }
+
+    def to_xml_items(self):
+        """``(tag, value)`` pairs in ``to_dict`` order, without building a dict."""
+        return (
+            ('ResponseTime', self.response_time),
+            ('Availability', self.availability),
+            ('Throughput', self.throughput),
+            ('Successability', self.successability),
+            ('Reliability', self.reliability),
+            ('Compliance', self.compliance),
+            ('BestPractices', self.best_practices),
+            ('Latency', self.latency),
+            ('Documentation', self.documentation),
+        )
     
     def meets_constraints(self, constraints):
         """Checks if the QoS values meet the constraints.
@@ -77,6 +95,12 @@ class QoS:
 
 
 class WebService:
+    # Catalogs hold tens of thousands of services: no per-instance __dict__
+    __slots__ = (
+        "id", "name", "inputs", "outputs", "qos", "annotations", "wsdl_content",
+        "_annotations_cache", "_qos_cache", "_qos_texts_cache", "_json_cache",
+    )
+
     def __init__(self, service_id, name=None):
         self.id = service_id
         self.name = name or service_id
@@ -85,6 +109,14 @@ class WebService:
         self.qos = QoS()
         self.annotations = None
         self.wsdl_content = None
+        # (annotations object, its to_dict()) — see _annotations_dict
+        self._annotations_cache = None
+        # (qos object, its to_dict()) — see _qos_dict
+        self._qos_cache = None
+        # (qos object, formatted values) — see helpers._qos_texts
+        self._qos_texts_cache = None
+        # (qos object, annotations object, JSON bytes) — see helpers.service_json
+        self._json_cache = None
     
     def to_dict(self):
         return {
@@ -92,9 +124,32 @@ class WebService:
             'name': self.name,
             'inputs': self.inputs,
             'outputs': self.outputs,
-            'qos': self.qos.to_dict(),
-            'annotations': self.annotations.to_dict() if self.annotations else None
+            'qos': self._qos_dict(),
+            'annotations': self._annotations_dict()
         }
+
+    def _qos_dict(self):
+        """``qos.to_dict()``, memoised per QoS object (replaced, never edited)."""
+        qos = self.qos
+        cached = self._qos_cache
+        if cached is None or cached[0] is not qos:
+            cached = self._qos_cache = (qos, qos.to_dict())
+        return cached[1]
+
+    def _annotations_dict(self):
+        """``annotations.to_dict()``, memoised per annotations object.
+
+        The annotator builds an annotation completely before assigning it,
+        so a new object means new content; re-serialising the whole social
+        node on every list request is the expensive part of ``to_dict``.
+        """
+        annotations = self.annotations
+        if not annotations:
+            return None
+        cached = self._annotations_cache
+        if cached is None or cached[0] is not annotations:
+            cached = self._annotations_cache = (annotations, annotations.to_dict())
+        return cached[1]
     
     def can_produce(self, parameter):
         """Checks if the service can produce a given parameter."""
@@ -134,6 +189,9 @@ class CompositionResult:
         self.graph_data = None
         self.algorithm_used = ""
         self.states_explored = 0
+        # to_dict() of the finished, stored result — see
+        # routes.composition._result_dict
+        self._dict_cache = None
     
     def to_dict(self):
         return {
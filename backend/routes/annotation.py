@@ -3,19 +3,71 @@
 import logging
 import math
 import threading
+import time
 import requests as http_requests
 from flask import Blueprint, request, jsonify
 
-from state import app_state, state_lock, compute_annotation_status
+from state import (
+    app_state, state_lock, compute_annotation_status, bump_services_version,
+    replace_services, annotation_status_for, seed_annotation_status, index_by_id,
+)
 from services.annotator import ServiceAnnotator
-from services.classic_composer import ClassicComposer
-from services.llm_composer import LLMComposer
 from validators import safe_route
+from config import (
+    OLLAMA_URL, OLLAMA_MODEL, OLLAMA_NUM_PARALLEL, OLLAMA_CACHE_DIR, OLLAMA_KEEP_ALIVE,
+)
 
 annotation_bp = Blueprint("annotation", __name__)
 _log = logging.getLogger("annotation")  # shares the file handler set up by annotator
 
 
+def _catalog_io_totals():
+    """``(count, total inputs, total outputs)`` over all loaded services.
+
+    Uploads only append to the services list, so the running totals take
+    in the new tail rather than rescanning the catalog.
+    """
+    services = app_state["services"]
+    n, last, total_in, total_out = app_state["io_totals"]
+    if n and (len(services) < n or services[n - 1] is not last):
+        n, total_in, total_out = 0, 0, 0  # list was cut back: start over
+    tail = services[n:]
+    if tail:
+        for s in tail:
+            total_in += len(s.inputs)
+            total_out += len(s.outputs)
+        n += len(tail)
+        app_state["io_totals"] = (n, tail[-1], total_in, total_out)
+    return n, total_in, total_out
+
+
+def _io_profile(service_ids):
+    """``(count, avg inputs, avg outputs)`` of the services to annotate.
+
+    The UI re-posts the same estimate while options are edited, so a
+    filtered result is kept until the service list changes.
+    """
+    if not service_ids:
+        n, total_in, total_out = _catalog_io_totals()
+        return (n, total_in / n, total_out / n) if n else (0, 0, 0)
+
+    key = (app_state["services_version"], frozenset(service_ids))
+    cached = app_state["estimate_cache"]
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    by_id = app_state["services_by_id"]
+    target_services = [by_id[sid] for sid in key[1] if sid in by_id]
+    total_in = total_out = 0
+    for s in target_services:
+        total_in += len(s.inputs)
+        total_out += len(s.outputs)
+    n = len(target_services)
+    profile = (n, total_in / n, total_out / n) if n else (0, 0, 0)
+    app_state["estimate_cache"] = (key, profile)
+    return profile
+
+
 @annotation_bp.route("/api/annotate/estimate", methods=["POST"])
 @safe_route
 def estimate_annotation_time():
@@ -28,41 +80,32 @@ def estimate_annotation_time():
             "annotation_types", ["interaction", "context", "policy"]
         )
 
-        if service_ids:
-            target_services = [s for s in app_state["services"] if s.id in service_ids]
-        else:
-            target_services = app_state["services"]
-
-        num_services = len(target_services)
+        num_services, avg_inputs, avg_outputs = _io_profile(service_ids)
         num_types = len(annotation_types)
         total_services = len(app_state["services"])
 
         # Complexity analysis
-        if target_services:
-            avg_inputs = sum(len(s.inputs) for s in target_services) / num_services
-            avg_outputs = sum(len(s.outputs) for s in target_services) / num_services
-            avg_io = avg_inputs + avg_outputs
-        else:
-            avg_inputs = avg_outputs = avg_io = 0
+        avg_io = avg_inputs + avg_outputs
 
         complexity_factor = 1.0 + (avg_io / 15.0)
 
         breakdown = {}
 
         if use_llm:
-            max_workers = max(1, int(data.get("max_workers", 10)))
+            max_workers = max(1, int(data.get("max_workers", OLLAMA_NUM_PARALLEL)))
             batch_size = max(1, int(data.get("batch_size", 50)))
+            services_per_call = max(1, min(int(data.get("services_per_call", 1)), 20))
 
-            # Each service = 1 Ollama call. max_workers run concurrently.
-            # A "wave" = one round of max_workers concurrent calls.
-            num_waves = math.ceil(num_services / max_workers)
+            # Each group of services_per_call services = 1 Ollama call.
+            # max_workers run concurrently; a "wave" = one round of them.
+            num_calls = math.ceil(num_services / services_per_call)
+            num_waves = math.ceil(num_calls / max_workers)
 
             # Probe Ollama availability
-            ollama_url = app_state.get("ollama_url", "http://localhost:11434")
             ollama_reachable = False
             try:
                 probe = http_requests.get(
-                    f"{ollama_url}/api/tags", timeout=2
+                    f"{OLLAMA_URL}/api/tags", timeout=2
                 )
                 ollama_reachable = probe.status_code == 200
             except Exception:
@@ -82,7 +125,7 @@ def estimate_annotation_time():
                 "label": "LLM Annotation" if ollama_reachable else "Annotation (Ollama offline → fallback)",
                 "time": annotation_time,
                 "detail": (
-                    f"{num_services} services ÷ {max_workers} workers = "
+                    f"{num_calls} calls ÷ {max_workers} workers = "
                     f"{num_waves} waves × ~{per_call_latency:.1f}s/call"
                 ),
             }
@@ -169,12 +212,13 @@ def start_annotation():
         annotation_types = data.get(
             "annotation_types", ["interaction", "context", "policy"]
         )
-        max_workers = max(1, min(int(data.get("max_workers", 10)), 50))
+        max_workers = max(1, min(int(data.get("max_workers", OLLAMA_NUM_PARALLEL)), 50))
         batch_size = max(1, int(data.get("batch_size", 50)))
         skip_annotated = data.get("skip_annotated", False)
+        services_per_call = max(1, min(int(data.get("services_per_call", 1)), 20))
 
-        _log.info("POST /api/annotate/start  use_llm=%s  service_ids=%s  annotation_types=%s  workers=%d  batch=%d  skip=%s",
-                   use_llm, service_ids if service_ids else "ALL", annotation_types, max_workers, batch_size, skip_annotated)
+        _log.info("POST /api/annotate/start  use_llm=%s  service_ids=%s  annotation_types=%s  workers=%d  batch=%d  skip=%s  per_call=%d",
+                   use_llm, service_ids if service_ids else "ALL", annotation_types, max_workers, batch_size, skip_annotated, services_per_call)
 
         if not app_state["services"]:
             _log.warning("Annotation start rejected — no services loaded")
@@ -191,8 +235,12 @@ def start_annotation():
         if not app_state["annotator"]:
             app_state["annotator"] = ServiceAnnotator(
                 app_state["services"],
+                ollama_url=OLLAMA_URL,
+                model=OLLAMA_MODEL,
                 training_examples=app_state["learning_state"].get("training_examples"),
                 interaction_store=app_state["interaction_store"],
+                cache_dir=OLLAMA_CACHE_DIR,
+                keep_alive=OLLAMA_KEEP_ALIVE,
             )
 
         total = len(service_ids) if service_ids else len(app_state["services"])
@@ -211,15 +259,37 @@ def start_annotation():
         def _annotation_worker():
             try:
                 log_every = max(total // 200, 1)
+                last_update = [0.0]
 
                 def progress_callback(current, _total, service_id):
+                    if current % log_every == 0 or current == _total:
+                        _log.info("Annotation progress: %d/%d - %s", current, _total, service_id)
+                    # Classic runs report every few ms; the UI polls about
+                    # once a second, so publish at most every 100 ms
+                    now = time.monotonic()
+                    if current != _total and now - last_update[0] < 0.1:
+                        return
+                    last_update[0] = now
                     with state_lock:
                         p = app_state["annotation_progress"]
                         p["current"] = current
                         p["total"] = _total
                         p["current_service"] = service_id
-                    if current % log_every == 0 or current == _total:
-                        print(f"Annotation progress: {current}/{_total} - {service_id}")
+                        # annotations land on the shared service objects
+                        app_state["annotations_version"] += 1
+
+                # A subset run's status follows from the status before it and
+                # the subset's annotated flags, instead of a rescan afterwards
+                subset = None
+                if service_ids:
+                    with state_lock:
+                        run_version = app_state["services_version"]
+                        by_id = app_state["services_by_id"]
+                        subset = {
+                            sid: by_id[sid].annotations is not None
+                            for sid in set(service_ids) if sid in by_id
+                        }
+                    status_before = compute_annotation_status()
 
                 annotated = app_state["annotator"].annotate_all(
                     service_ids=service_ids,
@@ -229,43 +299,69 @@ def start_annotation():
                     max_workers=max_workers,
                     batch_size=batch_size,
                     skip_annotated=skip_annotated,
+                    services_per_call=services_per_call,
                 )
 
-                # Update services list
-                svc_by_id = {s.id: s for s in annotated}
-                for i, s in enumerate(app_state["services"]):
-                    if s.id in svc_by_id:
-                        app_state["services"][i] = svc_by_id[s.id]
+                # Update services list.  The annotator annotates the shared
+                # objects in place, so entries are normally unchanged; a
+                # replaced entry means the composers' indexes are stale.
+                svc_by_id = index_by_id(annotated)  # first wins, as in state
+                with state_lock:  # uploads may extend the list meanwhile
+                    by_id = app_state["services_by_id"]
+                    replaced = [s for sid, s in svc_by_id.items() if by_id.get(sid) is not s]
+                    if replaced:
+                        for i, s in enumerate(app_state["services"]):
+                            new = svc_by_id.get(s.id)
+                            if new is not None and new is not s:
+                                app_state["services"][i] = new
+                    by_id.update(svc_by_id)
+                    app_state["annotated_services"] = list(app_state["services"])
+                    # Uploads or replaced entries change what the count covers
+                    incremental = (
+                        subset is not None and not replaced
+                        and app_state["services_version"] == run_version
+                    )
 
-                app_state["annotated_services"] = list(app_state["services"])
+                if replaced:
+                    replace_services(replaced)
+                bump_services_version()
 
-                # Rebuild composers
-                app_state["classic_composer"] = ClassicComposer(app_state["services"])
-                if app_state["learning_state"]["is_trained"]:
-                    app_state["llm_composer"] = LLMComposer(
-                        app_state["services"],
-                        training_examples=app_state["learning_state"]["training_examples"],
+                status = None
+                if incremental:
+                    delta = sum(
+                        (s.annotations is not None) - subset[sid]
+                        for sid, s in svc_by_id.items() if sid in subset
                     )
-                else:
-                    app_state["llm_composer"] = LLMComposer(app_state["services"])
-
-                app_state["annotation_status"] = compute_annotation_status()
+                    status = annotation_status_for(
+                        status_before["annotation_count"] + delta,
+                        status_before["total_services"],
+                    )
+                    if not seed_annotation_status(status, run_version + 1):
+                        status = None
+                app_state["annotation_status"] = status or compute_annotation_status()
 
                 with state_lock:
                     app_state["annotation_progress"]["completed"] = True
                     app_state["annotation_progress"]["result"] = {
                         "message": "Annotation completed",
                         "total_annotated": len(annotated),
-                        "services": [s.to_dict() for s in annotated],
+                        # Only what the results list shows; the full
+                        # services (with annotations) stay on /api/services
+                        "services": [
+                            {
+                                "id": s.id,
+                                "inputs": len(s.inputs),
+                                "outputs": len(s.outputs),
+                                "annotated": s.annotations is not None,
+                            }
+                            for s in annotated
+                        ],
                         "annotation_types": annotation_types,
                         "used_llm": use_llm,
                     }
-                print(f"Annotation finished: {len(annotated)} services annotated.")
                 _log.info("Background worker COMPLETED  annotated=%d  use_llm=%s", len(annotated), use_llm)
 
             except Exception as exc:
-                import traceback
-                traceback.print_exc()
                 _log.error("Background worker FAILED: %s", exc, exc_info=True)
                 with state_lock:
                     app_state["annotation_progress"]["error"] = str(exc)
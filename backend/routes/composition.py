@@ -1,12 +1,19 @@
 """Composition endpoints — classic, LLM, compare, batch, chat, best-solutions."""
 
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 
-from state import app_state
-from helpers import parse_xml_upload, calculate_statistics, calculate_formal_metrics, generate_comparison_discussion
-from services.classic_composer import ClassicComposer
-from services.llm_composer import LLMComposer
+from state import (
+    app_state, compute_annotation_status, has_annotated_services, index_by_id,
+    bump_results_version, get_classic_composer, get_llm_composer,
+)
+from helpers import (
+    parse_xml_upload, calculate_statistics, calculate_formal_metrics,
+    generate_comparison_discussion, json_bytes,
+)
 from services.wsdl_parser import parse_requests_xml, parse_best_solutions_xml
 from models.context import (
     ExecutionContext,
@@ -14,8 +21,14 @@ from models.context import (
     adapt_qos_constraints_for_context,
 )
 from validators import safe_route, require_json, require_fields
+from config import OLLAMA_NUM_PARALLEL
 
 composition_bp = Blueprint("composition", __name__)
+_log = logging.getLogger(__name__)
+
+# Versions restart with the process; the seed keeps a client's ETag from an
+# earlier run from matching the new one.
+_ETAG_SEED = uuid.uuid4().hex[:8]
 
 
 # ── Requests upload (prerequisite to composition) ─────────────────
@@ -24,32 +37,40 @@ composition_bp = Blueprint("composition", __name__)
 @safe_route
 def upload_requests():
     """Upload composition requests XML file."""
-    try:
-        file = request.files.get("file")
-        if not file:
-            return jsonify({"error": "No file provided"}), 400
+    file = request.files.get("file")
+    if not file:
+        return jsonify({"error": "No file provided"}), 400
 
-        requests_list = parse_xml_upload(file, parse_requests_xml)
-        app_state["requests"] = requests_list
-        print(f"Parsed {len(requests_list)} requests")
+    requests_list = parse_xml_upload(file, parse_requests_xml)
+    app_state["requests"] = requests_list
+    app_state["requests_by_id"] = index_by_id(requests_list)
+    app_state["request_ids"] = [r.id for r in requests_list]
+    bump_results_version()
+    _log.info("Parsed %d requests", len(requests_list))
 
-        return jsonify({
-            "message": f"{len(requests_list)} requests loaded",
-            "requests": [r.to_dict() for r in requests_list],
-        })
-    except Exception as e:
-        import traceback; traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+    return jsonify({
+        "message": f"{len(requests_list)} requests loaded",
+        "requests": [r.to_dict() for r in requests_list],
+    })
 
 
 @composition_bp.route("/api/requests", methods=["GET"])
 @safe_route
 def get_requests():
-    """Retrieve requests list."""
-    return jsonify({
-        "requests": [r.to_dict() for r in app_state["requests"]],
-        "total": len(app_state["requests"]),
-    })
+    """Retrieve requests list.
+
+    The JSON body is cached until a new requests file replaces the list.
+    """
+    requests_list = app_state["requests"]
+    cached = app_state["requests_payload"]
+    if cached is None or cached[0] is not requests_list:
+        app_state["requests_payload"] = cached = None  # release the stale body
+        cached = (requests_list, json_bytes({
+            "requests": [r.to_dict() for r in requests_list],
+            "total": len(requests_list),
+        }))
+        app_state["requests_payload"] = cached
+    return Response(cached[1], mimetype="application/json")
 
 
 # ── Classic composition (Solution A) ─────────────────────────────
@@ -65,9 +86,7 @@ def compose_classic():
         request_id = data.get("request_id")
         algorithm = data.get("algorithm", "dijkstra")
 
-        comp_request = next(
-            (r for r in app_state["requests"] if r.id == request_id), None
-        )
+        comp_request = app_state["requests_by_id"].get(request_id)
         if not comp_request:
             return jsonify({"error": "Request not found"}), 404
 
@@ -81,12 +100,9 @@ def compose_classic():
         original_constraints = comp_request.qos_constraints
         comp_request.qos_constraints = adapted_constraints
 
-        if not app_state["classic_composer"]:
-            services = app_state["annotated_services"] if app_state["annotated_services"] else app_state["services"]
-            app_state["classic_composer"] = ClassicComposer(services)
-
-        result = app_state["classic_composer"].compose(comp_request, algorithm)
+        result = get_classic_composer().compose(comp_request, algorithm)
         app_state["results_classic"][request_id] = result
+        bump_results_version()
 
         # Restore original constraints
         comp_request.qos_constraints = original_constraints
@@ -107,7 +123,7 @@ def compose_classic():
             if app_state["annotator"]:
                 app_state["annotator"].refresh_history_stats()
 
-        resp = result.to_dict()
+        resp = dict(_result_dict(result))
         resp["context_used"] = exec_ctx.to_dict()
         return jsonify(resp)
     except Exception as e:
@@ -124,11 +140,7 @@ def compose_llm():
     """Intelligent composition with LLM (Solution B) — context-aware + learning.
     Requires services to be annotated first."""
     try:
-        annotated_count = sum(
-            1 for s in app_state["services"]
-            if hasattr(s, "annotations") and s.annotations is not None
-        )
-        if annotated_count == 0:
+        if not has_annotated_services():
             return jsonify({
                 "error": "Services must be annotated before LLM composition",
                 "message": (
@@ -145,9 +157,7 @@ def compose_llm():
         enable_reasoning = data.get("enable_reasoning", True)
         enable_adaptation = data.get("enable_adaptation", True)
 
-        comp_request = next(
-            (r for r in app_state["requests"] if r.id == request_id), None
-        )
+        comp_request = app_state["requests_by_id"].get(request_id)
         if not comp_request:
             return jsonify({"error": "Request not found"}), 404
 
@@ -159,14 +169,8 @@ def compose_llm():
         original_constraints = comp_request.qos_constraints
         comp_request.qos_constraints = adapted_constraints
 
-        if not app_state["llm_composer"]:
-            services = app_state["annotated_services"] if app_state["annotated_services"] else app_state["services"]
-            app_state["llm_composer"] = LLMComposer(
-                services,
-                training_examples=app_state["learning_state"]["training_examples"],
-            )
-
-        result = app_state["llm_composer"].compose(
+        llm_composer = get_llm_composer()
+        result = llm_composer.compose(
             comp_request,
             enable_reasoning=enable_reasoning,
             enable_adaptation=enable_adaptation,
@@ -210,9 +214,10 @@ def compose_llm():
         if result.success:
             metrics["successful_compositions"] += 1
 
-        history = app_state["learning_state"]["composition_history"]
-        total_utility = sum(r["utility"] for r in history)
-        metrics["average_utility"] = total_utility / len(history)
+        learning = app_state["learning_state"]
+        history = learning["composition_history"]
+        learning["history_utility_total"] += composition_record["utility"]
+        metrics["average_utility"] = learning["history_utility_total"] / len(history)
 
         if len(history) >= 10:
             recent_avg = sum(r["utility"] for r in history[-10:]) / 10
@@ -222,10 +227,12 @@ def compose_llm():
                 if overall_avg > 0 else 0
             )
 
+        bump_results_version()
+
         # Learn from this composition
-        app_state["llm_composer"].learn_from_composition(composition_record)
+        llm_composer.learn_from_composition(composition_record)
 
-        resp = result.to_dict()
+        resp = dict(_result_dict(result))
         resp["context_used"] = exec_ctx.to_dict()
         return jsonify(resp)
     except Exception as e:
@@ -244,11 +251,7 @@ def llm_chat():
         data = request.json
         message = data.get("message", "")
 
-        if not app_state["llm_composer"]:
-            services = app_state["annotated_services"] if app_state["annotated_services"] else app_state["services"]
-            app_state["llm_composer"] = LLMComposer(services)
-
-        response = app_state["llm_composer"].chat(message)
+        response = get_llm_composer().chat(message)
         return jsonify({"response": response})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -260,22 +263,19 @@ def llm_chat():
 @safe_route
 def upload_best_solutions():
     """Upload best solutions XML file."""
-    try:
-        file = request.files.get("file")
-        if not file:
-            return jsonify({"error": "No file provided"}), 400
-
-        solutions = parse_xml_upload(file, parse_best_solutions_xml)
-        app_state["best_solutions"] = solutions
-        print(f"Parsed {len(solutions)} best solutions")
-
-        return jsonify({
-            "message": f"{len(solutions)} best solutions loaded",
-            "solutions": solutions,
-        })
-    except Exception as e:
-        import traceback; traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+    file = request.files.get("file")
+    if not file:
+        return jsonify({"error": "No file provided"}), 400
+
+    solutions = parse_xml_upload(file, parse_best_solutions_xml)
+    app_state["best_solutions"] = solutions
+    bump_results_version()
+    _log.info("Parsed %d best solutions", len(solutions))
+
+    return jsonify({
+        "message": f"{len(solutions)} best solutions loaded",
+        "solutions": solutions,
+    })
 
 
 @composition_bp.route("/api/compose/compare", methods=["POST"])
@@ -288,9 +288,7 @@ def compose_compare():
         data = request.json
         request_id = data.get("request_id")
 
-        comp_request = next(
-            (r for r in app_state["requests"] if r.id == request_id), None
-        )
+        comp_request = app_state["requests_by_id"].get(request_id)
         if not comp_request:
             return jsonify({"error": "Request not found"}), 404
 
@@ -305,11 +303,12 @@ def compose_compare():
         results = {}
 
         # Classic algorithms
-        if app_state["classic_composer"]:
+        if app_state["services"]:
+            classic_composer = get_classic_composer()
             for algo in ["dijkstra", "astar", "greedy"]:
                 try:
-                    result = app_state["classic_composer"].compose(comp_request, algo)
-                    results[algo] = result.to_dict()
+                    result = classic_composer.compose(comp_request, algo)
+                    results[algo] = _result_dict(result)
                     app_state["results_classic"][f"{request_id}_{algo}"] = result
                 except Exception as e:
                     results[algo] = {
@@ -318,14 +317,10 @@ def compose_compare():
                     }
 
         # LLM composition
-        annotated_count = sum(
-            1 for s in app_state["services"]
-            if hasattr(s, "annotations") and s.annotations is not None
-        )
-        if app_state["llm_composer"] and annotated_count > 0:
+        if app_state["services"] and has_annotated_services():
             try:
-                llm_result = app_state["llm_composer"].compose(comp_request)
-                results["llm"] = llm_result.to_dict()
+                llm_result = get_llm_composer().compose(comp_request)
+                results["llm"] = _result_dict(llm_result)
                 app_state["results_llm"][request_id] = llm_result
             except Exception as e:
                 results["llm"] = {
@@ -341,6 +336,7 @@ def compose_compare():
 
         # Restore original constraints
         comp_request.qos_constraints = original_constraints
+        bump_results_version()
 
         results["context_used"] = exec_ctx.to_dict()
         return jsonify(results)
@@ -355,117 +351,152 @@ def compose_batch():
     try:
         data = request.json or {}
         algorithm = data.get("algorithm", "dijkstra")
-        request_ids = data.get("request_ids", [r.id for r in app_state["requests"]])
+        request_ids = data.get("request_ids", app_state["request_ids"])
 
         results = {}
-        annotated_count = sum(
-            1 for s in app_state["services"]
-            if hasattr(s, "annotations") and s.annotations is not None
-        )
-
-        for req_id in request_ids:
-            comp_request = next(
-                (r for r in app_state["requests"] if r.id == req_id), None
-            )
-            if not comp_request:
-                continue
-
-            entry = {"classic": None, "llm": None}
-
-            # Classic composition
-            if app_state["classic_composer"]:
-                try:
-                    result = app_state["classic_composer"].compose(comp_request, algorithm)
-                    app_state["results_classic"][req_id] = result
-                    entry["classic"] = result.to_dict()
-                except Exception as e:
-                    entry["classic"] = {
-                        "success": False, "error": str(e),
-                        "utility_value": 0, "computation_time": 0,
-                    }
-
-            # LLM composition
-            if app_state["llm_composer"] and annotated_count > 0:
-                try:
-                    llm_result = app_state["llm_composer"].compose(comp_request)
-                    app_state["results_llm"][req_id] = llm_result
-                    entry["llm"] = llm_result.to_dict()
-                except Exception as e:
-                    entry["llm"] = {
-                        "success": False, "error": str(e),
-                        "utility_value": 0, "computation_time": 0,
-                    }
-
-            results[req_id] = entry
+        annotated = has_annotated_services()
+        classic_composer = get_classic_composer() if app_state["services"] else None
+        llm_composer = get_llm_composer() if app_state["services"] else None
+
+        # Resolve ids up front; unknown ids are skipped
+        by_id = app_state["requests_by_id"]
+        pairs = [(req_id, by_id[req_id]) for req_id in request_ids if req_id in by_id]
+
+        # LLM compositions may wait on Ollama or a fine-tuned model, so they
+        # run on a pool while the (pure Python) classic ones run here
+        with ThreadPoolExecutor(max_workers=OLLAMA_NUM_PARALLEL) as pool:
+            llm_futures = {}
+            if llm_composer and annotated:
+                llm_futures = {
+                    req_id: pool.submit(llm_composer.compose, comp_request)
+                    for req_id, comp_request in pairs
+                }
 
+            for req_id, comp_request in pairs:
+                entry = {"classic": None, "llm": None}
+
+                # Classic composition
+                if classic_composer:
+                    try:
+                        result = classic_composer.compose(comp_request, algorithm)
+                        app_state["results_classic"][req_id] = result
+                        entry["classic"] = _result_dict(result)
+                    except Exception as e:
+                        entry["classic"] = {
+                            "success": False, "error": str(e),
+                            "utility_value": 0, "computation_time": 0,
+                        }
+
+                # LLM composition
+                future = llm_futures.get(req_id)
+                if future is not None:
+                    try:
+                        llm_result = future.result()
+                        app_state["results_llm"][req_id] = llm_result
+                        entry["llm"] = _result_dict(llm_result)
+                    except Exception as e:
+                        entry["llm"] = {
+                            "success": False, "error": str(e),
+                            "utility_value": 0, "computation_time": 0,
+                        }
+
+                results[req_id] = entry
+
+        bump_results_version()
         return jsonify({"results": results, "total": len(results)})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def _result_dict(result):
+    """Serialise a stored composition result (or pass a plain dict through).
+
+    Stored results are never modified, so the dict is built once per result
+    and reused by every comparison rebuild; callers must not mutate it.
+    """
+    if not result:
+        return None
+    if isinstance(result, dict):
+        return result
+    cached = result._dict_cache
+    if cached is None:
+        cached = result._dict_cache = result.to_dict()
+    return cached
+
+
+def _build_comparison():
+    """Assemble the GET /api/comparison body from the current results."""
+    best_solutions = app_state["best_solutions"]
+    results_classic = app_state["results_classic"]
+    results_llm = app_state["results_llm"]
+
+    comparisons = [
+        {
+            "request_id": req_id,
+            "best_known": best_solutions.get(req_id),
+            "classic": _result_dict(results_classic.get(req_id)),
+            "llm": _result_dict(results_llm.get(req_id)),
+        }
+        for req_id in app_state["request_ids"]
+    ]
+
+    stats = calculate_statistics(comparisons)
+
+    # Formal evaluation metrics (precision, recall, F1) vs best-known
+    formal_metrics = calculate_formal_metrics(comparisons)
+
+    training_impact = {
+        "is_trained": app_state["learning_state"]["is_trained"],
+        "training_examples": len(app_state["learning_state"]["training_examples"]),
+        "composition_history": len(app_state["learning_state"]["composition_history"]),
+        "performance_metrics": app_state["learning_state"]["performance_metrics"],
+    }
+
+    resp = {
+        "comparisons": comparisons,
+        "statistics": stats,
+        "training_impact": training_impact,
+        "total_requests": len(app_state["requests"]),
+        "total_services": len(app_state["services"]),
+        "annotated_services": compute_annotation_status()["annotation_count"],
+    }
+    if formal_metrics:
+        resp["formal_metrics"] = formal_metrics
+
+    # Analytical discussion — requirement 2c
+    resp["discussion"] = generate_comparison_discussion(
+        stats, formal_metrics, training_impact
+    )
+    return resp
+
+
 @composition_bp.route("/api/comparison", methods=["GET"])
 @safe_route
 def get_comparison():
-    """Enhanced comparison: Solution A vs B vs Best Solutions with rich metrics."""
-    try:
-        comparisons = []
-
-        for req in app_state["requests"]:
-            req_id = req.id
-            comparison = {
-                "request_id": req_id,
-                "best_known": app_state["best_solutions"].get(req_id),
-                "classic": None,
-                "llm": None,
-            }
-
-            classic_result = app_state["results_classic"].get(req_id)
-            if classic_result:
-                comparison["classic"] = (
-                    classic_result.to_dict()
-                    if hasattr(classic_result, "to_dict") else classic_result
-                )
-
-            llm_result = app_state["results_llm"].get(req_id)
-            if llm_result:
-                comparison["llm"] = (
-                    llm_result.to_dict()
-                    if hasattr(llm_result, "to_dict") else llm_result
-                )
-
-            comparisons.append(comparison)
-
-        stats = calculate_statistics(comparisons)
+    """Enhanced comparison: Solution A vs B vs Best Solutions with rich metrics.
 
-        # Formal evaluation metrics (precision, recall, F1) vs best-known
-        formal_metrics = calculate_formal_metrics(comparisons)
-
-        training_impact = {
-            "is_trained": app_state["learning_state"]["is_trained"],
-            "training_examples": len(app_state["learning_state"]["training_examples"]),
-            "composition_history": len(app_state["learning_state"]["composition_history"]),
-            "performance_metrics": app_state["learning_state"]["performance_metrics"],
-        }
-
-        resp = {
-            "comparisons": comparisons,
-            "statistics": stats,
-            "training_impact": training_impact,
-            "total_requests": len(app_state["requests"]),
-            "total_services": len(app_state["services"]),
-            "annotated_services": sum(
-                1 for s in app_state["services"]
-                if hasattr(s, "annotations") and s.annotations is not None
-            ),
-        }
-        if formal_metrics:
-            resp["formal_metrics"] = formal_metrics
-
-        # Analytical discussion — requirement 2c
-        resp["discussion"] = generate_comparison_discussion(
-            stats, formal_metrics, training_impact
+    The body only changes with the state versions in its ETag: it is built
+    once per version, and a polling client that sends the tag back gets a
+    304 without a body at all.
+    """
+    try:
+        etag = "%s-%d-%d-%d" % (
+            _ETAG_SEED, app_state["results_version"],
+            app_state["services_version"], app_state["annotations_version"],
         )
-
-        return jsonify(resp)
+        if request.if_none_match.contains(etag):
+            not_modified = Response(status=304)
+            not_modified.set_etag(etag)
+            return not_modified
+
+        cached = app_state["comparison_payload"]
+        if cached is None or cached[0] != etag:
+            app_state["comparison_payload"] = cached = None  # release the stale body
+            cached = (etag, jsonify(_build_comparison()).get_data())
+            app_state["comparison_payload"] = cached
+
+        response = Response(cached[1], mimetype="application/json")
+        response.set_etag(etag)
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -21,9 +21,7 @@ def get_current_context():
 @safe_route
 def get_context_score(service_id):
     """Compute context compatibility score for a service vs current context."""
-    service = next(
-        (s for s in app_state["services"] if s.id == service_id), None
-    )
+    service = app_state["services_by_id"].get(service_id)
     if not service:
         return jsonify({"error": "Service not found"}), 404
 
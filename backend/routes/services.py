@@ -1,17 +1,17 @@
 """Service management endpoints — upload, list, get, download annotated WSDL."""
 
-import io
-import zipfile
+import logging
 from flask import Blueprint, request, jsonify, Response
 
-from state import app_state
-from helpers import generate_enriched_wsdl
-from services.annotator import ServiceAnnotator
-from services.classic_composer import ClassicComposer
-from services.llm_composer import LLMComposer
+from state import app_state, state_lock, bump_services_version, get_parser
+from helpers import (
+    WSDL_SUFFIXES, generate_enriched_wsdl, iter_enriched_wsdl_zip, parse_wsdl_contents,
+    read_upload, service_json,
+)
 from validators import safe_route
 
 services_bp = Blueprint("services", __name__)
+_log = logging.getLogger(__name__)
 
 
 @services_bp.route("/api/services/upload", methods=["POST"])
@@ -26,41 +26,40 @@ def upload_services():
         services = []
         errors = []
 
+        # Read everything first, then parse the batch (in parallel when large)
+        items = []
+        log_progress = _log.isEnabledFor(logging.INFO)
         for idx, file in enumerate(files):
-            if idx % 100 == 0:
-                print(f"Progress: {idx}/{len(files)} files processed")
+            if log_progress and idx % 500 == 0:
+                _log.info("Upload progress: %d/%d files read", idx, len(files))
 
-            if file.filename.endswith(".wsdl") or file.filename.endswith(".xml"):
+            if file.filename.endswith(WSDL_SUFFIXES):
                 try:
-                    content = file.read().decode("utf-8")
-                    service = app_state["parser"].parse_content(content, file.filename)
-                    if service:
-                        services.append(service)
-                    else:
-                        errors.append(f"{file.filename}: Parse failed")
+                    # Raw bytes: libxml2 parses them directly (no decode/re-encode)
+                    items.append((read_upload(file), file.filename))
                 except Exception as e:
                     errors.append(f"{file.filename}: {e}")
 
-        print(f"Processing completed: {len(services)} services loaded, {len(errors)} errors")
+        parsed = parse_wsdl_contents(items, get_parser())
+        for (_, filename), service in zip(items, parsed):
+            if service:
+                services.append(service)
+            else:
+                errors.append(f"{filename}: Parse failed")
+
+        _log.info("Upload processed: %d services loaded, %d errors", len(services), len(errors))
 
         if services:
-            app_state["services"].extend(services)
-
-            # Reset composers with learning capability
-            app_state["annotator"] = ServiceAnnotator(
-                app_state["services"],
-                training_examples=app_state["learning_state"].get("training_examples"),
-                interaction_store=app_state["interaction_store"],
-            )
-            app_state["classic_composer"] = ClassicComposer(app_state["services"])
-
-            if app_state["learning_state"]["is_trained"]:
-                app_state["llm_composer"] = LLMComposer(
-                    app_state["services"],
-                    training_examples=app_state["learning_state"]["training_examples"],
-                )
-            else:
-                app_state["llm_composer"] = LLMComposer(app_state["services"])
+            with state_lock:
+                app_state["services"].extend(services)
+                by_id = app_state["services_by_id"]
+                for s in services:
+                    by_id.setdefault(s.id, s)
+            # Composers index the new services on next use (state.get_*_composer);
+            # the annotator's indexes are stale too, and /api/annotate/start
+            # builds a new one when it is needed rather than on every batch
+            bump_services_version()
+            app_state["annotator"] = None
 
             # Reset annotation status
             app_state["annotation_status"] = {
@@ -93,18 +92,30 @@ def upload_services():
 @services_bp.route("/api/services", methods=["GET"])
 @safe_route
 def get_services():
-    """Retrieve service list."""
-    return jsonify({
-        "services": [s.to_dict() for s in app_state["services"]],
-        "total": len(app_state["services"]),
-    })
+    """Retrieve service list.
+
+    The serialized body is cached until the service list changes (see
+    ``bump_services_version``) or annotations land, so UI polling does not
+    re-encode every service.
+    """
+    key = (app_state["services_version"], app_state["annotations_version"])
+    cached = app_state["services_payload"]
+    if cached is None or cached[0] != key:
+        # Release the stale body first: it is as large as the new one
+        app_state["services_payload"] = cached = None
+        services = app_state["services"]
+        cached = (key, b'{"services":[%s],"total":%d}' % (
+            b",".join([service_json(s) for s in services]), len(services),
+        ))
+        app_state["services_payload"] = cached
+    return Response(cached[1], mimetype="application/json")
 
 
 @services_bp.route("/api/services/<service_id>", methods=["GET"])
 @safe_route
 def get_service(service_id):
     """Retrieve a specific service."""
-    service = next((s for s in app_state["services"] if s.id == service_id), None)
+    service = app_state["services_by_id"].get(service_id)
     if not service:
         return jsonify({"error": "Service not found"}), 404
     return jsonify(service.to_dict())
@@ -115,7 +126,7 @@ def get_service(service_id):
 def download_annotated_service(service_id):
     """Download an annotated service in enriched WSDL format."""
     try:
-        service = next((s for s in app_state["services"] if s.id == service_id), None)
+        service = app_state["services_by_id"].get(service_id)
         if not service:
             return jsonify({"error": "Service not found"}), 404
 
@@ -141,25 +152,23 @@ def download_all_annotated():
     try:
         annotated_only = request.args.get("annotated_only", "true").lower() != "false"
         ids_param = request.args.get("ids", "")
-        requested_ids = {i.strip() for i in ids_param.split(",") if i.strip()}
+        requested_ids = dict.fromkeys(i.strip() for i in ids_param.split(",") if i.strip())
 
-        services = app_state["services"]
         if requested_ids:
-            services = [s for s in services if s.id in requested_ids]
+            # Look the ids up instead of scanning every service; archive
+            # entries follow the order the ids were given in
+            by_id = app_state["services_by_id"]
+            services = [by_id[i] for i in requested_ids if i in by_id]
+        else:
+            services = list(app_state["services"])  # uploads may append meanwhile
         if annotated_only:
             services = [s for s in services if s.annotations]
 
         if not services:
             return jsonify({"error": "No annotated services found"}), 404
 
-        buf = io.BytesIO()
-        with zipfile.ZipFile(buf, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-            for svc in services:
-                xml_content = generate_enriched_wsdl(svc)
-                zf.writestr(f"{svc.id}_enriched.xml", xml_content)
-        buf.seek(0)
-
-        response = Response(buf.read(), mimetype="application/zip")
+        # Streamed: entries are built and sent one service at a time
+        response = Response(iter_enriched_wsdl_zip(services), mimetype="application/zip")
         response.headers["Content-Disposition"] = (
             "attachment; filename=annotated_services.zip"
         )
@@ -1,28 +1,30 @@
 """Training endpoints — knowledge-base, SFT Phase 1, Reward Phase 2, RL Phase 3."""
 
+import logging
 import threading
 from flask import Blueprint, request, jsonify
 
 from state import (
-    app_state, state_lock,
+    app_state, state_lock, get_llm_composer, get_parser, set_composer, index_by_id,
+    shared_service_index,
+    bump_results_version,
     SFT_DEPS_AVAILABLE, SFT_MISSING,
     REWARD_DEPS_AVAILABLE, REWARD_MISSING,
     RL_DEPS_AVAILABLE, RL_MISSING,
 )
-from helpers import parse_xml_upload
+from helpers import WSDL_SUFFIXES, parse_wsdl_uploads, parse_xml_upload, read_upload
 from validators import require_json, validate_rl_algorithm, safe_route
 from services.wsdl_parser import parse_requests_xml, parse_best_solutions_xml
 from services.llm_composer import LLMComposer
 
 training_bp = Blueprint("training", __name__)
+_log = logging.getLogger(__name__)
 
 
 # ── Helper: ensure LLM composer exists ────────────────────────────
 
 def _ensure_llm_composer():
-    if not app_state["llm_composer"]:
-        services = app_state["annotated_services"] if app_state["annotated_services"] else app_state["services"]
-        app_state["llm_composer"] = LLMComposer(services)
+    return get_llm_composer()
 
 
 # ============== DATA UPLOAD ==============
@@ -42,37 +44,29 @@ def upload_training_data():
         training_solutions = {}
         training_best_solutions = {}
 
-        # Parse WSDL files
+        # Parse WSDL files (in parallel when the batch is large)
         if wsdl_files:
+            items = []
             for file in wsdl_files:
-                if file.filename.endswith((".wsdl", ".xml")):
+                if file.filename.endswith(WSDL_SUFFIXES):
                     try:
-                        raw = file.read()
-                        for enc in ("utf-8", "utf-8-sig", "latin-1"):
-                            try:
-                                content = raw.decode(enc)
-                                break
-                            except UnicodeDecodeError:
-                                continue
-                        else:
-                            content = raw.decode("utf-8", errors="replace")
-                        service = app_state["parser"].parse_content(content, file.filename)
-                        if service:
-                            training_services.append(service)
+                        items.append((read_upload(file), file.filename))
                     except Exception as e:
-                        print(f"Error parsing {file.filename}: {e}")
+                        _log.warning("Error reading %s: %s", file.filename, e)
+            parsed = parse_wsdl_uploads(items, get_parser())
+            training_services = [s for s in parsed if s]
 
         if requests_file:
             training_requests = parse_xml_upload(requests_file, parse_requests_xml)
-            print(f"Parsed {len(training_requests)} requests")
+            _log.info("Parsed %d requests", len(training_requests))
 
         if solutions_file:
             training_solutions = parse_xml_upload(solutions_file, parse_best_solutions_xml)
-            print(f"Parsed {len(training_solutions)} solutions")
+            _log.info("Parsed %d solutions", len(training_solutions))
 
         if best_solutions_file:
             training_best_solutions = parse_xml_upload(best_solutions_file, parse_best_solutions_xml)
-            print(f"Parsed {len(training_best_solutions)} best solutions")
+            _log.info("Parsed %d best solutions", len(training_best_solutions))
 
         app_state["training_data"]["services"] = training_services
         app_state["training_data"]["requests"] = training_requests
@@ -102,53 +96,52 @@ def upload_training_wsdl_batch():
         errors = 0
         error_samples = []
         skipped = 0
+        items = []
         for file in wsdl_files:
-            if not file.filename.endswith((".wsdl", ".xml")):
+            if not file.filename.endswith(WSDL_SUFFIXES):
                 skipped += 1
                 continue
             try:
-                raw = file.read()
+                raw = read_upload(file)
                 if not raw:
                     errors += 1
                     if len(error_samples) < 3:
                         error_samples.append({"file": file.filename, "error": f"Empty file (0 bytes)", "preview": "", "content_len": 0})
                     continue
-                # Try utf-8, then utf-8-sig (handles BOM), then latin-1
-                for enc in ("utf-8", "utf-8-sig", "latin-1"):
-                    try:
-                        content = raw.decode(enc)
-                        break
-                    except UnicodeDecodeError:
-                        continue
-                else:
-                    content = raw.decode("utf-8", errors="replace")
-
-                service = app_state["parser"].parse_content(content, file.filename)
-                if service:
-                    services.append(service)
-                else:
-                    errors += 1
-                    if len(error_samples) < 3:
-                        # Re-parse to capture the actual error
-                        parse_err = ""
-                        try:
-                            import xml.etree.ElementTree as _ET
-                            _ET.fromstring(content.lstrip())
-                        except Exception as ex:
-                            parse_err = f"XML: {ex}"
-                        preview = content[:300] if content else "(empty)"
-                        error_samples.append({"file": file.filename, "error": parse_err or "(parser returned None after successful XML parse)", "preview": preview, "content_len": len(content)})
+                items.append((raw, file.filename))
             except Exception as e:
                 errors += 1
                 if len(error_samples) < 3:
                     error_samples.append({"file": file.filename, "error": str(e)})
 
-        app_state["training_data"]["services"].extend(services)
-        total = len(app_state["training_data"]["services"])
-        print(f"Batch {batch_num}: received={len(wsdl_files)} parsed={len(services)} errors={errors} skipped={skipped} (total: {total})")
-        if error_samples:
-            for s in error_samples:
-                print(f"  Error sample: {s}")
+        # UTF-8 (with or without BOM), else latin-1; in parallel when large
+        parsed = parse_wsdl_uploads(items, get_parser())
+        for (raw, filename), service in zip(items, parsed):
+            if service:
+                services.append(service)
+                continue
+            errors += 1
+            if len(error_samples) < 3:
+                content = raw.decode("utf-8", errors="replace")
+                # Re-parse to capture the actual error
+                parse_err = ""
+                try:
+                    import xml.etree.ElementTree as _ET
+                    _ET.fromstring(content.lstrip())
+                except Exception as ex:
+                    parse_err = f"XML: {ex}"
+                preview = content[:300] if content else "(empty)"
+                error_samples.append({"file": filename, "error": parse_err or "(parser returned None after successful XML parse)", "preview": preview, "content_len": len(content)})
+
+        with state_lock:
+            app_state["training_data"]["services"].extend(services)
+            total = len(app_state["training_data"]["services"])
+        _log.info(
+            "Batch %s: received=%d parsed=%d errors=%d skipped=%d (total: %d)",
+            batch_num, len(wsdl_files), len(services), errors, skipped, total,
+        )
+        for s in error_samples:
+            _log.warning("  Error sample: %s", s)
 
         return jsonify({
             "message": f"Batch {batch_num}: {len(services)} services added",
@@ -178,15 +171,15 @@ def upload_training_xml_files():
 
         if requests_file:
             training_requests = parse_xml_upload(requests_file, parse_requests_xml)
-            print(f"Parsed {len(training_requests)} training requests")
+            _log.info("Parsed %d training requests", len(training_requests))
 
         if solutions_file:
             training_solutions = parse_xml_upload(solutions_file, parse_best_solutions_xml)
-            print(f"Parsed {len(training_solutions)} solutions")
+            _log.info("Parsed %d solutions", len(training_solutions))
 
         if best_solutions_file:
             training_best_solutions = parse_xml_upload(best_solutions_file, parse_best_solutions_xml)
-            print(f"Parsed {len(training_best_solutions)} best solutions")
+            _log.info("Parsed %d best solutions", len(training_best_solutions))
 
         app_state["training_data"]["requests"] = training_requests
         app_state["training_data"]["solutions"] = training_solutions
@@ -207,7 +200,8 @@ def upload_training_xml_files():
 @safe_route
 def reset_training_wsdl():
     """Reset training WSDL data (before a new batch upload)."""
-    app_state["training_data"]["services"] = []
+    with state_lock:
+        app_state["training_data"]["services"] = []
     return jsonify({"message": "Training WSDL reset"})
 
 
@@ -221,26 +215,40 @@ def start_training():
         if not app_state["training_data"]["services"]:
             return jsonify({"error": "No training data available"}), 400
 
-        # (Re)create LLM composer with current services
-        services = app_state["annotated_services"] if app_state["annotated_services"] else app_state["services"]
-        app_state["llm_composer"] = LLMComposer(services)
+        # (Re)create LLM composer with current services, over the shared
+        # index so replace_services() reaches it too
+        set_composer("llm_composer", LLMComposer(
+            app_state["services"], index=shared_service_index(),
+        ))
 
         # Build training examples from training data
+        # Solution metrics are accumulated in the same pass.
+        training_data = app_state["training_data"]
+        solutions = training_data["solutions"]
+        best_solutions = training_data["best_solutions"]
+        training_services = index_by_id(training_data["services"])
+        service_dicts = {}  # one (read-only) to_dict() per distinct service
         training_examples = []
-        for req in app_state["training_data"]["requests"]:
+        examples_with_solutions = 0
+        total_utility = 0
+        for req in training_data["requests"]:
+            best = best_solutions.get(req.id)
             example = {
                 "request": req.to_dict(),
-                "solution": app_state["training_data"]["solutions"].get(req.id),
-                "best_solution": app_state["training_data"]["best_solutions"].get(req.id),
+                "solution": solutions.get(req.id),
+                "best_solution": best,
             }
-            if example["best_solution"]:
-                service_id = example["best_solution"].get("service_id")
-                service = next(
-                    (s for s in app_state["training_data"]["services"] if s.id == service_id),
-                    None,
-                )
-                if service:
-                    example["service"] = service.to_dict()
+            if best:
+                examples_with_solutions += 1
+                total_utility += best.get("utility", 0)
+                service_id = best.get("service_id")
+                service_dict = service_dicts.get(service_id)
+                if service_dict is None:
+                    service = training_services.get(service_id)
+                    if service:
+                        service_dict = service_dicts[service_id] = service.to_dict()
+                if service_dict is not None:
+                    example["service"] = service_dict
             training_examples.append(example)
 
         training_quality = app_state["llm_composer"].train(training_examples)
@@ -250,13 +258,6 @@ def start_training():
         app_state["learning_state"]["training_examples"] = training_examples
 
         total_examples = len(training_examples)
-        examples_with_solutions = sum(
-            1 for e in training_examples if e.get("best_solution")
-        )
-        total_utility = sum(
-            (e.get("best_solution") or {}).get("utility", 0)
-            for e in training_examples if e.get("best_solution")
-        )
         avg_utility = total_utility / max(examples_with_solutions, 1)
         coverage = (
             (examples_with_solutions / total_examples * 100) if total_examples > 0 else 0
@@ -269,6 +270,7 @@ def start_training():
             "learning_rate": coverage,
         }
         app_state["learning_state"]["training_quality"] = training_quality
+        bump_results_version()
 
         # Import into interaction history
         app_state["interaction_store"].import_from_training(training_examples)
@@ -359,9 +361,9 @@ def start_sft_training():
                     app_state["sft_state"]["is_training"] = False
                     app_state["sft_state"]["is_trained"] = True
                     app_state["sft_state"]["metrics"] = result
-                print("[SFT] Phase 1 training complete")
+                _log.info("[SFT] Phase 1 training complete")
             except Exception as exc:
-                import traceback; traceback.print_exc()
+                _log.exception("[SFT] training failed")
                 with state_lock:
                     app_state["sft_state"]["is_training"] = False
                     app_state["sft_state"]["is_trained"] = False
@@ -458,9 +460,9 @@ def start_reward_training():
                     app_state["reward_state"]["is_training"] = False
                     app_state["reward_state"]["is_trained"] = True
                     app_state["reward_state"]["metrics"] = result
-                print("[REWARD] Phase 2 training complete")
+                _log.info("[REWARD] Phase 2 training complete")
             except Exception as exc:
-                import traceback; traceback.print_exc()
+                _log.exception("[REWARD] training failed")
                 with state_lock:
                     app_state["reward_state"]["is_training"] = False
                     app_state["reward_state"]["is_trained"] = False
@@ -509,7 +511,7 @@ def compute_reward():
         if not app_state["llm_composer"]:
             return jsonify({"error": "LLM composer not initialized"}), 400
 
-        composer = app_state["llm_composer"]
+        composer = get_llm_composer()
         services = [
             composer.service_dict[sid] for sid in workflow
             if sid in composer.service_dict
@@ -619,9 +621,9 @@ def start_rl_training():
                     app_state["rl_state"]["is_training"] = False
                     app_state["rl_state"]["is_trained"] = True
                     app_state["rl_state"]["metrics"] = result
-                print(f"[RL] Phase 3 training complete ({algorithm})")
+                _log.info("[RL] Phase 3 training complete (%s)", algorithm)
             except Exception as exc:
-                import traceback; traceback.print_exc()
+                _log.exception("[RL] training failed")
                 with state_lock:
                     app_state["rl_state"]["is_training"] = False
                     app_state["rl_state"]["is_trained"] = False
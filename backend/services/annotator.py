@@ -9,18 +9,25 @@ Performance-optimised implementation:
   – Capped associations per service (top-K by weight → bounds object creation)
   – Pre-cached QoS scalars (avoids repeated attribute lookups)
   – Progress callback throttled (every 200 services, not every service)
-  – Parallel LLM calls via ThreadPoolExecutor (6 workers)
+  – Parallel LLM calls via ThreadPoolExecutor (sliding window, no batch barrier)
 """
 
+import hashlib
 import json
 import logging
 import os
+import re
+import tempfile
+import threading
 import requests
 import time
+from requests.adapters import HTTPAdapter
 from collections import defaultdict
 from datetime import datetime
+from functools import lru_cache
 from operator import itemgetter
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
 from models.annotation import (
     ServiceAnnotation,
     SNAssociation,
@@ -32,6 +39,16 @@ from models.annotation import (
 )
 from models.interaction_history import InteractionHistoryStore
 
+# orjson is an optional speed-up for serialising parsed LLM output into the log
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj, default=str).decode()
+except ImportError:  # pragma: no cover - stdlib fallback
+    def _dumps(obj):
+        return json.dumps(obj, default=str)
+
 # ---------------------------------------------------------------------------
 # Annotation log setup
 # ---------------------------------------------------------------------------
@@ -66,21 +83,139 @@ MAX_COLLAB_ASSOC = 30        # keep top-K collaboration associations per service
 MAX_SUBSTITUTION_ASSOC = 15  # keep top-K substitution associations per service
 COLLAB_WEIGHT_THRESHOLD = 0.3
 SUBSTITUTION_OVERLAP = 0.7
+OLLAMA_POOL_SIZE = 50        # keep-alive connections (matches the max_workers cap)
+# Decoding options: the reply is a short JSON object, so decode greedily,
+# cap the output and keep the context window just large enough for the
+# (grouped) prompt — fewer decoded tokens and a smaller KV cache per call.
+LLM_TEMPERATURE = 0.0
+LLM_NUM_CTX = 2048           # minimum; grown for large grouped prompts
+LLM_NUM_PREDICT = 192        # output tokens per service in the reply
+
+# ---------------------------------------------------------------------------
+# LLM prompt constants (service-independent parts built once at import)
+# ---------------------------------------------------------------------------
+_LLM_PROMPT_TMPL = """Analyze this web service and provide ALL annotations in a single JSON response.
+
+Service ID: {sid}
+Inputs: {n_in}
+Outputs: {n_out}
+QoS:
+- Reliability: {rel}%
+- Availability: {avl}%
+- Response Time: {rt}ms
+- Compliance: {comp}%
+- Best Practices: {bp}%
+Compatible services: {n_compat}
+
+Respond ONLY with JSON (no markdown, no explanation):
+"""
+_LLM_GROUP_ITEM_TMPL = "- Service ID: {sid} | Inputs: {n_in} | Outputs: {n_out} | Reliability: {rel}% | Availability: {avl}% | Response Time: {rt}ms | Compliance: {comp}% | Best Practices: {bp}% | Compatible services: {n_compat}"
+_LLM_GROUP_TMPL = """Analyze each of the following {n} web services and provide ALL annotations for every one of them.
+
+{services}
+
+Respond ONLY with JSON (no markdown, no explanation) of the form
+{{"annotations": [one entry per service]}} where each entry is:
+{entry}"""
+_SCHEMA_INTERACTION = '"interaction": {{"role": "orchestrator" or "worker" or "aggregator", "can_call_count": number (0-{max_call}), "collaboration_level": "high" or "medium" or "low"}}'
+_SCHEMA_CONTEXT = '"context": {"context_aware": true or false, "location_sensitive": true or false, "time_critical": "high" or "medium" or "low"}'
+_SCHEMA_POLICY = '"policy": {"gdpr_compliant": true or false, "security_level": "high" or "medium" or "low", "data_retention_days": 30 or 90 or 180 or 365, "encryption_required": true or false, "data_classification": "public" or "internal" or "confidential"}'
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_JSON_DECODER = json.JSONDecoder()
+_LLM_ROLES = {'orchestrator': 'orchestrator', 'worker': 'worker', 'aggregator': 'aggregator'}
+
+
+class _JsonCloseTracker:
+    """Incremental brace-depth scanner that ignores braces inside strings.
+
+    ``feed`` returns True once the first top-level ``{...}`` has closed.
+    """
+    __slots__ = ('depth', 'started', 'in_str', 'escape')
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_str = False
+        self.escape = False
+
+    def feed(self, text):
+        for ch in text:
+            if self.in_str:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_str = False
+            elif ch == '"':
+                if self.started:
+                    self.in_str = True
+            elif ch == '{':
+                self.depth += 1
+                self.started = True
+            elif ch == '}' and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+
+def _num_ctx(prompt, max_tokens):
+    """Smallest power-of-two context (>= LLM_NUM_CTX) holding prompt + reply.
+    ~3 chars per token over-estimates the prompt, which is the safe side."""
+    need = len(prompt) // 3 + max_tokens
+    ctx = LLM_NUM_CTX
+    while ctx < need:
+        ctx *= 2
+    return ctx
+
+
+@lru_cache(maxsize=64)
+def _llm_schema(need_interaction, need_context, need_policy, max_call):
+    """JSON schema tail of the prompt; only a handful of distinct variants exist."""
+    parts = []
+    if need_interaction:
+        parts.append(_SCHEMA_INTERACTION.format(max_call=max_call))
+    if need_context:
+        parts.append(_SCHEMA_CONTEXT)
+    if need_policy:
+        parts.append(_SCHEMA_POLICY)
+    return '{' + ', '.join(parts) + '}'
 
 
 class ServiceAnnotator:
     def __init__(self, services=None, ollama_url="http://localhost:11434",
-                 training_examples=None, interaction_store: InteractionHistoryStore = None):
+                 training_examples=None, interaction_store: InteractionHistoryStore = None,
+                 cache_dir=None, keep_alive="30m", model="llama3.2:3b"):
         self.log = _make_annotation_logger()
         self.services = services or []
         self.service_dict = {s.id: s for s in self.services}
         self.ollama_url = ollama_url
-        self.model = "llama3.2:3b"
+        self.model = model
+        # One keep-alive session shared by all worker threads: avoids a new
+        # TCP handshake per Ollama call during bulk LLM annotation.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=OLLAMA_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
+        # How long Ollama keeps the model resident after each request
+        self.keep_alive = keep_alive
+        # Optional on-disk cache of Ollama responses keyed by request content
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        # Cache keys with an Ollama call in flight -> [Event set when it
+        # ends, its reply], so identical prompts on other workers wait for
+        # that reply instead of re-asking (with or without the disk cache)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
         self.log.info("="*80)
         self.log.info("ServiceAnnotator INITIALISED")
         self.log.info("  Total services loaded : %d", len(self.services))
         self.log.info("  Ollama URL            : %s", self.ollama_url)
         self.log.info("  Model                 : %s", self.model)
+        self.log.info("  Response cache        : %s", self.cache_dir or "disabled")
 
         # Interaction history store — single source of truth for annotations
         self.history_store = interaction_store or InteractionHistoryStore()
@@ -182,7 +317,7 @@ class ServiceAnnotator:
     # ====================================================================
     def annotate_all(self, service_ids=None, use_llm=False, annotation_types=None,
                      progress_callback=None, max_workers=10, batch_size=5,
-                     skip_annotated=False):
+                     skip_annotated=False, services_per_call=1):
         if annotation_types is None:
             annotation_types = ['interaction', 'context', 'policy']
 
@@ -194,6 +329,7 @@ class ServiceAnnotator:
         self.log.info("  max_workers       : %d", max_workers)
         self.log.info("  batch_size        : %d", batch_size)
         self.log.info("  skip_annotated    : %s", skip_annotated)
+        self.log.info("  services_per_call : %d", services_per_call)
         t_start = time.perf_counter()
 
         if service_ids:
@@ -206,7 +342,7 @@ class ServiceAnnotator:
             before = len(services_to_annotate)
             services_to_annotate = [
                 s for s in services_to_annotate
-                if not getattr(s, 'annotations', None)
+                if not self._is_fresh(s)
             ]
             self.log.info("  skip_annotated: filtered %d -> %d services",
                           before, len(services_to_annotate))
@@ -218,7 +354,8 @@ class ServiceAnnotator:
             self.log.info("  Delegating to LLM annotation path")
             return self._annotate_all_llm(services_to_annotate, annotation_types,
                                           progress_callback, max_workers=max_workers,
-                                          batch_size=batch_size)
+                                          batch_size=batch_size,
+                                          services_per_call=services_per_call)
 
         # ---------- Classic bulk path ----------
         self.log.info("-"*60)
@@ -544,6 +681,7 @@ class ServiceAnnotator:
                 a.association_weight = aw
                 assocs.append(a)
 
+            ann.history_stamp = self.history_store.get_interaction_count(sid)
             service.annotations = ann
             annotated.append(service)
 
@@ -564,45 +702,66 @@ class ServiceAnnotator:
     #  LLM ANNOTATION  (parallel I/O via ThreadPoolExecutor)
     # ====================================================================
     def _annotate_all_llm(self, services_to_annotate, annotation_types, progress_callback,
-                           max_workers=10, batch_size=50):
+                           max_workers=10, batch_size=50, services_per_call=1):
         total = len(services_to_annotate)
         annotated = []
         max_workers = max(1, min(max_workers, 50))
         batch_size = max(1, batch_size)
+        services_per_call = max(1, services_per_call)
         self.log.info("-"*60)
-        self.log.info("LLM BULK ANNOTATION  services=%d  workers=%d  batch_size=%d",
-                       total, max_workers, batch_size)
+        self.log.info("LLM BULK ANNOTATION  services=%d  workers=%d  batch_size=%d  per_call=%d",
+                       total, max_workers, batch_size, services_per_call)
         self.log.info("  annotation_types: %s", annotation_types)
         t_llm_start = time.perf_counter()
+        if total:
+            self.warmup()
 
-        def _do_one(service):
-            return self.annotate_service(service, use_llm=True, annotation_types=annotation_types)
+        def _do_unit(group, prepared):
+            if prepared is not None:
+                return [self.annotate_service(group[0], use_llm=True, annotation_types=annotation_types,
+                                              prepared=prepared)]
+            return self._annotate_group_llm(group, annotation_types)
 
         completed = 0
         errors = 0
 
-        # Process in batches: submit batch_size services, wait for all to
-        # finish, then move to the next batch.  Within each batch, up to
-        # max_workers calls run concurrently via the thread pool.
-        for batch_start in range(0, total, batch_size):
-            batch = services_to_annotate[batch_start:batch_start + batch_size]
-            batch_num = batch_start // batch_size + 1
-            total_batches = -(-total // batch_size)
-            self.log.info("  Batch %d/%d  (%d services)", batch_num, total_batches, len(batch))
-
-            with ThreadPoolExecutor(max_workers=max_workers) as pool:
-                future_to_svc = {pool.submit(_do_one, s): s for s in batch}
-                for future in as_completed(future_to_svc):
-                    svc = future_to_svc[future]
+        # Work unit = group of ``services_per_call`` services sharing one
+        # Ollama call (a single service when 1).
+        # Single-service prompts are prepared lazily on this (submitting)
+        # thread as each unit is handed out, i.e. while earlier calls are in
+        # flight, so a worker's critical path is the Ollama round-trip only.
+        def _units():
+            for i in range(0, total, services_per_call):
+                group = services_to_annotate[i:i + services_per_call]
+                prepared = self._prepare_llm(group[0], annotation_types) if len(group) == 1 else None
+                yield group, prepared
+
+        units = _units()
+
+        # One pool for the whole run with a sliding submission window:
+        # as soon as any call returns, the next unit is submitted, so
+        # workers never idle behind the slowest call of a batch.
+        # ``batch_size`` only bounds how many futures are in flight.
+        window = max(batch_size, max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = {pool.submit(_do_unit, g, prep): g for g, prep in islice(units, window)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    group = pending.pop(future)
                     try:
                         future.result()
                     except Exception as exc:
                         errors += 1
-                        self.log.error("LLM annotation EXCEPTION for %s: %s", svc.id, exc)
-                    annotated.append(svc)
-                    completed += 1
-                    if progress_callback:
-                        progress_callback(completed, total, svc.id)
+                        self.log.error("LLM annotation EXCEPTION for %s: %s", [s.id for s in group], exc)
+                    for svc in group:
+                        annotated.append(svc)
+                        completed += 1
+                        if progress_callback:
+                            progress_callback(completed, total, svc.id)
+                    nxt = next(units, None)
+                    if nxt is not None:
+                        pending[pool.submit(_do_unit, *nxt)] = nxt[0]
 
         t_llm_end = time.perf_counter()
         self.log.info("LLM BULK ANNOTATION FINISHED  time=%.3f s  annotated=%d  errors=%d",
@@ -613,7 +772,7 @@ class ServiceAnnotator:
     # ====================================================================
     #  SINGLE-SERVICE ANNOTATION (used by LLM path & individual calls)
     # ====================================================================
-    def annotate_service(self, service, use_llm=False, annotation_types=None):
+    def annotate_service(self, service, use_llm=False, annotation_types=None, prepared=None):
         if annotation_types is None:
             annotation_types = ['interaction', 'context', 'policy']
 
@@ -625,7 +784,7 @@ class ServiceAnnotator:
         annotation.social_node.state = "active"
 
         if use_llm:
-            annotation = self._annotate_with_llm(service, annotation_types)
+            annotation = self._annotate_with_llm(service, annotation_types, prepared)
         else:
             if 'interaction' in annotation_types:
                 annotation.interaction = self._generate_interaction_annotations(service)
@@ -634,15 +793,30 @@ class ServiceAnnotator:
             if 'policy' in annotation_types:
                 annotation.policy = self._generate_policy_annotations(service)
 
-        self._calculate_social_properties(service, annotation)
-        self._build_social_associations(service, annotation)
-
-        service.annotations = annotation
+        self._finish_annotation(service, annotation)
         self.log.info("  annotate_service(%s) DONE in %.3f s  associations=%d",
                        service.id, time.perf_counter() - t0,
                        len(annotation.social_node.associations))
         return service
 
+    def _is_fresh(self, service):
+        """True when *service* has an annotation that is still current: it
+        was produced from the same interaction history the store holds now.
+        Annotations of unknown origin are kept (previous skip behaviour)."""
+        ann = getattr(service, 'annotations', None)
+        if not ann:
+            return False
+        stamp = getattr(ann, 'history_stamp', None)
+        return stamp is None or stamp == self.history_store.get_interaction_count(service.id)
+
+    def _finish_annotation(self, service, annotation):
+        """Attach social properties/associations and store the annotation."""
+        annotation.history_stamp = self.history_store.get_interaction_count(service.id)
+        self._calculate_social_properties(service, annotation)
+        self._build_social_associations(service, annotation)
+        service.annotations = annotation
+        return service
+
     # --------  helpers kept for single-service / LLM fallback  --------
 
     def _calculate_social_properties(self, service, annotation):
@@ -835,13 +1009,113 @@ class ServiceAnnotator:
     # ====================================================================
     #  LLM ANNOTATION HELPERS — SINGLE COMBINED PROMPT PER SERVICE
     # ====================================================================
-    def _annotate_with_llm(self, service, annotation_types):
-        """Annotate using ONE combined LLM call instead of 3 separate calls."""
+    def _annotate_group_llm(self, services, annotation_types):
+        """Annotate several services with ONE LLM call (JSON mode).
+
+        The response is expected as ``{"annotations": [{"service_id": ..,
+        <sections>}, ..]}``.  Services missing from a parseable response, or
+        the whole group when the response cannot be parsed, are re-annotated
+        one at a time through the single-service path.
+        """
+        if len(services) == 1:
+            return [self.annotate_service(services[0], use_llm=True, annotation_types=annotation_types)]
+
+        t_grp = time.perf_counter()
+        need_interaction = 'interaction' in annotation_types
+        need_context = 'context' in annotation_types
+        need_policy = 'policy' in annotation_types
+        compat = {s.id: self._compatible_services(s) for s in services}
+
+        entry_schema = '{"service_id": "<id>", ' + _llm_schema(need_interaction, need_context, need_policy, 5)[1:]
+        blocks = []
+        for s in services:
+            q = s.qos
+            blocks.append(_LLM_GROUP_ITEM_TMPL.format(
+                sid=s.id, n_in=len(s.inputs), n_out=len(s.outputs),
+                rel=q.reliability, avl=q.availability, rt=q.response_time,
+                comp=q.compliance, bp=q.best_practices, n_compat=len(compat[s.id]),
+            ))
+        prompt = _LLM_GROUP_TMPL.format(n=len(services), services="\n".join(blocks), entry=entry_schema)
+        self.log.info("  _annotate_group_llm(%s)  types=%s  prompt_len=%d",
+                      [s.id for s in services], annotation_types, len(prompt))
+
+        by_id = {}
+        try:
+            data = self._extract_json(self._call_ollama(
+                prompt, json_mode=True, max_tokens=LLM_NUM_PREDICT * len(services)))
+            for entry in (data or {}).get('annotations', []):
+                if isinstance(entry, dict) and entry.get('service_id') in compat:
+                    by_id[entry['service_id']] = entry
+        except Exception as e:
+            self.log.warning("    Group LLM call failed for %d services: %s — single-service mode", len(services), e)
+
+        result = []
+        for s in services:
+            entry = by_id.get(s.id)
+            if entry is None:
+                result.append(self.annotate_service(s, use_llm=True, annotation_types=annotation_types))
+                continue
+            annotation = ServiceAnnotation(s.id)
+            self._apply_llm_sections(s, annotation, entry, annotation_types, compat[s.id])
+            result.append(self._finish_annotation(s, annotation))
+        self.log.info("  _annotate_group_llm DONE in %.3f s  parsed=%d/%d",
+                      time.perf_counter() - t_grp, len(by_id), len(services))
+        return result
+
+    def _prepare_llm(self, service, annotation_types):
+        """CPU-side work for one LLM call: compatible services + prompt."""
+        compatible_services = self._compatible_services(service)
+        # Build a single combined prompt from the precomputed skeleton
+        q = service.qos
+        prompt = _LLM_PROMPT_TMPL.format(
+            sid=service.id, n_in=len(service.inputs), n_out=len(service.outputs),
+            rel=q.reliability, avl=q.availability, rt=q.response_time,
+            comp=q.compliance, bp=q.best_practices, n_compat=len(compatible_services),
+        ) + _llm_schema('interaction' in annotation_types, 'context' in annotation_types,
+                        'policy' in annotation_types, min(len(compatible_services), 5))
+        return compatible_services, prompt
+
+    def _annotate_with_llm(self, service, annotation_types, prepared=None):
+        """Annotate using ONE combined LLM call instead of 3 separate calls.
+
+        *prepared* is an optional ``(compatible_services, prompt)`` pair
+        built ahead of time by :meth:`_prepare_llm`.
+        """
         self.log.info("  _annotate_with_llm(%s)  types=%s", service.id, annotation_types)
         t_llm = time.perf_counter()
         annotation = ServiceAnnotation(service.id)
 
-        # Index-based compatible service lookup (O(degree))
+        compatible_services, prompt = prepared or self._prepare_llm(service, annotation_types)
+        self.log.debug("    PROMPT (len=%d):\n%s", len(prompt), prompt)
+
+        data = None
+        try:
+            t_call = time.perf_counter()
+            response = self._call_ollama(prompt, json_mode=True)
+            t_resp = time.perf_counter()
+            self.log.info("    Ollama response received in %.3f s  (len=%d)", t_resp - t_call, len(response) if response else 0)
+            self.log.debug("    RAW RESPONSE:\n%s", response)
+            data = self._extract_json(response)
+            if self.log.isEnabledFor(logging.DEBUG):
+                self.log.debug("    Parsed JSON: %s", _dumps(data) if data else "NONE")
+            if not data:
+                raise ValueError("LLM returned no parseable JSON")
+        except Exception as e:
+            self.log.warning("    LLM FALLBACK for %s: %s — reverting to classic annotation", service.id, e)
+            data = None
+
+        fallback = self._apply_llm_sections(service, annotation, data, annotation_types, compatible_services)
+
+        if fallback:
+            self.log.info("    _annotate_with_llm(%s) FALLBACK COMPLETE in %.3f s  sections=%s",
+                          service.id, time.perf_counter() - t_llm, fallback)
+        else:
+            self.log.info("    _annotate_with_llm(%s) SUCCESS in %.3f s", service.id, time.perf_counter() - t_llm)
+
+        return annotation
+
+    def _compatible_services(self, service):
+        """Index-based compatible service lookup (O(degree))."""
         compatible_services = []
         seen = set()
         svc_outs = self._service_output_sets.get(service.id, frozenset())
@@ -855,145 +1129,184 @@ class ServiceAnnotator:
         if compatible_services:
             top3 = sorted(compatible_services, key=lambda x: x['match_score'], reverse=True)[:3]
             self.log.debug("    Top-3 compatible: %s", [(c['id'], c['match_score']) for c in top3])
+        return compatible_services
+
+    def _apply_llm_sections(self, service, annotation, data, annotation_types, compatible_services):
+        """Fill the requested sections of *annotation* from parsed LLM *data*.
+
+        Each section is applied independently: one the LLM omitted or
+        malformed falls back to its classic generator without discarding
+        the sections that did parse.  Returns the names of fallback sections.
+        """
+        sections = (
+            ('interaction', self._apply_interaction, self._generate_interaction_annotations),
+            ('context', self._apply_context, self._generate_context_annotations),
+            ('policy', self._apply_policy, self._generate_policy_annotations),
+        )
+        fallback = []
+        for key, apply_section, classic in sections:
+            if key not in annotation_types:
+                continue
+            if data is not None:
+                try:
+                    setattr(annotation, key, apply_section(service, data.get(key, data), compatible_services))
+                    continue
+                except Exception as e:
+                    self.log.warning("    LLM %s section unusable for %s: %s — classic fallback", key, service.id, e)
+            setattr(annotation, key, classic(service))
+            fallback.append(key)
+        return fallback
+
+    def _apply_interaction(self, service, i_data, compatible_services):
+        """Build an InteractionAnnotation from the LLM 'interaction' section."""
+        interaction = InteractionAnnotation()
+        interaction.role = _LLM_ROLES.get(str(i_data.get('role', '')).lower(), 'worker')
+        n = min(int(i_data.get('can_call_count', 3)), len(compatible_services))
+        top = sorted(compatible_services, key=lambda x: x['match_score'], reverse=True)
+        interaction.can_call = [s['id'] for s in top[:n]]
+        interaction.collaboration_associations = interaction.can_call.copy()
+        collab_counts = self.history_store.get_collaboration_counts(service.id)
+        interaction.collaboration_history = {
+            sid: collab_counts.get(sid, 0)
+            for sid in interaction.can_call[:10]
+        }
+        self.log.debug("    LLM Interaction: role=%s  can_call=%d  collab_history=%d",
+                       interaction.role, len(interaction.can_call), len(interaction.collaboration_history))
+        return interaction
 
-        need_interaction = 'interaction' in annotation_types
-        need_context = 'context' in annotation_types
-        need_policy = 'policy' in annotation_types
-
-        # Build a single combined prompt
-        prompt = f"""Analyze this web service and provide ALL annotations in a single JSON response.
+    def _apply_context(self, service, c_data, compatible_services):
+        """Build a ContextAnnotation from the LLM 'context' section."""
+        ctx = ContextAnnotation()
+        ctx.context_aware = c_data.get('context_aware', False)
+        ctx.location_sensitive = c_data.get('location_sensitive', False)
+        ctx.time_critical = c_data.get('time_critical', 'medium')
+        ctx.interaction_count = self.history_store.get_interaction_count(service.id)
+        ctx.usage_patterns = self.history_store.get_usage_patterns(service.id) or []
+        ctx.last_used = self.history_store.get_last_used(service.id) or datetime.now().isoformat()
+        obs_ctx = self.history_store.get_observed_contexts(service.id)
+        env_reqs = []
+        obs_nets = obs_ctx.get('networks', {})
+        if 'vpn' in obs_nets or service.qos.compliance > 80:
+            env_reqs.append('vpn')
+        if obs_nets.get('ethernet', 0) > obs_nets.get('wifi', 0) or service.qos.compliance > 85:
+            env_reqs.append('secure_network')
+        ctx.environmental_requirements = env_reqs
+        self.log.debug("    LLM Context: aware=%s  loc_sensitive=%s  time_critical=%s  interaction_count=%d  env_reqs=%s",
+                       ctx.context_aware, ctx.location_sensitive, ctx.time_critical, ctx.interaction_count, env_reqs)
+        return ctx
 
-Service ID: {service.id}
-Inputs: {len(service.inputs)}
-Outputs: {len(service.outputs)}
-QoS:
-- Reliability: {service.qos.reliability}%
-- Availability: {service.qos.availability}%
-- Response Time: {service.qos.response_time}ms
-- Compliance: {service.qos.compliance}%
-- Best Practices: {service.qos.best_practices}%
-Compatible services: {len(compatible_services)}
+    def _apply_policy(self, service, p_data, compatible_services):
+        """Build a PolicyAnnotation from the LLM 'policy' section."""
+        policy = PolicyAnnotation()
+        policy.gdpr_compliant = p_data.get('gdpr_compliant', True)
+        policy.security_level = p_data.get('security_level', 'medium')
+        policy.data_retention_days = int(p_data.get('data_retention_days', 30))
+        policy.encryption_required = p_data.get('encryption_required', False)
+        policy.data_classification = p_data.get('data_classification', 'internal')
+        policy.privacy_policy = "encrypted" if policy.encryption_required else "standard"
+        if service.qos.compliance > 85:
+            policy.compliance_standards = ["ISO27001", "SOC2"]
+        elif service.qos.compliance > 70:
+            policy.compliance_standards = ["ISO27001"]
+        self.log.debug("    LLM Policy: gdpr=%s  security=%s  retention=%dd  encryption=%s  classification=%s  standards=%s",
+                       policy.gdpr_compliant, policy.security_level, policy.data_retention_days,
+                       policy.encryption_required, policy.data_classification,
+                       policy.compliance_standards if hasattr(policy, 'compliance_standards') else [])
+        return policy
 
-Respond ONLY with JSON (no markdown, no explanation):
-{{"""
+    # ====================================================================
+    #  OLLAMA HELPERS
+    # ====================================================================
+    def close(self):
+        """Release pooled HTTP connections to Ollama."""
+        self.session.close()
 
-        json_parts = []
-        if need_interaction:
-            json_parts.append(f'"interaction": {{"role": "orchestrator" or "worker" or "aggregator", "can_call_count": number (0-{min(len(compatible_services), 5)}), "collaboration_level": "high" or "medium" or "low"}}')
-        if need_context:
-            json_parts.append('"context": {"context_aware": true or false, "location_sensitive": true or false, "time_critical": "high" or "medium" or "low"}')
-        if need_policy:
-            json_parts.append('"policy": {"gdpr_compliant": true or false, "security_level": "high" or "medium" or "low", "data_retention_days": 30 or 90 or 180 or 365, "encryption_required": true or false, "data_classification": "public" or "internal" or "confidential"}')
+    def __enter__(self):
+        return self
 
-        prompt += ', '.join(json_parts) + '}'
-        self.log.debug("    PROMPT (len=%d):\n%s", len(prompt), prompt)
+    def __exit__(self, *exc):
+        self.close()
+        return False
 
+    def warmup(self):
+        """Load the model once before a bulk run so the first real call
+        does not pay the cold-start cost; ``keep_alive`` keeps it resident.
+        Failures are logged only — annotation falls back per service."""
+        t0 = time.perf_counter()
         try:
-            t_call = time.perf_counter()
-            response = self._call_ollama(prompt)
-            t_resp = time.perf_counter()
-            self.log.info("    Ollama response received in %.3f s  (len=%d)", t_resp - t_call, len(response) if response else 0)
-            self.log.debug("    RAW RESPONSE:\n%s", response)
-            data = self._extract_json(response)
-            self.log.debug("    Parsed JSON: %s", json.dumps(data, default=str) if data else "NONE")
-            if data:
-                # --- Interaction ---
-                if need_interaction:
-                    i_data = data.get('interaction', data)  # fallback to flat if no nesting
-                    interaction = InteractionAnnotation()
-                    interaction.role = {'orchestrator': 'orchestrator', 'worker': 'worker', 'aggregator': 'aggregator'}.get(
-                        str(i_data.get('role', '')).lower(), 'worker'
-                    )
-                    n = min(i_data.get('can_call_count', 3), len(compatible_services))
-                    top = sorted(compatible_services, key=lambda x: x['match_score'], reverse=True)
-                    interaction.can_call = [s['id'] for s in top[:n]]
-                    interaction.collaboration_associations = interaction.can_call.copy()
-                    collab_counts = self.history_store.get_collaboration_counts(service.id)
-                    interaction.collaboration_history = {
-                        sid: collab_counts.get(sid, 0)
-                        for sid in interaction.can_call[:10]
-                    }
-                    annotation.interaction = interaction
-                    self.log.debug("    LLM Interaction: role=%s  can_call=%d  collab_history=%d",
-                                   interaction.role, len(interaction.can_call), len(interaction.collaboration_history))
-
-                # --- Context ---
-                if need_context:
-                    c_data = data.get('context', data)
-                    ctx = ContextAnnotation()
-                    ctx.context_aware = c_data.get('context_aware', False)
-                    ctx.location_sensitive = c_data.get('location_sensitive', False)
-                    ctx.time_critical = c_data.get('time_critical', 'medium')
-                    ctx.interaction_count = self.history_store.get_interaction_count(service.id)
-                    ctx.usage_patterns = self.history_store.get_usage_patterns(service.id) or []
-                    ctx.last_used = self.history_store.get_last_used(service.id) or datetime.now().isoformat()
-                    obs_ctx = self.history_store.get_observed_contexts(service.id)
-                    env_reqs = []
-                    obs_nets = obs_ctx.get('networks', {})
-                    if 'vpn' in obs_nets or service.qos.compliance > 80:
-                        env_reqs.append('vpn')
-                    if obs_nets.get('ethernet', 0) > obs_nets.get('wifi', 0) or service.qos.compliance > 85:
-                        env_reqs.append('secure_network')
-                    ctx.environmental_requirements = env_reqs
-                    annotation.context = ctx
-                    self.log.debug("    LLM Context: aware=%s  loc_sensitive=%s  time_critical=%s  interaction_count=%d  env_reqs=%s",
-                                   ctx.context_aware, ctx.location_sensitive, ctx.time_critical, ctx.interaction_count, env_reqs)
-
-                # --- Policy ---
-                if need_policy:
-                    p_data = data.get('policy', data)
-                    policy = PolicyAnnotation()
-                    policy.gdpr_compliant = p_data.get('gdpr_compliant', True)
-                    policy.security_level = p_data.get('security_level', 'medium')
-                    policy.data_retention_days = p_data.get('data_retention_days', 30)
-                    policy.encryption_required = p_data.get('encryption_required', False)
-                    policy.data_classification = p_data.get('data_classification', 'internal')
-                    policy.privacy_policy = "encrypted" if policy.encryption_required else "standard"
-                    if service.qos.compliance > 85:
-                        policy.compliance_standards = ["ISO27001", "SOC2"]
-                    elif service.qos.compliance > 70:
-                        policy.compliance_standards = ["ISO27001"]
-                    annotation.policy = policy
-                    self.log.debug("    LLM Policy: gdpr=%s  security=%s  retention=%dd  encryption=%s  classification=%s  standards=%s",
-                                   policy.gdpr_compliant, policy.security_level, policy.data_retention_days,
-                                   policy.encryption_required, policy.data_classification,
-                                   policy.compliance_standards if hasattr(policy, 'compliance_standards') else [])
-            else:
-                raise ValueError("LLM returned no parseable JSON")
-
-            self.log.info("    _annotate_with_llm(%s) SUCCESS in %.3f s", service.id, time.perf_counter() - t_llm)
-
-        except Exception as e:
-            self.log.warning("    LLM FALLBACK for %s: %s — reverting to classic annotation", service.id, e)
-            if need_interaction:
-                annotation.interaction = self._generate_interaction_annotations(service)
-                self.log.debug("    Fallback interaction: role=%s  can_call=%d", annotation.interaction.role, len(annotation.interaction.can_call))
-            if need_context:
-                annotation.context = self._generate_context_annotations(service)
-                self.log.debug("    Fallback context: aware=%s  adaptation_score=%.3f", annotation.context.context_aware, annotation.context.context_adaptation_score)
-            if need_policy:
-                annotation.policy = self._generate_policy_annotations(service)
-                self.log.debug("    Fallback policy: gdpr=%s  security=%s", annotation.policy.gdpr_compliant, annotation.policy.security_level)
-            self.log.info("    _annotate_with_llm(%s) FALLBACK COMPLETE in %.3f s", service.id, time.perf_counter() - t_llm)
-
-        return annotation
+            response = self.session.post(
+                f"{self.ollama_url}/api/generate",
+                json={"model": self.model, "prompt": "warmup", "stream": False,
+                      "keep_alive": self.keep_alive, "options": {"num_predict": 1}},
+                timeout=120,
+            )
+            self.log.info("  Ollama warmup: HTTP %d in %.3f s", response.status_code, time.perf_counter() - t0)
+            return response.status_code == 200
+        except requests.exceptions.RequestException as e:
+            self.log.warning("  Ollama warmup failed: %s", e)
+            return False
 
-    # ====================================================================
-    #  OLLAMA HELPERS
-    # ====================================================================
-    def _call_ollama(self, prompt):
+    def _call_ollama(self, prompt, json_mode=False, max_tokens=LLM_NUM_PREDICT):
         self.log.debug("    _call_ollama: POST %s/api/generate  model=%s  prompt_len=%d", self.ollama_url, self.model, len(prompt))
+        payload = {
+            "model": self.model, "prompt": prompt, "stream": True,
+            "options": {"temperature": LLM_TEMPERATURE, "top_p": 0.9,
+                        "num_ctx": _num_ctx(prompt, max_tokens), "num_predict": max_tokens},
+        }
+        if json_mode:
+            payload["format"] = "json"   # Ollama constrains decoding to valid JSON
+        cache_key = self._cache_key(payload)
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive   # not part of the cache key
+
+        if self.cache_dir:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self.log.debug("    _call_ollama: cache HIT %s", cache_key)
+                return cached
+        with self._inflight_lock:
+            call = self._inflight.get(cache_key)
+            owner = call is None
+            if owner:
+                call = self._inflight[cache_key] = [threading.Event(), None]
+        if not owner:
+            # Same request already in flight: reuse its reply, and only
+            # call Ollama ourselves if that call failed
+            call[0].wait()
+            if call[1] is not None:
+                self.log.debug("    _call_ollama: shared in-flight reply %s", cache_key)
+                return call[1]
+            return self._generate(payload)
         try:
-            response = requests.post(
+            text = call[1] = self._generate(payload)
+            if self.cache_dir:
+                self._cache_put(cache_key, text)
+            return text
+        finally:
+            with self._inflight_lock:
+                del self._inflight[cache_key]
+            call[0].set()
+
+    def _generate(self, payload):
+        """POST *payload* to /api/generate and return the streamed reply."""
+        try:
+            response = self.session.post(
                 f"{self.ollama_url}/api/generate",
-                json={"model": self.model, "prompt": prompt, "stream": False, "options": {"temperature": 0.3, "top_p": 0.9}},
+                json=payload,
                 timeout=30,
+                stream=True,
             )
-            self.log.debug("    _call_ollama: HTTP %d  response_len=%d", response.status_code, len(response.text))
-            if response.status_code == 200:
-                return response.json()['response']
-            self.log.error("    _call_ollama: non-200 status %d  body=%s", response.status_code, response.text[:500])
-            raise Exception(f"Ollama API error: {response.status_code}")
+            try:
+                if response.status_code != 200:
+                    self.log.error("    _call_ollama: non-200 status %d  body=%s", response.status_code, response.text[:500])
+                    raise Exception(f"Ollama API error: {response.status_code}")
+                text = self._read_stream(response)
+            finally:
+                # Closing mid-stream drops the connection, which makes Ollama
+                # stop generating the tokens we no longer need.
+                response.close()
+            self.log.debug("    _call_ollama: HTTP %d  response_len=%d", response.status_code, len(text))
+            return text
         except requests.exceptions.ConnectionError as ce:
             self.log.error("    _call_ollama: ConnectionError — %s", ce)
             raise Exception("Cannot connect to Ollama. Is it running?")
@@ -1001,18 +1314,73 @@ Respond ONLY with JSON (no markdown, no explanation):
             self.log.error("    _call_ollama: Exception — %s", e)
             raise Exception(f"Ollama error: {str(e)}")
 
-    def _extract_json(self, text):
+    def _read_stream(self, response):
+        """Accumulate a streamed /api/generate reply, stopping as soon as the
+        first top-level JSON object is closed (anything after it is unused)."""
+        parts = []
+        tracker = _JsonCloseTracker()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            piece = chunk.get('response', '')
+            parts.append(piece)
+            if tracker.feed(piece):
+                self.log.debug("    _call_ollama: JSON closed — stream stopped early")
+                break
+            if chunk.get('done'):
+                break
+        return ''.join(parts)
+
+    # --------  response cache  --------
+
+    @staticmethod
+    def _cache_key(payload):
+        """Content hash of everything that determines the model output."""
+        blob = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+    def _cache_get(self, key):
+        path = os.path.join(self.cache_dir, f"{key}.json")
         try:
-            start = text.find('{')
-            end = text.rfind('}') + 1
-            if start != -1 and end > start:
-                json_str = text[start:end]
-                self.log.debug("    _extract_json: extracted chars [%d:%d] (len=%d)", start, end, len(json_str))
-                parsed = json.loads(json_str)
-                self.log.debug("    _extract_json: parsed OK  keys=%s", list(parsed.keys()) if isinstance(parsed, dict) else type(parsed).__name__)
-                return parsed
-            self.log.warning("    _extract_json: no JSON braces found in response (len=%d)", len(text) if text else 0)
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)["response"]
+        except (OSError, ValueError, KeyError):
             return None
-        except Exception as je:
-            self.log.error("    _extract_json: JSON parse error — %s  text_snippet=%s", je, text[:200] if text else '')
+
+    def _cache_put(self, key, text):
+        """Write atomically so concurrent workers never read a partial file."""
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model, "response": text}, f)
+            os.replace(tmp, os.path.join(self.cache_dir, f"{key}.json"))
+        except OSError as e:
+            self.log.warning("    response cache write failed: %s", e)
+
+    def _extract_json(self, text):
+        """Return the first complete JSON object in an LLM reply.
+
+        Markdown fences are stripped, then ``raw_decode`` is tried from each
+        ``{`` in turn, so leading prose, stray braces or a second trailing
+        object do not spoil an otherwise valid answer.
+        """
+        if not text:
+            self.log.warning("    _extract_json: empty response")
             return None
+        fenced = _JSON_FENCE_RE.search(text)
+        if fenced:
+            text = fenced.group(1)
+        start = text.find('{')
+        while start != -1:
+            try:
+                parsed, end = _JSON_DECODER.raw_decode(text, start)
+            except ValueError:
+                start = text.find('{', start + 1)
+                continue
+            self.log.debug("    _extract_json: parsed chars [%d:%d]  keys=%s", start, end,
+                           list(parsed.keys()) if isinstance(parsed, dict) else type(parsed).__name__)
+            return parsed
+        self.log.warning("    _extract_json: no JSON object found in response (len=%d)  text_snippet=%s",
+                         len(text), text[:200])
+        return None
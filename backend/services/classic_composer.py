@@ -6,7 +6,7 @@ WITH full algorithm trace for step-by-step visualization
 
 import time
 import heapq
-from collections import defaultdict
+from services.service_index import ServiceIndex
 from models.service import CompositionResult, QoS
 from utils.qos_calculator import calculate_utility, aggregate_qos
 
@@ -15,21 +15,44 @@ ALGORITHM_TIMEOUT = 60
 
 
 class ClassicComposer:
-    def __init__(self, services):
+    def __init__(self, services, index=None):
         self.services = services
-        self.service_dict = {s.id: s for s in services}
 
-        # Pre-compute indexes for fast lookup
-        self._output_index = defaultdict(list)
-        self._input_index = defaultdict(list)
-        self._service_input_sets = {}
+        # Pre-computed indexes for fast lookup, possibly shared with the
+        # LLM composer over the same list
+        if index is None or index.services is not services:
+            index = ServiceIndex(services)
+        index.sync()  # a shared index may lag behind the list
+        self._index = index
+        self._indexed_count = len(services)
 
-        for s in services:
-            self._service_input_sets[s.id] = frozenset(s.inputs)
-            for out in s.outputs:
-                self._output_index[out].append(s)
-            for inp in s.inputs:
-                self._input_index[inp].append(s)
+    # Read through to the shared index, which swaps in new containers on
+    # every update (see ServiceIndex)
+    @property
+    def service_dict(self):
+        return self._index.service_dict
+
+    @property
+    def _output_index(self):
+        return self._index.output_index
+
+    @property
+    def _input_index(self):
+        return self._index.input_index
+
+    @property
+    def _service_input_sets(self):
+        return self._index.input_sets
+
+    def index_new_services(self):
+        """Index services appended to ``self.services`` since the last call.
+
+        Returns the number of services added.
+        """
+        self._index.sync()
+        added = len(self.services) - self._indexed_count
+        self._indexed_count = len(self.services)
+        return added
 
     def _get_relevant_services(self, request):
         """Pre-filter services using indexed forward+backward reachability.
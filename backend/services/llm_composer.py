@@ -14,8 +14,11 @@ import os
 import time
 import json
 import heapq
+import threading
 import requests as http_requests
+from requests.adapters import HTTPAdapter
 from collections import defaultdict
+from services.service_index import ServiceIndex
 from models.service import CompositionResult, QoS
 from utils.qos_calculator import calculate_utility, aggregate_qos
 
@@ -62,17 +65,23 @@ class LLMComposer:
     def __init__(self, services, training_examples=None,
                  ollama_url="http://localhost:11434",
                  sft_model_name=None,
-                 sft_output_dir=None):
+                 sft_output_dir=None, index=None):
         self.services = services
-        self.service_dict = {s.id: s for s in services}
         self.ollama_url = ollama_url
         self.model = "llama3.2:3b"
 
-        # Fast lookup indexes
-        self._output_index = defaultdict(list)
-        self._input_index = defaultdict(list)
-        self._service_input_sets = {}
-        self._build_indexes()
+        # Keep-alive session reused across Ollama calls (chat + selection)
+        self.session = http_requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Fast lookup indexes, possibly shared with the classic composer
+        if index is None or index.services is not services:
+            index = ServiceIndex(services)
+        index.sync()  # a shared index may lag behind the list
+        self._index = index
+        self._indexed_count = len(services)
 
         # Knowledge base populated during training
         self.knowledge_base = {
@@ -93,6 +102,9 @@ class LLMComposer:
         # SFT LoRA trainer (Phase 1 of QSRT)
         self.sft_trainer = None
         self.sft_dataset_builder = None
+        # The local SFT/RL models (and their fast tokenizers) are not safe to
+        # call from several threads; compose() may run on a pool (batch)
+        self._model_lock = threading.Lock()
         self.sft_metrics = {}           # metrics from real SFT training
         self._sft_model_name = sft_model_name
         self._sft_output_dir = sft_output_dir
@@ -193,18 +205,54 @@ class LLMComposer:
     # Index building
     # ------------------------------------------------------------------
 
-    def _build_indexes(self):
-        """Build fast lookup indexes for services."""
-        self._output_index.clear()
-        self._input_index.clear()
-        self._service_input_sets.clear()
+    # Read through to the shared index, which swaps in new containers on
+    # every update (see ServiceIndex)
+    @property
+    def service_dict(self):
+        return self._index.service_dict
+
+    @property
+    def _output_index(self):
+        return self._index.output_index
+
+    @property
+    def _input_index(self):
+        return self._index.input_index
+
+    @property
+    def _service_input_sets(self):
+        return self._index.input_sets
+
+    def index_new_services(self):
+        """Index services appended to ``self.services`` since the last call.
 
-        for s in self.services:
-            self._service_input_sets[s.id] = frozenset(s.inputs)
-            for out in s.outputs:
-                self._output_index[out].append(s)
-            for inp in s.inputs:
-                self._input_index[inp].append(s)
+        Training patterns carry the I/O signatures of their services, so
+        patterns naming a newly indexed service get its signature.  The
+        rest of the knowledge base (including rankings learned from past
+        compositions) is kept.  Returns the number of services added.
+        """
+        self._index.sync()
+        start = self._indexed_count
+        added = len(self.services) - start
+        self._indexed_count = len(self.services)
+        if added:
+            self._attach_service_ios({s.id for s in self.services[start:]})
+        return added
+
+    def _attach_service_ios(self, new_ids):
+        """Refresh ``service_ios`` of the patterns that mention *new_ids*.
+
+        Rebuilt in ``service_ids`` order, exactly as :meth:`train` would.
+        """
+        for pattern in self.knowledge_base['patterns']:
+            service_ids = pattern['service_ids']
+            if new_ids.isdisjoint(service_ids):
+                continue
+            pattern['service_ios'] = [
+                {'id': sid, 'inputs': svc.inputs, 'outputs': svc.outputs}
+                for sid in service_ids
+                for svc in (self.service_dict.get(sid),) if svc
+            ]
 
     # ------------------------------------------------------------------
     # Training
@@ -849,7 +897,8 @@ class LLMComposer:
                     request.to_dict(),
                     {s.id: s for s, _ in top},
                 ) if self.sft_dataset_builder else str(request.to_dict())
-                raw = self.rl_trainer.generate(instruction)
+                with self._model_lock:
+                    raw = self.rl_trainer.generate(instruction)
                 selected_id = self._extract_service_id_from_json(
                     raw, [s.id for s, _ in top]
                 )
@@ -865,7 +914,8 @@ class LLMComposer:
                     request.to_dict(),
                     {s.id: s for s, _ in top},
                 )
-                raw = self.sft_trainer.generate(instruction)
+                with self._model_lock:
+                    raw = self.sft_trainer.generate(instruction)
                 selected_id = self._extract_service_id_from_json(
                     raw, [s.id for s, _ in top]
                 )
@@ -1095,7 +1145,7 @@ class LLMComposer:
     def _call_ollama(self, prompt):
         """Call the Ollama API."""
         try:
-            resp = http_requests.post(
+            resp = self.session.post(
                 f"{self.ollama_url}/api/generate",
                 json={
                     "model": self.model,
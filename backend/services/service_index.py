@@ -0,0 +1,92 @@
+"""
+I/O lookup indexes over a services list, shared by the composers
+"""
+
+import threading
+from collections import defaultdict
+
+
+class ServiceIndex:
+    """Id, producer and consumer lookups for a list of services.
+
+    The classic and LLM composers need the same structures; building them
+    once and handing the index to both halves the work after an upload.
+
+    Updates are copy-on-write: ``sync`` and ``replace`` build new
+    containers and then rebind the attributes, so a ``compose()`` running
+    on another request thread never iterates a dict or list that is being
+    changed.  The id lookups are published before the producer/consumer
+    indexes, so every service a reader can reach through an index is
+    already in ``service_dict`` and ``input_sets``.  Readers must go
+    through the attributes (the composers expose them as properties)
+    rather than keep references across calls.
+    """
+
+    def __init__(self, services):
+        self.services = services
+        self.service_dict = {}
+        self.output_index = defaultdict(list)   # param -> services producing it
+        self.input_index = defaultdict(list)    # param -> services consuming it
+        self.input_sets = {}                    # sid -> frozenset(inputs)
+        self._indexed_count = 0
+        self._write_lock = threading.Lock()
+        self.sync()
+
+    def sync(self):
+        """Index services appended to ``self.services`` since the last call.
+
+        Uploads extend the shared services list in place, so only the new
+        tail needs indexing.  Returns the number of services added.
+        """
+        with self._write_lock:
+            new_services = self.services[self._indexed_count:]
+            if not new_services:
+                return 0
+            service_dict = dict(self.service_dict)
+            input_sets = dict(self.input_sets)
+            output_index = defaultdict(list, self.output_index)
+            input_index = defaultdict(list, self.input_index)
+            copied = (set(), set())  # params whose list is already a copy
+            for s in new_services:
+                service_dict[s.id] = s
+                input_sets[s.id] = frozenset(s.inputs)
+                for index, params, fresh in ((output_index, s.outputs, copied[0]),
+                                             (input_index, s.inputs, copied[1])):
+                    for param in params:
+                        if param not in fresh:
+                            index[param] = list(index.get(param, ()))
+                            fresh.add(param)
+                        index[param].append(s)
+            self._publish(service_dict, input_sets, output_index, input_index)
+            self._indexed_count += len(new_services)
+            return len(new_services)
+
+    def replace(self, services):
+        """Swap in new objects for already indexed services with the same ids.
+
+        Annotation may hand back fresh objects but never changes a
+        service's inputs or outputs, so only the entries under its own
+        parameters need updating, keeping lookup order.
+        """
+        with self._write_lock:
+            service_dict = dict(self.service_dict)
+            output_index = defaultdict(list, self.output_index)
+            input_index = defaultdict(list, self.input_index)
+            for s in services:
+                if s.id not in service_dict:
+                    continue  # not indexed yet: sync() will read the list entry
+                service_dict[s.id] = s
+                for index, params in ((output_index, s.outputs),
+                                      (input_index, s.inputs)):
+                    for param in params:
+                        if param in index:
+                            index[param] = [s if old.id == s.id else old
+                                            for old in index[param]]
+            self._publish(service_dict, self.input_sets, output_index, input_index)
+
+    def _publish(self, service_dict, input_sets, output_index, input_index):
+        # Id lookups first: see the class docstring
+        self.service_dict = service_dict
+        self.input_sets = input_sets
+        self.output_index = output_index
+        self.input_index = input_index
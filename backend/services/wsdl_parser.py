@@ -5,24 +5,170 @@ Complete corrected parser for Discovery & Composition
 Full replacement of backend/services/wsdl_parser.py.
 """
 
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
 import xml.etree.ElementTree as ET
 import re as _re
+from collections import OrderedDict
+from functools import lru_cache
+from lxml import etree
 from models.service import WebService, QoS
 
+logger = logging.getLogger(__name__)
+
+# iterparse options shared by all WSDLParser instances.  The input is always
+# UTF-8 (text is encoded, raw bytes are decoded as UTF-8 afterwards), so the
+# encoding is forced to match regardless of the XML declaration.
+_ITERPARSE_OPTS = dict(
+    events=('start', 'end'), encoding='utf-8', remove_blank_text=True,
+    remove_comments=True, remove_pis=True, resolve_entities=False, huge_tree=False,
+)
+
+# Patterns for _fix_unbound_prefixes, for str and raw bytes input:
+# declared prefixes, <prefix:tag, prefix:attr=, and the first opening tag
+_PREFIX_PATTERNS = {
+    kind: tuple(_re.compile(conv(p)) for p in (
+        r'xmlns:(\w+)\s*=',
+        r'<(\w+):',
+        r'(?<!xmlns)\s(\w+):\w+\s*=',
+        r'(<\w[\w:]*)([\s>])',
+    ))
+    for kind, conv in ((str, str), (bytes, str.encode))
+}
+
+# Leading BOM (which breaks the XML parser) plus whitespace, dropped with a
+# single slice so large uploads are not copied once per strip step
+_LEADING_JUNK = {
+    str: _re.compile('\ufeff?\\s*'),
+    bytes: _re.compile(rb'(?:\xef\xbb\xbf)?\s*'),
+}
+
+# Message-name keywords used to classify message parts
+_INPUT_KEYWORDS = ('request', 'input', 'in')
+_OUTPUT_KEYWORDS = ('response', 'output', 'out', 'result')
+
+_SERVICE_ID_RE = _re.compile(r'service(p\d+a\d+)')
+
+# <!-- QoS: {'ResponseTime': 82, ...} --> comments written by the dataset
+# generator.  Plain name -> number dicts are read with the pair pattern;
+# anything else goes through ast.literal_eval, which builds and compiles
+# a syntax tree per file.
+_QOS_COMMENT_RE = _re.compile(r'<!--\s*QoS:\s*({[^}]+})\s*-->')
+_QOS_NUMBER = r'[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?'
+_QOS_PAIR_RE = _re.compile(r"""(['"])(\w+)\1\s*:\s*(%s)""" % _QOS_NUMBER)
+_QOS_DICT_RE = _re.compile(
+    r"""\{\s*(?:(['"])\w+\1\s*:\s*%s\s*(?:,\s*|(?=\})))*\}""" % _QOS_NUMBER
+)
+
+# Order of the comma-separated <QoS> values in WSChallenge request routines
+_ROUTINE_QOS_KEYS = (
+    'ResponseTime', 'Availability', 'Throughput', 'Successability',
+    'Reliability', 'Compliance', 'BestPractices', 'Latency', 'Documentation',
+)
+
+# Part of every parse-cache key: bump when parsing rules change so entries
+# written by an older parser are never served
+_PARSE_CACHE_VERSION = b'2'
+
+# Paths whose parse result WSDLParser.parse_file keeps (least recently used
+# first out); each entry holds the full WSDL text
+FILE_CACHE_SIZE = 1024
+
+
+# The helpers below are pure and see a small set of distinct arguments
+# repeated across every document of a batch (the same WSDL tags, the same
+# message names), so they are memoised process-wide.
+
+@lru_cache(maxsize=4096)
+def _local_name(tag):
+    """'{ns}tag' -> 'tag'."""
+    return tag.rpartition('}')[2]
+
+
+# What _scan does with an element, by tag: the WSDL vocabulary it cares
+# about is fixed, so each distinct tag is classified once per process
+# instead of re-testing its suffixes on every element of every document.
+_OTHER, _MESSAGE, _PART, _QOS = range(4)
+
+
+@lru_cache(maxsize=4096)
+def _tag_kind(tag):
+    local = _local_name(tag)
+    if local.endswith('message'):
+        return _MESSAGE
+    if local.endswith('part'):
+        return _PART
+    if local.endswith('QoS'):
+        return _QOS
+    return _OTHER
+
+
+@lru_cache(maxsize=4096)
+def _message_direction(msg_name):
+    """(is_request, is_response, is_input, is_output) for a lower-cased message name."""
+    return (
+        'request' in msg_name,
+        'response' in msg_name,
+        any(keyword in msg_name for keyword in _INPUT_KEYWORDS),
+        any(keyword in msg_name for keyword in _OUTPUT_KEYWORDS),
+    )
+
 
 class WSDLParser:
-    def __init__(self):
+    def __init__(self, cache_dir=None):
         self.services = []
+        # filepath -> ((mtime_ns, size), parsed WebService template), LRU
+        # bounded by FILE_CACHE_SIZE; the parser is shared between threads
+        self._file_cache = OrderedDict()
+        self._file_cache_lock = threading.Lock()
+        # Optional on-disk cache of parse results keyed by content hash
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
     
     def parse_file(self, filepath):
-        """Parse a WSDL file"""
+        """Parse a WSDL file.
+
+        Results are memoised per path and invalidated when the file's mtime
+        or size changes; each call returns a fresh WebService so callers can
+        annotate it without affecting the cached copy.
+        """
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
+            st = os.stat(filepath)
+            stamp = (st.st_mtime_ns, st.st_size)
+            with self._file_cache_lock:
+                cached = self._file_cache.get(filepath)
+                if cached and cached[0] == stamp:
+                    self._file_cache.move_to_end(filepath)
+                    return self._copy_service(cached[1])
+            with open(filepath, 'rb') as f:
                 content = f.read()
-            return self.parse_content(content, filepath)
+            service = self.parse_content(content, filepath)
+            if service is not None:
+                with self._file_cache_lock:
+                    self._file_cache[filepath] = (stamp, service)
+                    self._file_cache.move_to_end(filepath)
+                    if len(self._file_cache) > FILE_CACHE_SIZE:
+                        self._file_cache.popitem(last=False)
+                return self._copy_service(service)
+            return None
         except Exception as e:
-            print(f"Error while parsing {filepath}: {e}")
+            logger.warning("Error while parsing %s: %s", filepath, e)
             return None
+
+    @staticmethod
+    def _copy_service(template):
+        service = WebService(template.id, template.name)
+        service.inputs = list(template.inputs)
+        service.outputs = list(template.outputs)
+        service.qos = QoS(template.qos.to_dict())
+        service.wsdl_content = template.wsdl_content
+        return service
     
     @staticmethod
     def _fix_unbound_prefixes(content):
@@ -33,15 +179,23 @@ class WSDLParser:
         ``ET.fromstring`` to raise *unbound prefix* errors.  This helper
         finds every ``prefix:`` usage inside tags and adds a dummy
         ``xmlns:prefix`` to the root element if it is missing.
+
+        *content* may be ``str`` or UTF-8 ``bytes``; the result has the
+        same type.
         """
+        is_bytes = isinstance(content, bytes)
+        declared_re, tag_re, attr_re, first_tag_re = _PREFIX_PATTERNS[type(content)]
+
         # Collect all prefixes already declared
-        declared = set(_re.findall(r'xmlns:(\w+)\s*=', content))
+        declared = set(declared_re.findall(content))
 
         # Collect all prefixes actually used in element/attribute names
         # Matches <prefix:tag or prefix:attr= but not xmlns:prefix=
-        used = set(_re.findall(r'<(\w+):', content))
-        used |= set(_re.findall(r'(?<!xmlns)\s(\w+):\w+\s*=', content))
+        used = set(tag_re.findall(content))
+        used |= set(attr_re.findall(content))
         used -= declared
+        if is_bytes:
+            used = {p.decode('ascii') for p in used}
         used.discard('xml')    # xml is always implicitly declared
         used.discard('xmlns')  # xmlns is reserved, never needs declaration
 
@@ -52,26 +206,90 @@ class WSDLParser:
         extra = " ".join(
             f'xmlns:{p}="urn:x-auto:{p}"' for p in sorted(used)
         )
+        replacement = rf'\1 {extra}\2'
 
         # Insert right after the first opening tag (e.g. <definitions ...)
-        content = _re.sub(
-            r'(<\w[\w:]*)([\s>])',   # first opening tag
-            rf'\1 {extra}\2',
+        return first_tag_re.sub(
+            replacement.encode('ascii') if is_bytes else replacement,
             content,
             count=1,
         )
-        return content
 
     def parse_content(self, content, filename="unknown"):
-        """Parse WSDL content"""
+        """Parse WSDL content.
+
+        *content* may be text or the raw UTF-8 bytes of the file.  Bytes are
+        handed to libxml2 as-is, which avoids re-encoding a decoded copy of
+        every upload; they are decoded once, for ``wsdl_content``.
+
+        With a ``cache_dir``, the parsed fields are also cached on disk by
+        content hash, so re-uploading or re-processing an unchanged file
+        skips the XML parse.  The service id still comes from *filename*
+        and ``wsdl_content`` from *content* itself.
+        """
+        key = self._cache_key(content) if self.cache_dir else None
+        if key:
+            cached = self._cache_get(key)
+            if cached is not None:
+                service = WebService(self._extract_service_id(filename))
+                service.wsdl_content = self._prepare(content)[1]
+                service.inputs = cached["inputs"]
+                service.outputs = cached["outputs"]
+                service.qos = QoS(cached["qos"])
+                return service
+        service = self._parse_content(content, filename)
+        if key and service is not None:
+            self._cache_put(key, service)
+        return service
+
+    # --------  parse cache  --------
+
+    @staticmethod
+    def _cache_key(content):
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        h = hashlib.blake2b(_PARSE_CACHE_VERSION, digest_size=16)
+        h.update(content)
+        return h.hexdigest()
+
+    def _cache_get(self, key):
+        path = os.path.join(self.cache_dir, f"{key}.json")
         try:
-            # Strip BOM (Byte Order Mark) that breaks ET.fromstring
-            if content.startswith('\ufeff'):
-                content = content[1:]
-            content = content.lstrip()
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
 
-            # Fix unbound namespace prefixes (common in enriched WSDL)
-            content = self._fix_unbound_prefixes(content)
+    def _cache_put(self, key, service):
+        """Write atomically so concurrent parsers never read a partial file."""
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({
+                    "inputs": service.inputs,
+                    "outputs": service.outputs,
+                    "qos": service.qos.to_dict(),
+                }, f)
+            os.replace(tmp, os.path.join(self.cache_dir, f"{key}.json"))
+        except OSError as e:
+            logger.warning("WSDL parse cache write failed: %s", e)
+
+    def _prepare(self, content):
+        """``(bytes for libxml2, text for wsdl_content)`` of raw *content*."""
+        # Strip BOM (Byte Order Mark) and leading whitespace
+        start = _LEADING_JUNK[type(content)].match(content).end()
+        if start:
+            content = content[start:]
+
+        # Fix unbound namespace prefixes (common in enriched WSDL)
+        content = self._fix_unbound_prefixes(content)
+        if isinstance(content, bytes):
+            return content, content.decode('utf-8')
+        return content.encode('utf-8'), content
+
+    def _parse_content(self, content, filename):
+        try:
+            data, content = self._prepare(content)
 
             # Extract the service ID from the filename
             service_id = self._extract_service_id(filename)
@@ -79,155 +297,170 @@ class WSDLParser:
             service = WebService(service_id)
             service.wsdl_content = content
             
-            # Parser XML
-            root = ET.fromstring(content)
+            # Single streaming pass over the XML (libxml2)
+            messages, qos_data, named = self._scan(data)
             
             # Extract inputs and outputs
-            service.inputs, service.outputs = self._extract_parameters(root)
+            service.inputs, service.outputs = self._extract_parameters(messages, named)
             
-            # Extract QoS from comments or extensions
-            service.qos = self._extract_qos(root, content)
+            # Extract QoS from extensions or comments
+            service.qos = self._extract_qos(qos_data, content)
             
             return service
-        except ET.ParseError as e:
-            print(f"XML parse error in {filename}: {e}")
-            print(f"  Content preview: {repr(content[:200])}")
+        except etree.XMLSyntaxError as e:
+            logger.warning("XML parse error in %s: %s", filename, e)
+            logger.debug("  Content preview: %r", content[:200])
             return None
         except Exception as e:
-            print(f"Error while parsing content of {filename}: {type(e).__name__}: {e}")
+            logger.warning("Error while parsing content of %s: %s: %s", filename, type(e).__name__, e)
             return None
     
     def _extract_service_id(self, filename):
         """Extract the service ID from the filename"""
         # Format: servicepXXaYYYYYYY.wsdl
-        match = _re.search(r'service(p\d+a\d+)', filename)
+        match = _SERVICE_ID_RE.search(filename)
         if match:
             return match.group(1)
         return filename.replace('.wsdl', '')
     
-    def _extract_parameters(self, root):
+    @staticmethod
+    def _scan(data):
+        """Collect everything the parser needs in ONE iterparse pass.
+
+        Tags are matched on their local-name suffix, so plain, WSDL-namespaced
+        and prefixed documents are handled alike.  Returns:
+          * messages — ``[(lower-cased message name, [part names])]``
+          * qos_data — ``{metric: float}`` from the first ``*QoS`` element,
+            or None when there is none
+          * named    — ``[(name, tag)]`` of every element with a ``name``
+            attribute, in document order (generic fallback)
+        Each top-level section (types, message, portType, ...) is dropped from
+        the tree once it has ended — everything needed from it has been read
+        by then — so memory stays bounded by the largest section rather
+        than the whole document.
+        """
+        messages = []
+        named = []
+        qos_elem = None
+        qos_data = None
+        localname = _local_name
+        kind_of = _tag_kind
+        depth = 0
+
+        for event, elem in etree.iterparse(io.BytesIO(data), **_ITERPARSE_OPTS):
+            tag = elem.tag
+            kind = kind_of(tag)
+            if event == 'start':
+                depth += 1
+                name = elem.get('name')
+                if name:
+                    named.append((name, tag))
+                if qos_elem is None and kind == _QOS:
+                    qos_elem = elem
+            elif kind == _MESSAGE:
+                parts = []
+                for part in elem:
+                    if kind_of(part.tag) == _PART:
+                        # name, else the element QName without its prefix
+                        parts.append(part.get('name') or part.get('element', '').rpartition(':')[2])
+                messages.append((elem.get('name', '').lower(), parts))
+            elif elem is qos_elem:
+                qos_data = {}
+                for child in elem:
+                    # Format 1: <ResponseTime Value="409"/>
+                    # Format 2: <ResponseTime>409</ResponseTime>
+                    value = child.get('Value') or child.text
+                    if value:
+                        try:
+                            qos_data[localname(child.tag)] = float(value)
+                        except ValueError:
+                            pass
+            if event == 'end':
+                depth -= 1
+                if depth == 1:
+                    elem.clear()
+                    elem.getparent().remove(elem)
+        return messages, qos_data, named
+
+    def _extract_parameters(self, messages, named):
         """Extract the input and output parameters"""
         inputs = []
         outputs = []
+        # Membership sets mirror the lists (keeps first-seen order without
+        # an O(n) list scan per part)
+        in_seen = set()
+        out_seen = set()
         
-        # Search for all messages (with and without namespace)
-        messages = []
-        
-        # Method 1: With explicit namespace
-        for ns in ['http://schemas.xmlsoap.org/wsdl/', '']:
-            ns_prefix = f'{{{ns}}}' if ns else ''
-            messages.extend(root.findall(f'.//{ns_prefix}message'))
-        
-        # Method 2: Without namespace consideration
-        for elem in root.iter():
-            if elem.tag.endswith('message') or elem.tag == 'message':
-                if elem not in messages:
-                    messages.append(elem)
-        
-        # Parser les messages
-        for msg in messages:
-            msg_name = msg.get('name', '').lower()
-            
-            # Find all parts of the message
-            parts = []
-            for part_elem in msg:
-                if part_elem.tag.endswith('part') or part_elem.tag == 'part':
-                    parts.append(part_elem)
+        for msg_name, params in messages:
+            # The direction depends only on the message name: classify it
+            # once per message rather than once per part
+            is_request, is_response, is_input, is_output = _message_direction(msg_name)
             
-            for part in parts:
-                param_name = part.get('name') or part.get('element', '').split(':')[-1]
-                
+            for param_name in params:
                 if param_name and param_name.strip():
-                    # Determine if it's an input or output
-                    is_input = any(keyword in msg_name for keyword in ['request', 'input', 'in'])
-                    is_output = any(keyword in msg_name for keyword in ['response', 'output', 'out', 'result'])
-                    
                     # If the message ends with or contains 'Request'
-                    if 'request' in msg_name and param_name not in inputs:
+                    if is_request and param_name not in in_seen:
                         inputs.append(param_name)
+                        in_seen.add(param_name)
                     # If the message ends with or contains 'Response'
-                    elif 'response' in msg_name and param_name not in outputs:
+                    elif is_response and param_name not in out_seen:
                         outputs.append(param_name)
+                        out_seen.add(param_name)
                     # If undetermined, look at the portType structure
-                    elif is_input and param_name not in inputs:
+                    elif is_input and param_name not in in_seen:
                         inputs.append(param_name)
-                    elif is_output and param_name not in outputs:
+                        in_seen.add(param_name)
+                    elif is_output and param_name not in out_seen:
                         outputs.append(param_name)
+                        out_seen.add(param_name)
         
         # If no parameters found, use a generic approach
         if not inputs and not outputs:
-            inputs, outputs = self._extract_generic_parameters(root)
+            inputs, outputs = self._extract_generic_parameters(named)
         
         return inputs, outputs
     
-    def _extract_generic_parameters(self, root):
+    def _extract_generic_parameters(self, named):
         """Generic parameter extraction"""
         inputs = []
         outputs = []
         
         # Search for all elements that look like parameters
-        for elem in root.iter():
-            name = elem.get('name', '')
+        for name, tag in named:
             if name.startswith('p') and 'a' in name:
                 # Format pXXaYYYYYYY
-                if elem.tag.endswith('input') or 'request' in elem.tag.lower():
+                if tag.endswith('input') or 'request' in tag.lower():
                     inputs.append(name)
-                elif elem.tag.endswith('output') or 'response' in elem.tag.lower():
+                elif tag.endswith('output') or 'response' in tag.lower():
                     outputs.append(name)
         
         return inputs, outputs
     
-    def _extract_qos(self, root, content):
+    def _extract_qos(self, qos_data, content):
         """Extract QoS from the WSDL"""
         qos = QoS()
         qos_found = False
         
-        # Method 1: Search for the <QoS> tag in the XML (with or without namespace)
-        qos_element = None
-        
-        # Try without namespace
-        qos_element = root.find('.//QoS')
-        
-        # Try with different possible namespaces
-        if qos_element is None:
-            for elem in root.iter():
-                if elem.tag.endswith('QoS') or elem.tag == 'QoS':
-                    qos_element = elem
-                    break
-        
-        if qos_element is not None:
-            qos_data = {}
-            for child in qos_element:
-                # Get the tag name without namespace
-                tag_name = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                
-                # Format 1: <ResponseTime Value="409"/>
-                value = child.get('Value')
-                
-                # Format 2: <ResponseTime>409</ResponseTime>
-                if not value:
-                    value = child.text
-                
-                if value:
-                    try:
-                        qos_data[tag_name] = float(value)
-                    except:
-                        pass
-            
-            if qos_data:
-                qos = QoS(qos_data)
-                qos_found = True
+        # Method 1: values of the <QoS> element collected by _scan
+        if qos_data:
+            qos = QoS(qos_data)
+            qos_found = True
         
         # Method 2: Search for QoS in XML comments
         if not qos_found:
-            qos_pattern = r'<!--\s*QoS:\s*({[^}]+})\s*-->'
-            match = _re.search(qos_pattern, content)
+            match = _QOS_COMMENT_RE.search(content)
             
             if match:
                 try:
                     qos_str = match.group(1)
-                    import ast
-                    qos_data = ast.literal_eval(qos_str)
+                    if _QOS_DICT_RE.fullmatch(qos_str):
+                        qos_data = {
+                            key: float(value)
+                            for _, key, value in _QOS_PAIR_RE.findall(qos_str)
+                        }
+                    else:
+                        import ast
+                        qos_data = ast.literal_eval(qos_str)
                     qos = QoS(qos_data)
                     qos_found = True
                 except:
@@ -237,131 +470,174 @@ class WSDLParser:
     
     def parse_directory(self, directory):
         """Parse all WSDL files in a directory"""
-        import os
+        # scandir yields name + path without extra joins; sort for a
+        # deterministic service order across platforms
+        with os.scandir(directory) as it:
+            entries = sorted(
+                (e for e in it if e.name.endswith(('.wsdl', '.xml')) and e.is_file()),
+                key=lambda e: e.name,
+            )
         services = []
+        for entry in entries:
+            service = self.parse_file(entry.path)
+            if service:
+                services.append(service)
+        return services
+
+
+# One parser per worker process for parse_wsdl_content
+_worker_parser = None
+
+
+def parse_wsdl_content(content, filename="unknown", cache_dir=None):
+    """Module-level (picklable) ``WSDLParser.parse_content`` for process pools."""
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = WSDLParser(cache_dir=cache_dir)
+    return _worker_parser.parse_content(content, filename)
+
+
+def _parse_routine(routine):
+    """Build a request from a WSChallenge ``<*Routine>`` element, or None."""
+    from models.service import CompositionRequest
+
+    request_name = routine.get('name', 'unknown')
+    comp_req = CompositionRequest(request_name)
+    
+    # Provided parameters
+    provided = routine.find('Provided')
+    if provided is not None and provided.text:
+        comp_req.provided = [p.strip() for p in provided.text.split(',') if p.strip()]
+    
+    # Resultant parameter
+    resultant = routine.find('Resultant')
+    if resultant is not None and resultant.text:
+        comp_req.resultant = resultant.text.strip()
+    else:
+        logger.warning("Request '%s' has no Resultant element — skipping (composition would always fail)", request_name)
+        return None
+    
+    # QoS Constraints (format: valeur1,valeur2,valeur3,...)
+    qos_elem = routine.find('QoS')
+    if qos_elem is not None and qos_elem.text:
+        qos_values = [float(v.strip()) for v in qos_elem.text.split(',') if v.strip()]
         
-        for filename in os.listdir(directory):
-            if filename.endswith('.wsdl') or filename.endswith('.xml'):
-                filepath = os.path.join(directory, filename)
-                service = self.parse_file(filepath)
-                if service:
-                    services.append(service)
+        # Map QoS values according to standard order; missing ones are 0
+        qos_data = dict.fromkeys(_ROUTINE_QOS_KEYS, 0)
+        qos_data.update(zip(_ROUTINE_QOS_KEYS, qos_values))
         
-        return services
+        comp_req.qos_constraints = QoS(qos_data)
+    
+    return comp_req
+
+
+def _parse_request(req):
+    """Build a request from a standard-format ``<Request>`` element, or None."""
+    from models.service import CompositionRequest
+
+    request_id = req.get('id') or req.get('name', 'unknown')
+    comp_req = CompositionRequest(request_id)
+    
+    # Provided parameters
+    provided = req.find('Provided')
+    if provided is not None:
+        comp_req.provided = [p.strip() for p in provided.text.split(';') if p.strip()]
+    
+    # Resultant parameter
+    resultant = req.find('Resultant')
+    if resultant is not None and resultant.text:
+        comp_req.resultant = resultant.text.strip()
+    else:
+        logger.warning("Request '%s' has no Resultant element — skipping", request_id)
+        return None
+    
+    # QoS Constraints
+    qos_elem = req.find('QoS')
+    if qos_elem is not None:
+        qos_data = {}
+        for qos_child in qos_elem:
+            try:
+                qos_data[qos_child.tag] = float(qos_child.text)
+            except:
+                qos_data[qos_child.tag] = 0
+        comp_req.qos_constraints = QoS(qos_data)
+    
+    return comp_req
 
 
 def parse_requests_xml(filepath):
     """
-    Parse the Requests.xml file
+    Parse the Requests.xml file (a path or a binary file-like object)
     Supports 3 formats:
     1. Standard format: <Requests><Request id="...">...</Request></Requests>
     2. WSChallenge Discovery format: <WSChallenge><DiscoveryRoutine>...</DiscoveryRoutine></WSChallenge>
     3. WSChallenge Composition format: <WSChallenge><CompositionRoutine>...</CompositionRoutine></WSChallenge>
+
+    The file is streamed: each request element is converted as soon as it
+    is complete and then cleared, so the whole tree is never held in memory.
     """
-    from models.service import CompositionRequest
-    
-    requests = []
+    # Standard requests, or WSChallenge routines by type
+    found = {'Request': [], 'DiscoveryRoutine': [], 'CompositionRoutine': []}
+    seen = set()
+    depth = 0
     
     try:
-        tree = ET.parse(filepath)
-        root = tree.getroot()
-        
+        context = ET.iterparse(filepath, events=('start', 'end'))
+        _, root = next(context)
         # Detect the file format
         if root.tag == 'WSChallenge':
-            # WSChallenge format - search for DiscoveryRoutine OR CompositionRoutine
-            routines = root.findall('.//DiscoveryRoutine')
-            routine_type = 'Discovery'
-            
-            if not routines:  # If no DiscoveryRoutine, search for CompositionRoutine
-                routines = root.findall('.//CompositionRoutine')
-                routine_type = 'Composition'
-            
-            print(f"📋 Found {len(routines)} {routine_type}Routine(s) in file")
-            
-            for routine in routines:
-                request_name = routine.get('name', 'unknown')
-                comp_req = CompositionRequest(request_name)
-                
-                # Provided parameters
-                provided = routine.find('Provided')
-                if provided is not None and provided.text:
-                    comp_req.provided = [p.strip() for p in provided.text.split(',') if p.strip()]
-                
-                # Resultant parameter
-                resultant = routine.find('Resultant')
-                if resultant is not None and resultant.text:
-                    comp_req.resultant = resultant.text.strip()
-                else:
-                    print(f"⚠️ Warning: Request '{request_name}' has no Resultant element — skipping (composition would always fail)")
-                    continue
-                
-                # QoS Constraints (format: valeur1,valeur2,valeur3,...)
-                qos_elem = routine.find('QoS')
-                if qos_elem is not None and qos_elem.text:
-                    qos_values = [float(v.strip()) for v in qos_elem.text.split(',') if v.strip()]
-                    
-                    # Map QoS values according to standard order
-                    # Expected format: ResponseTime, Availability, Throughput, Successability, 
-                    #                 Reliability, Compliance, BestPractices, Latency, Documentation
-                    qos_keys = [
-                        'ResponseTime', 'Availability', 'Throughput', 'Successability',
-                        'Reliability', 'Compliance', 'BestPractices', 'Latency', 'Documentation'
-                    ]
-                    
-                    qos_data = {}
-                    for i, key in enumerate(qos_keys):
-                        if i < len(qos_values):
-                            qos_data[key] = qos_values[i]
-                        else:
-                            qos_data[key] = 0
-                    
-                    comp_req.qos_constraints = QoS(qos_data)
-                
-                requests.append(comp_req)
+            handlers = {'DiscoveryRoutine': _parse_routine, 'CompositionRoutine': _parse_routine}
+        else:
+            handlers = {'Request': _parse_request}
+        
+        for event, elem in context:
+            if event == 'start':
+                depth += 1
+                continue
+            if elem is root:
+                break
+            depth -= 1
+            handler = handlers.get(elem.tag)
+            if handler is not None:
+                seen.add(elem.tag)
+                comp_req = handler(elem)
+                if comp_req is not None:
+                    found[elem.tag].append(comp_req)
+                elem.clear()
+            if depth == 0:
+                root.clear()  # drop finished top-level children
         
+        if root.tag == 'WSChallenge':
+            # DiscoveryRoutine entries take precedence over CompositionRoutine ones
+            routine_type = 'Discovery' if 'DiscoveryRoutine' in seen else 'Composition'
+            requests = found[routine_type + 'Routine']
+            logger.info("Loaded %d %sRoutine(s) from file", len(requests), routine_type)
         else:
-            # Standard format (old format)
-            for req in root.findall('.//Request'):
-                request_id = req.get('id') or req.get('name', 'unknown')
-                comp_req = CompositionRequest(request_id)
-                
-                # Provided parameters
-                provided = req.find('Provided')
-                if provided is not None:
-                    comp_req.provided = [p.strip() for p in provided.text.split(';') if p.strip()]
-                
-                # Resultant parameter
-                resultant = req.find('Resultant')
-                if resultant is not None and resultant.text:
-                    comp_req.resultant = resultant.text.strip()
-                else:
-                    print(f"⚠️ Warning: Request '{request_id}' has no Resultant element — skipping")
-                    continue
-                
-                # QoS Constraints
-                qos_elem = req.find('QoS')
-                if qos_elem is not None:
-                    qos_data = {}
-                    for qos_child in qos_elem:
-                        try:
-                            qos_data[qos_child.tag] = float(qos_child.text)
-                        except:
-                            qos_data[qos_child.tag] = 0
-                    comp_req.qos_constraints = QoS(qos_data)
-                
-                requests.append(comp_req)
+            requests = found['Request']
     
+    except ET.ParseError as e:
+        logger.exception("Error while parsing requests: %s", e)
+        return []
     except Exception as e:
-        print(f"❌ Error while parsing requests: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error while parsing requests: %s", e)
+        return found['DiscoveryRoutine'] or found['CompositionRoutine'] or found['Request']
     
     return requests
 
 
+def _decode_solutions(raw):
+    """Decode BestSolutions bytes with the first encoding that accepts them."""
+    for enc in ('utf-8-sig', 'utf-8', 'latin-1', 'cp1252'):
+        try:
+            return raw.decode(enc)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode('latin-1', errors='replace')
+
+
 def parse_best_solutions_xml(filepath):
     """
-    Parse the BestSolutions.xml file
+    Parse the BestSolutions.xml file (a path or a binary file-like object)
     Supports:
       - Discovery: 1 service per case
       - Composition: multiple services per case (workflow)
@@ -371,28 +647,32 @@ def parse_best_solutions_xml(filepath):
 
     # -- 1. Read raw bytes --
     try:
-        with open(filepath, 'rb') as f:
-            raw = f.read()
+        if hasattr(filepath, 'read'):
+            raw = filepath.read()
+        else:
+            with open(filepath, 'rb') as f:
+                raw = f.read()
     except Exception as e:
-        print(f"❌ Unable to read {filepath}: {e}")
+        logger.error("Unable to read %s: %s", filepath, e)
         return solutions
 
-    # -- 2. Detect / force encoding --
+    # -- 2. Well-formed files parse straight from the bytes; the decoded
+    #       and sanitized text copies below are only built when needed --
+    root = None
     content = None
-    for enc in ('utf-8-sig', 'utf-8', 'latin-1', 'cp1252'):
-        try:
-            content = raw.decode(enc)
-            break
-        except UnicodeDecodeError:
-            continue
-    if content is None:
-        content = raw.decode('latin-1', errors='replace')
+    try:
+        root = ET.fromstring(raw)
+        logger.debug("[BestSolutions] ET parsing succeeded")
+    except ET.ParseError:
+        content = _decode_solutions(raw)
 
     # -- 3. Display first lines for diagnosis --
-    first_lines = content.split('\n')[:6]
-    print(f"  [BestSolutions] First lines:")
-    for i, l in enumerate(first_lines, 1):
-        print(f"    {i}: {repr(l[:120])}")
+    if logger.isEnabledFor(logging.DEBUG):
+        if content is None:
+            content = _decode_solutions(raw)
+        logger.debug("[BestSolutions] First lines:")
+        for i, l in enumerate(content.split('\n', 6)[:6], 1):
+            logger.debug("    %d: %r", i, l[:120])
 
     # -- 4. Sanitize the XML --
     def sanitize_xml(text):
@@ -405,33 +685,33 @@ def parse_best_solutions_xml(filepath):
         text = _re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
         return text
 
-    content_clean = sanitize_xml(content)
-
     # -- 5. Parse with xml.etree.ElementTree --
-    root = None
+    if root is None:
+        content_clean = sanitize_xml(content).encode('utf-8')
 
-    # Attempt 1: standard sanitized content
-    try:
-        root = ET.fromstring(content_clean.encode('utf-8'))
-        print(f"  [BestSolutions] ✓ ET parsing succeeded")
-    except ET.ParseError as e1:
-        print(f"  [BestSolutions] ET failed ({e1})")
-        # Attempt 2: lxml (more permissive with recover=True)
+        # Attempt 1: standard sanitized content
         try:
-            from lxml import etree as lxml_et
-            root_lxml = lxml_et.fromstring(
-                content_clean.encode('utf-8'),
-                parser=lxml_et.XMLParser(recover=True)
-            )
-            root = ET.fromstring(lxml_et.tostring(root_lxml))
-            print(f"  [BestSolutions] ✓ lxml parsing succeeded")
-        except Exception as e2:
-            print(f"  [BestSolutions] lxml failed ({e2}) → regex fallback")
-            root = None
+            root = ET.fromstring(content_clean)
+            logger.debug("[BestSolutions] ET parsing succeeded")
+        except ET.ParseError as e1:
+            logger.info("[BestSolutions] ET failed (%s)", e1)
+            # Attempt 2: lxml (more permissive with recover=True)
+            try:
+                from lxml import etree as lxml_et
+                root_lxml = lxml_et.fromstring(
+                    content_clean,
+                    parser=lxml_et.XMLParser(recover=True)
+                )
+                root = ET.fromstring(lxml_et.tostring(root_lxml))
+                logger.info("[BestSolutions] lxml parsing succeeded")
+            except Exception as e2:
+                logger.info("[BestSolutions] lxml failed (%s) → regex fallback", e2)
+                root = None
+        del content_clean
 
     # -- 6. Regex fallback if all else fails --
     if root is None:
-        print(f"  [BestSolutions] Using regex parser")
+        logger.info("[BestSolutions] Using regex parser")
         case_blocks = _re.findall(
             r'<case\s+name=["\']([^"\'>\s]+)["\'][^>]*>(.*?)</case>',
             content, _re.DOTALL | _re.IGNORECASE
@@ -461,7 +741,7 @@ def parse_best_solutions_xml(filepath):
                 'utility':     utility_value,
                 'is_workflow': len(service_ids) > 1
             }
-            print(f"  • {req_id}: {len(service_ids)} service(s), utility={utility_value:.2f}")
+            logger.debug("  %s: %d service(s), utility=%.2f", req_id, len(service_ids), utility_value)
 
         return solutions
 
@@ -479,17 +759,17 @@ def parse_best_solutions_xml(filepath):
         # Format A: <utility value="85.5"/> or <utility>85.5</utility>
         utility_elem = case.find('.//utility')
         if utility_elem is not None:
-            raw = utility_elem.get('value') or (utility_elem.text or '').strip()
+            raw_val = utility_elem.get('value') or (utility_elem.text or '').strip()
             try:
-                utility_value = float(raw)
+                utility_value = float(raw_val)
             except (ValueError, TypeError):
                 pass
 
         # Format B : <case name="..." utility="85.5">
         if utility_value == 0.0:
-            raw = case.get('utility', '')
+            raw_val = case.get('utility', '')
             try:
-                utility_value = float(raw)
+                utility_value = float(raw_val)
             except (ValueError, TypeError):
                 pass
 
@@ -497,15 +777,17 @@ def parse_best_solutions_xml(filepath):
         if utility_value == 0.0:
             utility_elem2 = case.find('.//Utility')
             if utility_elem2 is not None:
-                raw = utility_elem2.get('value') or (utility_elem2.text or '').strip()
+                raw_val = utility_elem2.get('value') or (utility_elem2.text or '').strip()
                 try:
-                    utility_value = float(raw)
+                    utility_value = float(raw_val)
                 except (ValueError, TypeError):
                     pass
 
         # Format D: regex fallback for unquoted values (value=412.27)
         if utility_value == 0.0:
             # Search the raw content for this case's utility
+            if content is None:
+                content = _decode_solutions(raw)
             case_pattern = (
                 r'<case\s+name=["\']?' + _re.escape(req_id) + r'["\']?[^>]*>'
                 r'(.*?)</case>'
@@ -528,6 +810,6 @@ def parse_best_solutions_xml(filepath):
             'utility':     utility_value,
             'is_workflow': len(service_ids) > 1
         }
-        print(f"  • {req_id}: {len(service_ids)} service(s), utility={utility_value:.2f}")
+        logger.debug("  %s: %d service(s), utility=%.2f", req_id, len(service_ids), utility_value)
 
     return solutions
\ No newline at end of file
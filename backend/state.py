@@ -8,7 +8,11 @@ Blueprint / route module without circular dependencies.
 import threading
 
 from services.wsdl_parser import WSDLParser
+from services.classic_composer import ClassicComposer
+from services.llm_composer import LLMComposer
+from services.service_index import ServiceIndex
 from models.interaction_history import InteractionHistoryStore
+from config import WSDL_CACHE_DIR
 
 # ── Dependency availability checks (graceful degradation) ──────────
 
@@ -52,15 +56,46 @@ interaction_store = InteractionHistoryStore()
 
 app_state = {
     "services": [],
+    "services_by_id": {},
+    # Bumped whenever the service list changes (upload, annotation results
+    # swapped in); composers are rebuilt lazily against it.
+    "services_version": 0,
+    # Bumped as annotations land on the shared service objects.
+    "annotations_version": 0,
+    # compute_annotation_status() result: ((services_version, annotations_version), dict)
+    "annotation_status_cache": None,
+    # Cached GET /api/services body: ((services_version, annotations_version), bytes)
+    "services_payload": None,
+    # services_version each lazily built composer was built from
+    "composer_versions": {},
     "annotated_services": [],
     "requests": [],
+    "requests_by_id": {},
+    "request_ids": [],  # upload order, read by the comparison/batch endpoints
+    # Cached GET /api/requests body: (requests list it was built from, bytes)
+    "requests_payload": None,
     "best_solutions": {},
     "results_classic": {},
     "results_llm": {},
-    "parser": WSDLParser(),
+    # Bumped when requests, best solutions, composition results or the
+    # learning state change; part of the GET /api/comparison ETag.
+    "results_version": 0,
+    # Cached GET /api/comparison body: (ETag, bytes)
+    "comparison_payload": None,
+    # Last filtered /api/annotate/estimate I/O profile:
+    # ((services_version, frozenset of ids), (count, avg_in, avg_out))
+    "estimate_cache": None,
+    # Running (services counted, last one counted, total inputs, total
+    # outputs) over the whole catalog; uploads only append, so just the
+    # new tail is added
+    "io_totals": (0, None, 0, 0),
+    # Built by get_parser() on the first upload
+    "parser": None,
     "annotator": None,
     "classic_composer": None,
     "llm_composer": None,
+    # I/O indexes over "services", shared by both composers
+    "service_index": None,
     "interaction_store": interaction_store,
     "annotation_thread": None,
     "annotation_progress": {
@@ -85,6 +120,7 @@ app_state = {
         "is_trained": False,
         "training_examples": [],
         "composition_history": [],
+        "history_utility_total": 0.0,   # running sum over composition_history
         "success_patterns": [],
         "error_patterns": [],
         "performance_metrics": {
@@ -128,17 +164,189 @@ app_state = {
 }
 
 
+def index_by_id(items):
+    """Map ``item.id`` to item.  The first item wins on duplicate ids, as a
+    linear ``next(...)`` scan over the same list would."""
+    return {item.id: item for item in reversed(items)}
+
+
+def get_parser():
+    """The shared ``WSDLParser``, created on first use.
+
+    ``parse_content`` keeps no per-parse state (libxml2 parser contexts
+    are created per document), so request threads can share one instance.
+    """
+    parser = app_state["parser"]
+    if parser is None:
+        with state_lock:
+            parser = app_state["parser"]
+            if parser is None:
+                parser = app_state["parser"] = WSDLParser(cache_dir=WSDL_CACHE_DIR)
+    return parser
+
+
+def bump_services_version():
+    """Invalidate composers and payloads derived from ``app_state["services"]``."""
+    with state_lock:
+        app_state["services_version"] += 1
+
+
+def bump_results_version():
+    """Invalidate the comparison view derived from results and requests."""
+    with state_lock:
+        app_state["results_version"] += 1
+
+
+# ── Lazily synced composers ───────────────────────────────────────
+# A composer indexes the service list it shares with app_state.  Instead of
+# rebuilding both after every upload / annotation run, each is brought up
+# to date on first use once services_version has moved on: services
+# appended since then are indexed incrementally, and only a composer built
+# over another list (or dropped by reset_composers) is rebuilt.  Both
+# composers read the same ServiceIndex, so each upload is indexed once.
+# The index is updated copy-on-write, so request threads composing without
+# this lock never see its containers change under them.
+
+_composer_lock = threading.Lock()
+
+
+def _shared_index():
+    index = app_state["service_index"]
+    if index is None or index.services is not app_state["services"]:
+        index = app_state["service_index"] = ServiceIndex(app_state["services"])
+    return index
+
+
+def shared_service_index():
+    """The ServiceIndex the composers share, for composers built by hand
+    (e.g. a freshly trained LLM composer) before ``set_composer``."""
+    with _composer_lock:
+        return _shared_index()
+
+
+def _current(name, build):
+    with _composer_lock:
+        obj = app_state[name]
+        version = app_state["services_version"]
+        if obj is None or obj.services is not app_state["services"]:
+            obj = build()
+            app_state[name] = obj
+        elif app_state["composer_versions"].get(name) != version:
+            obj.index_new_services()
+        app_state["composer_versions"][name] = version
+        return obj
+
+
+def reset_composers():
+    """Force a full rebuild, e.g. after list entries were replaced in place."""
+    with _composer_lock:
+        app_state["classic_composer"] = None
+        app_state["llm_composer"] = None
+        app_state["service_index"] = None
+
+
+def replace_services(services):
+    """Point the composers' shared index at replaced service objects.
+
+    Cheaper than reset_composers(): the composers (and a trained LLM
+    composer's knowledge base) are kept, and only the entries of the
+    replaced services are touched.
+    """
+    with _composer_lock:
+        index = app_state["service_index"]
+        if index is not None and index.services is app_state["services"]:
+            index.replace(services)
+
+
+def set_composer(name, obj):
+    """Install *obj* (e.g. a freshly trained LLM composer) as up to date."""
+    with _composer_lock:
+        app_state[name] = obj
+        app_state["composer_versions"][name] = app_state["services_version"]
+
+
+def get_classic_composer():
+    """Classic composer over the current services, synced if stale."""
+    return _current("classic_composer", lambda: ClassicComposer(
+        app_state["services"], index=_shared_index(),
+    ))
+
+
+def get_llm_composer():
+    """LLM composer over the current services, synced if stale.
+
+    A rebuilt composer is re-trained from the stored training examples when
+    the system has been trained.
+    """
+    def build():
+        learning = app_state["learning_state"]
+        if learning["is_trained"]:
+            return LLMComposer(
+                app_state["services"],
+                training_examples=learning["training_examples"],
+                index=_shared_index(),
+            )
+        return LLMComposer(app_state["services"], index=_shared_index())
+
+    return _current("llm_composer", build)
+
+
 def compute_annotation_status():
-    """Single source of truth for annotation status."""
+    """Single source of truth for annotation status.
+
+    Cached until the services or annotations version moves on, so health
+    polls do not rescan an unchanged service list.
+    """
+    # Snapshot under the lock: uploads extend the list from other threads
+    with state_lock:
+        key = (app_state["services_version"], app_state["annotations_version"])
+        cached = app_state["annotation_status_cache"]
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        services = list(app_state["services"])
     annotated = sum(
-        1
-        for s in app_state["services"]
-        if hasattr(s, "annotations") and s.annotations is not None
+        1 for s in services if s.annotations is not None
     )
-    total = len(app_state["services"])
+    status = annotation_status_for(annotated, len(services))
+    app_state["annotation_status_cache"] = (key, status)
+    return status
+
+
+def annotation_status_for(annotated, total):
+    """Annotation status body for *annotated* out of *total* services."""
     return {
         "services_annotated": annotated > 0,
         "annotation_count": annotated,
         "total_services": total,
         "percentage": (annotated / total * 100) if total > 0 else 0,
     }
+
+
+def seed_annotation_status(status, services_version):
+    """Cache a status derived elsewhere, e.g. incrementally after a run.
+
+    Ignored (returns False) if the services moved past *services_version*
+    in the meantime, since *status* would no longer describe them.
+    """
+    with state_lock:
+        if app_state["services_version"] != services_version:
+            return False
+        key = (services_version, app_state["annotations_version"])
+        app_state["annotation_status_cache"] = (key, status)
+        return True
+
+
+def has_annotated_services():
+    """Whether at least one service is annotated.
+
+    Reuses a fresh status entry when there is one; otherwise stops at the
+    first annotated service instead of counting them all, which matters
+    while an annotation run keeps invalidating the status cache.
+    """
+    with state_lock:
+        key = (app_state["services_version"], app_state["annotations_version"])
+        cached = app_state["annotation_status_cache"]
+        if cached is not None and cached[0] == key:
+            return cached[1]["services_annotated"]
+        services = list(app_state["services"])
+    return any(s.annotations is not None for s in services)
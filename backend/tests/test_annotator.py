@@ -7,6 +7,7 @@ policy annotation generation, the _extract_json helper, and the
 social association builder.
 """
 
+import os
 import unittest
 import json
 from datetime import datetime
@@ -18,7 +19,7 @@ from models.annotation import (
     SNNode, SNAssociation, SNProperty,
 )
 from models.interaction_history import InteractionHistoryStore
-from services.annotator import ServiceAnnotator
+from services.annotator import ServiceAnnotator, _JsonCloseTracker
 
 
 # ── Helpers ──────────────────────────────────────────────────────
@@ -78,6 +79,12 @@ class TestAnnotatorInit(unittest.TestCase):
         self.assertEqual(len(ann.services), 0)
         self.assertEqual(len(ann._output_index), 0)
 
+    def test_session_reused_and_closed(self):
+        with ServiceAnnotator(services=[]) as ann:
+            session = ann.session
+            self.assertIs(ann.session, session)
+            self.assertIn("http://", session.adapters)
+
 
 class TestInteractionAnnotation(unittest.TestCase):
     """Test heuristic interaction annotation generation."""
@@ -264,6 +271,165 @@ class TestAnnotateAllClassic(unittest.TestCase):
             json.dumps(d)
 
 
+class TestAnnotateAllLLM(unittest.TestCase):
+    """Test the LLM bulk path with the Ollama call stubbed out."""
+
+    def setUp(self):
+        self.services = _build_services()
+        self.annotator = ServiceAnnotator(services=self.services)
+        # Ollama unavailable -> every service falls back to classic generators
+        self.annotator._call_ollama = lambda prompt, **kwargs: None
+        self.annotator.warmup = lambda: False
+
+    def test_every_service_annotated_once(self):
+        annotated = self.annotator.annotate_all(
+            use_llm=True, max_workers=2, batch_size=1
+        )
+        self.assertEqual(sorted(s.id for s in annotated),
+                         sorted(s.id for s in self.services))
+        for svc in annotated:
+            self.assertIsNotNone(svc.annotations)
+
+    def test_partial_response_falls_back_per_section(self):
+        # valid interaction section, malformed policy section
+        self.annotator._call_ollama = lambda prompt, **kwargs: json.dumps({
+            "interaction": {"role": "Aggregator", "can_call_count": 1},
+            "policy": "high",
+        })
+        ann = self.annotator._annotate_with_llm(
+            self.services[0], ["interaction", "policy"]
+        )
+        self.assertEqual(ann.interaction.role, "aggregator")
+        self.assertIsInstance(ann.policy, PolicyAnnotation)
+
+    def test_grouped_call_maps_entries_back(self):
+        calls = []
+
+        def fake(prompt, **kwargs):
+            grouped = '"annotations"' in prompt
+            calls.append(grouped)
+            if not grouped:
+                return None
+            return json.dumps({"annotations": [
+                {"service_id": s.id, "interaction": {"role": "orchestrator"}}
+                for s in self.services[:2]
+            ]})
+
+        self.annotator._call_ollama = fake
+        annotated = self.annotator.annotate_all(
+            use_llm=True, annotation_types=["interaction"],
+            max_workers=1, services_per_call=3,
+        )
+        self.assertEqual(len(annotated), len(self.services))
+        by_id = {s.id: s for s in annotated}
+        self.assertEqual(by_id["S1"].annotations.interaction.role, "orchestrator")
+        # S3 was missing from the grouped reply -> single-service retry
+        self.assertIsNotNone(by_id["S3"].annotations)
+        self.assertEqual(calls.count(True), 2)
+
+    def test_progress_is_monotonic(self):
+        seen = []
+        self.annotator.annotate_all(
+            use_llm=True, max_workers=3, batch_size=2,
+            progress_callback=lambda cur, tot, sid: seen.append(cur),
+        )
+        self.assertEqual(seen, list(range(1, len(self.services) + 1)))
+
+
+class TestResponseCache(unittest.TestCase):
+    """Ollama responses are cached on disk by request content."""
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.mkdtemp()
+        self.annotator = ServiceAnnotator(services=[], cache_dir=self.tmpdir)
+        self.posts = 0
+
+        class _Resp:
+            status_code = 200
+
+            def iter_lines(self):
+                yield json.dumps({"response": '{"role": ', "done": False}).encode()
+                yield json.dumps({"response": '"worker"}', "done": False}).encode()
+                yield json.dumps({"response": " trailing prose", "done": True}).encode()
+
+            def close(self):
+                pass
+
+        self.payloads = []
+
+        def fake_post(*args, **kwargs):
+            self.posts += 1
+            self.payloads.append(kwargs["json"])
+            return _Resp()
+
+        self.annotator.session.post = fake_post
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_second_identical_call_hits_cache(self):
+        first = self.annotator._call_ollama("same prompt")
+        second = self.annotator._call_ollama("same prompt")
+        self.assertEqual(first, second)
+        self.assertEqual(self.posts, 1)
+
+    def test_stream_stops_at_closing_brace(self):
+        self.assertEqual(self.annotator._call_ollama("x"), '{"role": "worker"}')
+
+    def test_keep_alive_sent_but_not_part_of_key(self):
+        self.annotator._call_ollama("p")
+        self.assertEqual(self.payloads[0]["keep_alive"], "30m")
+        self.annotator.keep_alive = "5m"
+        self.annotator._call_ollama("p")
+        self.assertEqual(self.posts, 1)
+
+    def test_concurrent_identical_calls_share_one_request(self):
+        import threading
+        import time
+        post = self.annotator.session.post
+
+        def slow_post(*args, **kwargs):
+            time.sleep(0.05)
+            return post(*args, **kwargs)
+
+        self.annotator.session.post = slow_post
+        self.annotator.cache_dir = None  # coalescing does not need the disk cache
+        replies = []
+        threads = [
+            threading.Thread(target=lambda: replies.append(self.annotator._call_ollama("same")))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(replies, ['{"role": "worker"}'] * 4)
+        self.assertEqual(self.posts, 1)
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_different_prompt_or_mode_misses(self):
+        self.annotator._call_ollama("a")
+        self.annotator._call_ollama("b")
+        self.annotator._call_ollama("a", json_mode=True)
+        self.assertEqual(self.posts, 3)
+
+
+class TestJsonCloseTracker(unittest.TestCase):
+    """Brace tracking used to cut a streamed reply short."""
+
+    def test_closes_across_chunks(self):
+        t = _JsonCloseTracker()
+        self.assertFalse(t.feed('Here: {"a": {"b": 1}'))
+        self.assertTrue(t.feed(', "c": 2} more'))
+
+    def test_braces_inside_strings_ignored(self):
+        t = _JsonCloseTracker()
+        self.assertFalse(t.feed('{"a": "}{\\"}"'))
+        self.assertTrue(t.feed('}'))
+
+
 class TestExtractJson(unittest.TestCase):
     """Test the JSON extraction helper."""
 
@@ -293,6 +459,21 @@ class TestExtractJson(unittest.TestCase):
         self.assertEqual(result["interaction"]["role"], "orchestrator")
         self.assertTrue(result["context"]["context_aware"])
 
+    def test_markdown_fence(self):
+        text = 'Sure:\n```json\n{"role": "worker"}\n```\nHope this helps {:)}'
+        self.assertEqual(self.annotator._extract_json(text), {"role": "worker"})
+
+    def test_first_of_two_objects(self):
+        text = '{"role": "worker"} and also {"role": "aggregator"}'
+        self.assertEqual(self.annotator._extract_json(text)["role"], "worker")
+
+    def test_stray_brace_before_object(self):
+        text = 'Using {placeholder} syntax: {"role": "orchestrator"}'
+        self.assertEqual(self.annotator._extract_json(text)["role"], "orchestrator")
+
+    def test_none(self):
+        self.assertIsNone(self.annotator._extract_json(None))
+
 
 class TestAnnotationWithHistory(unittest.TestCase):
     """Test annotation generation with interaction history data."""
@@ -331,6 +512,24 @@ class TestAnnotationWithHistory(unittest.TestCase):
             if os.path.exists(tmp):
                 os.remove(tmp)
 
+    def test_skip_annotated_reannotates_stale_services(self):
+        import tempfile, os
+        from models.interaction_history import InteractionRecord
+        services = _build_services()
+        tmp = tempfile.mktemp(suffix=".json")
+        try:
+            store = InteractionHistoryStore(path=tmp)
+            annotator = ServiceAnnotator(services=services, interaction_store=store)
+            annotator.annotate_all(use_llm=False)
+            self.assertEqual(annotator.annotate_all(use_llm=False, skip_annotated=True), [])
+
+            store.record(InteractionRecord(service_id="S2", co_services=["S1"]))
+            again = annotator.annotate_all(use_llm=False, skip_annotated=True)
+            self.assertEqual([s.id for s in again], ["S2"])
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
     def test_no_history_still_works(self):
         services = _build_services()
         annotator = ServiceAnnotator(services=services)
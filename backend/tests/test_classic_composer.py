@@ -242,5 +242,32 @@ class TestClassicComposerGraphData(unittest.TestCase):
         self.assertIn("edges", result.graph_data)
 
 
+class TestClassicComposerIndexUpdates(unittest.TestCase):
+    """Index updates swap in new containers instead of mutating them."""
+
+    def test_sync_leaves_read_containers_untouched(self):
+        services = [_make_service("S1", ["a"], ["b"])]
+        composer = ClassicComposer(services)
+        service_dict = composer.service_dict
+        producers = composer._output_index["b"]
+        services.append(_make_service("S2", ["a"], ["b"]))
+        self.assertEqual(composer.index_new_services(), 1)
+        # a compose() still holding the old containers sees them unchanged
+        self.assertEqual(list(service_dict), ["S1"])
+        self.assertEqual([s.id for s in producers], ["S1"])
+        self.assertEqual([s.id for s in composer._output_index["b"]], ["S1", "S2"])
+        self.assertIn("S2", composer._service_input_sets)
+
+    def test_replace_leaves_read_containers_untouched(self):
+        old = _make_service("S1", ["a"], ["b"])
+        composer = ClassicComposer([old])
+        producers = composer._output_index["b"]
+        fresh = _make_service("S1", ["a"], ["b"])
+        composer._index.replace([fresh])
+        self.assertIs(producers[0], old)
+        self.assertIs(composer._output_index["b"][0], fresh)
+        self.assertIs(composer.service_dict["S1"], fresh)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -27,6 +27,7 @@ class TestConfig(unittest.TestCase):
     def test_ollama_defaults(self):
         self.assertEqual(config.OLLAMA_URL, "http://localhost:11434")
         self.assertEqual(config.OLLAMA_MODEL, "llama3.2:3b")
+        self.assertEqual(config.OLLAMA_NUM_PARALLEL, 4)
 
     def test_algorithm_timeout(self):
         self.assertIsInstance(config.ALGORITHM_TIMEOUT, int)
@@ -0,0 +1,114 @@
+"""
+Unit tests for generate_enriched_wsdl in helpers.py.
+"""
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from lxml import etree
+
+from helpers import generate_enriched_wsdl, iter_enriched_wsdl_zip
+from models.service import WebService
+from models.annotation import ServiceAnnotation
+
+SOCIAL = "{http://social-ws/annotations}"
+
+
+class TestGenerateEnrichedWsdl(unittest.TestCase):
+    """Tests for the lxml-based enriched WSDL builder."""
+
+    def _service(self, wsdl_content=None):
+        svc = WebService("svc<&>\"1")
+        svc.inputs = ["a&b"]
+        svc.outputs = ["c<d"]
+        svc.wsdl_content = wsdl_content
+        return svc
+
+    def test_returns_well_formed_bytes(self):
+        out = generate_enriched_wsdl(self._service())
+        self.assertIsInstance(out, bytes)
+        root = etree.fromstring(out)
+        self.assertEqual(root.get("name"), "svc<&>\"1")
+        names = [el.get("name") for el in root.iter("{*}element")]
+        self.assertEqual(names, ["a&b", "c<d"])
+        self.assertIsNotNone(root.find(SOCIAL + "QoS"))
+
+    def test_annotations_are_serialized(self):
+        svc = self._service()
+        svc.annotations = ServiceAnnotation(svc.id)
+        root = etree.fromstring(generate_enriched_wsdl(svc))
+        self.assertEqual(root.findtext(f"{SOCIAL}SocialNode/{SOCIAL}nodeId"), svc.id)
+        for tag in ("Interaction", "Context", "Policy"):
+            self.assertIsNotNone(root.find(SOCIAL + tag))
+
+    def test_associations_are_serialized(self):
+        svc = self._service()
+        svc.annotations = ServiceAnnotation(svc.id)
+        svc.annotations.social_node.add_association("peer&1", "collaboration", 0.25)
+        root = etree.fromstring(generate_enriched_wsdl(svc))
+        assoc = root.find(f"{SOCIAL}SocialNode/{SOCIAL}Associations/{SOCIAL}Association")
+        self.assertEqual(
+            [(el.tag[len(SOCIAL):], el.text) for el in assoc],
+            [("sourceNode", svc.id), ("targetNode", "peer&1"),
+             ("type", "collaboration"), ("weight", "0.250")],
+        )
+
+    def test_dict_qos_and_sections(self):
+        svc = self._service()
+        svc.qos = {"ResponseTime": 12}
+        svc.annotations = ServiceAnnotation(svc.id)
+        svc.annotations.policy = {"security_level": "high"}
+        root = etree.fromstring(generate_enriched_wsdl(svc))
+        self.assertEqual(root.findtext(f"{SOCIAL}QoS/{SOCIAL}ResponseTime"), "12.00")
+        self.assertEqual(root.findtext(f"{SOCIAL}Policy/{SOCIAL}securityLevel"), "high")
+        self.assertEqual(root.findtext(f"{SOCIAL}Policy/{SOCIAL}dataRetentionDays"), "30")
+
+    def test_replaced_qos_is_reformatted(self):
+        from models.service import QoS
+        svc = self._service()
+        first = etree.fromstring(generate_enriched_wsdl(svc))
+        self.assertEqual(first.findtext(f"{SOCIAL}QoS/{SOCIAL}Latency"), "0.00")
+        svc.qos = QoS(latency=7.5)
+        again = etree.fromstring(generate_enriched_wsdl(svc))
+        self.assertEqual(again.findtext(f"{SOCIAL}QoS/{SOCIAL}Latency"), "7.50")
+
+    def test_original_wsdl_is_kept(self):
+        original = (
+            '<?xml version="1.0"?>'
+            '<wsdl:definitions xmlns:wsdl="http://schemas.xmlsoap.org/wsdl/" name="Orig">'
+            '<wsdl:message name="opRequest"><wsdl:part name="x"/></wsdl:message>'
+            "</wsdl:definitions>"
+        )
+        root = etree.fromstring(generate_enriched_wsdl(self._service(original)))
+        self.assertEqual(root.get("name"), "Orig")
+        self.assertIsNotNone(root.find("{*}message"))
+        self.assertIsNotNone(root.find(SOCIAL + "QoS"))
+        self.assertIsNone(root.find("{*}types"))
+
+    def test_unparseable_original_falls_back(self):
+        root = etree.fromstring(generate_enriched_wsdl(self._service("<broken")))
+        self.assertEqual(etree.QName(root).localname, "definitions")
+        self.assertIsNotNone(root.find(SOCIAL + "QoS"))
+
+
+
+class TestIterEnrichedWsdlZip(unittest.TestCase):
+    """The streamed archive is a valid ZIP built one entry per chunk."""
+
+    def test_one_chunk_per_entry_plus_directory(self):
+        import io
+        import zipfile
+        services = [WebService(f"zip_svc_{i}") for i in range(3)]
+        chunks = list(iter_enriched_wsdl_zip(services))
+        self.assertEqual(len(chunks), 4)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(
+            archive.read("zip_svc_1_enriched.xml"), generate_enriched_wsdl(services[1])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,6 +12,7 @@ from helpers import (
     _extract_service_ids,
     _single_request_metrics,
     calculate_formal_metrics,
+    calculate_statistics,
 )
 
 
@@ -202,5 +203,50 @@ class TestCalculateFormalMetrics(unittest.TestCase):
         self.assertIsNone(calculate_formal_metrics([]))
 
 
+class TestCalculateStatistics(unittest.TestCase):
+    """Tests for the single-pass calculate_statistics aggregation."""
+
+    @staticmethod
+    def _res(utility, time=1.0, success=True, services=("s1",), states=None):
+        r = {"success": success, "utility_value": utility,
+             "computation_time": time, "services": list(services)}
+        if states is not None:
+            r["states_explored"] = states
+        return r
+
+    def test_empty(self):
+        stats = calculate_statistics([])
+        self.assertEqual(stats["classic"]["total_composed"], 0)
+        self.assertEqual(stats["comparison"]["ties"], 0)
+
+    def test_aggregates_and_head_to_head(self):
+        comps = [
+            {"classic": self._res(2.0, 1.0, states=10), "llm": self._res(1.0, 4.0)},
+            {"classic": self._res(4.0, 3.0, states=30, services=("a", "b")),
+             "llm": self._res(4.0, 2.0)},
+            {"classic": self._res(9.0, success=False), "llm": None},
+            {"classic": None, "llm": self._res(6.0, 3.0, services=())},
+        ]
+        stats = calculate_statistics(comps)
+        c, l, h = stats["classic"], stats["llm"], stats["comparison"]
+
+        self.assertEqual(c["total_composed"], 2)
+        self.assertAlmostEqual(c["success_rate"], 50.0)
+        self.assertAlmostEqual(c["avg_utility"], 3.0)
+        self.assertEqual((c["max_utility"], c["min_utility"]), (4.0, 2.0))
+        self.assertAlmostEqual(c["avg_time"], 2.0)
+        self.assertAlmostEqual(c["avg_services_used"], 1.5)
+        self.assertAlmostEqual(c["avg_states_explored"], 20.0)
+
+        self.assertEqual(l["total_composed"], 3)
+        self.assertAlmostEqual(l["avg_utility"], 11.0 / 3)
+        self.assertEqual((l["max_utility"], l["min_utility"]), (6.0, 1.0))
+        self.assertNotIn("avg_states_explored", l)
+
+        self.assertEqual((h["classic_wins"], h["llm_wins"], h["ties"]), (1, 0, 1))
+        self.assertAlmostEqual(h["avg_utility_gap"], 11.0 / 3 - 3.0)
+        self.assertAlmostEqual(h["avg_time_ratio"], 3.0 / 2.0)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -51,6 +51,15 @@ class TestInteractionHistoryStore(unittest.TestCase):
         s = self.store.summary()
         self.assertIn("total_records", s)
 
+    def test_summary_follows_new_records(self):
+        self.assertEqual(self.store.summary()["unique_services"], 0)
+        self.store.record_composition("c1", ["s1", "s2"], True, 0.9)
+        s = self.store.summary()
+        self.assertEqual((s["total_records"], s["unique_services"], s["unique_compositions"]), (2, 2, 1))
+        self.assertTrue(s["has_history"])
+        self.store.clear()
+        self.assertEqual(self.store.summary()["total_records"], 0)
+
     def test_success_rate_no_records(self):
         rate = self.store.get_success_rate("nonexistent")
         self.assertEqual(rate, 0.0)
@@ -70,6 +79,15 @@ class TestInteractionHistoryStore(unittest.TestCase):
         store2 = InteractionHistoryStore(path=self.tmp.name)
         self.assertEqual(store2.get_interaction_count("s1"), 1)
 
+    def test_persistence_after_clear(self):
+        self.store.record(InteractionRecord(service_id="s1"))
+        self.store.record(InteractionRecord(service_id="s2"))
+        self.store.clear()
+        self.store.record(InteractionRecord(service_id="s3"))
+        store2 = InteractionHistoryStore(path=self.tmp.name)
+        self.assertEqual(store2.total_records, 1)
+        self.assertEqual(store2.get_interaction_count("s3"), 1)
+
     def test_collaboration_counts(self):
         self.store.record(InteractionRecord(
             service_id="s1", co_services=["s2", "s3"]
@@ -0,0 +1,84 @@
+"""
+Unit tests for the orjson-backed Flask JSON provider (json_provider.py).
+"""
+
+import datetime
+import json
+import unittest
+
+from flask import Flask, jsonify
+
+from json_provider import OrjsonProvider
+
+
+class TestOrjsonProvider(unittest.TestCase):
+    """jsonify output must decode to the same data as Flask's default provider."""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.json = OrjsonProvider(self.app)
+
+    def _body(self, *args, **kwargs):
+        with self.app.app_context():
+            resp = jsonify(*args, **kwargs)
+        self.assertEqual(resp.mimetype, "application/json")
+        return json.loads(resp.get_data())
+
+    def test_matches_stdlib_payload(self):
+        payload = {"services": [{"id": "s1", "qos": {"a": 1.5}}], "total": 1, "ok": None}
+        self.assertEqual(self._body(payload), payload)
+
+    def test_kwargs_and_lists(self):
+        self.assertEqual(self._body(a=1, b=[1, 2]), {"a": 1, "b": [1, 2]})
+        self.assertEqual(self._body([1, "x"]), [1, "x"])
+
+    def test_dates_keep_http_format(self):
+        body = self._body({"d": datetime.datetime(2020, 1, 1)})
+        self.assertEqual(body["d"], "Wed, 01 Jan 2020 00:00:00 GMT")
+
+    def test_model_objects_use_to_dict(self):
+        from models.service import WebService
+        ws = WebService("svc1")
+        self.assertEqual(self._body({"services": [ws]}), {"services": [ws.to_dict()]})
+        with self.app.app_context():
+            self.assertEqual(json.loads(self.app.json.dumps(ws, indent=1)), ws.to_dict())
+
+    def test_non_str_keys(self):
+        self.assertEqual(self._body({1: "a"}), {"1": "a"})
+
+    def test_falls_back_for_unsupported_values(self):
+        self.assertEqual(self._body({"big": 2 ** 70}), {"big": 2 ** 70})
+
+    def test_non_finite_floats_become_null(self):
+        body = self._body({"nan": float("nan"), "inf": float("inf"), "x": 1.5})
+        self.assertEqual(body, {"nan": None, "inf": None, "x": 1.5})
+
+    def test_dumps(self):
+        with self.app.app_context():
+            self.assertEqual(json.loads(self.app.json.dumps({"a": [1]})), {"a": [1]})
+
+    def test_loads_matches_stdlib(self):
+        for raw in ('{"a": [1, 2.5, "\\u00e9", null]}', b'[true]', "NaN", str(2 ** 70)):
+            parsed = self.app.json.loads(raw)
+            expected = json.loads(raw)
+            if parsed != parsed:  # NaN
+                self.assertNotEqual(expected, expected)
+            else:
+                self.assertEqual(parsed, expected)
+
+    def test_invalid_request_body_is_bad_request(self):
+        from flask import request
+
+        @self.app.post("/echo")
+        def echo():
+            return jsonify(request.json)
+
+        client = self.app.test_client()
+        ok = client.post("/echo", data='{"x": 1}', content_type="application/json")
+        self.assertEqual(ok.get_json(), {"x": 1})
+        bad = client.post("/echo", data="{oops", content_type="application/json")
+        self.assertEqual(bad.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
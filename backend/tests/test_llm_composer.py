@@ -341,6 +341,35 @@ class TestTraining(unittest.TestCase):
         if "S1" in before_dict and "S1" in after_dict:
             self.assertGreater(after_dict["S1"], before_dict["S1"])
 
+    def test_new_services_indexed_and_patterns_refreshed(self):
+        examples = self._make_examples()
+        examples[1]["best_solution"]["service_ids"] = ["S9"]
+        self.composer.train(examples)
+        self.assertNotIn("service_ios", self.composer.knowledge_base["patterns"][1])
+
+        s9 = _svc("S9", ["a"], ["c"])
+        self.services.append(s9)
+        self.assertEqual(self.composer.index_new_services(), 1)
+        self.assertIs(self.composer.service_dict["S9"], s9)
+        self.assertIn(s9, self.composer._input_index["a"])
+        ios = self.composer.knowledge_base["patterns"][1]["service_ios"]
+        self.assertEqual(ios, [{"id": "S9", "inputs": ["a"], "outputs": ["c"]}])
+        self.assertEqual(self.composer.index_new_services(), 0)
+
+    def test_learned_rankings_survive_new_services(self):
+        self.composer.train(self._make_examples())
+        self.composer.learn_from_composition({
+            "success": True, "utility": 0.9,
+            "result": {"workflow": ["S4"]},
+        })
+        learned = dict(self.composer.knowledge_base["service_rankings"]["S4"])
+
+        self.services.append(_svc("S9", ["a"], ["c"]))
+        self.assertEqual(self.composer.index_new_services(), 1)
+        self.assertEqual(
+            self.composer.knowledge_base["service_rankings"]["S4"], learned
+        )
+
 
 # ── Prompt Building ──────────────────────────────────────────────
 
@@ -420,6 +449,48 @@ class TestComposeEndToEnd(unittest.TestCase):
         self.assertGreaterEqual(result.computation_time, 0)
 
 
+class TestConcurrentModelSelection(unittest.TestCase):
+    """compose() may run on several threads (batch) with one local model."""
+
+    def test_trained_model_never_called_concurrently(self):
+        import threading
+        import time
+
+        class _Trainer:
+            active = peak = 0
+
+            def generate(self, instruction):
+                _Trainer.active += 1
+                _Trainer.peak = max(_Trainer.peak, _Trainer.active)
+                time.sleep(0.01)
+                _Trainer.active -= 1
+                if _Trainer.active:  # a shared tokenizer would raise here
+                    raise RuntimeError("Already borrowed")
+                return '{"selected": ["D2"]}'
+
+        class _Builder:
+            def _format_instruction(self, request, services):
+                return "instruction"
+
+        services = [_svc("D1", ["a"], ["d"]), _svc("D2", ["a"], ["d"])]
+        composer = LLMComposer(services, ollama_url="http://nonexistent:11434")
+        composer.sft_trainer, composer.sft_dataset_builder = _Trainer(), _Builder()
+        composer._sft_trained, composer._rl_trained = True, False
+
+        picks = []
+        threads = [
+            threading.Thread(target=lambda: picks.append(
+                composer.compose(_req("R", ["a"], "d")).workflow))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(picks, [["D2"]] * 4)
+        self.assertEqual(_Trainer.peak, 1)
+
+
 # ── Continuous Learning ──────────────────────────────────────────
 
 class TestContinuousLearning(unittest.TestCase):
@@ -58,6 +58,13 @@ class TestQoS(unittest.TestCase):
         self.assertEqual(d["Availability"], 99.0)
         self.assertEqual(len(d), 9)
 
+    def test_to_xml_items_matches_to_dict(self):
+        qos = QoS(response_time=10, availability=99, documentation=3)
+        self.assertEqual(qos.to_xml_items(), tuple(qos.to_dict().items()))
+
+    def test_slots(self):
+        self.assertFalse(hasattr(QoS(), "__dict__"))
+
     def test_meets_constraints_all_pass(self):
         achieved = QoS(
             response_time=100, availability=95, throughput=500,
@@ -123,6 +130,43 @@ class TestWebService(unittest.TestCase):
         self.assertEqual(d["outputs"], ["b"])
         self.assertIsNone(d["annotations"])
 
+    def test_annotations_dict_cached_per_annotation_object(self):
+        from models.annotation import ServiceAnnotation
+        ws = WebService("svc6")
+        ws.annotations = ServiceAnnotation("svc6")
+        first = ws.to_dict()["annotations"]
+        self.assertIs(ws.to_dict()["annotations"], first)
+
+        ws.annotations = ServiceAnnotation("svc6")
+        ws.annotations.social_node.state = "inactive"
+        second = ws.to_dict()["annotations"]
+        self.assertIsNot(second, first)
+        self.assertEqual(second, ws.annotations.to_dict())
+
+        ws.annotations = None
+        self.assertIsNone(ws.to_dict()["annotations"])
+
+    def test_qos_dict_cached_per_qos_object(self):
+        ws = WebService("svc7")
+        first = ws.to_dict()["qos"]
+        self.assertIs(ws.to_dict()["qos"], first)
+        ws.qos = QoS(latency=5)
+        self.assertEqual(ws.to_dict()["qos"]["Latency"], 5.0)
+
+    def test_service_json_reencoded_only_on_new_objects(self):
+        import json
+        from helpers import service_json
+        from models.annotation import ServiceAnnotation
+        ws = WebService("svc8")
+        first = service_json(ws)
+        self.assertIs(service_json(ws), first)
+        self.assertEqual(json.loads(first), ws.to_dict())
+
+        ws.annotations = ServiceAnnotation("svc8")
+        second = service_json(ws)
+        self.assertIsNot(second, first)
+        self.assertEqual(json.loads(second), ws.to_dict())
+
 
 class TestCompositionRequest(unittest.TestCase):
     """Tests for the CompositionRequest model."""
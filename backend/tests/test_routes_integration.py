@@ -13,7 +13,13 @@ Uses the Flask test client with the real app (no mocking).
 """
 
 import unittest
+from types import SimpleNamespace
+
 from app import app
+from state import (
+    app_state, bump_services_version, bump_results_version, index_by_id,
+    get_classic_composer, get_llm_composer, get_parser, reset_composers,
+)
 
 
 class TestPOSTEndpoints(unittest.TestCase):
@@ -54,6 +60,38 @@ class TestPOSTEndpoints(unittest.TestCase):
         resp = self.client.post("/api/compose/llm", json={})
         self.assertEqual(resp.status_code, 400)
 
+    def test_compose_batch_runs_both_legs(self):
+        from models.annotation import ServiceAnnotation
+        from models.service import WebService, CompositionRequest
+        svc = WebService("batch_svc")
+        svc.inputs, svc.outputs = ["batch_in"], ["batch_out"]
+        svc.annotations = ServiceAnnotation(svc.id)
+        req = CompositionRequest("batch_req")
+        req.provided, req.resultant = ["batch_in"], "batch_out"
+        app_state["services"].append(svc)
+        app_state["services_by_id"][svc.id] = svc
+        app_state["requests_by_id"][req.id] = req
+        try:
+            bump_services_version()
+            resp = self.client.post(
+                "/api/compose/batch", json={"request_ids": ["batch_req", "missing"]}
+            )
+            self.assertEqual(resp.status_code, 200)
+            data = resp.get_json()
+            self.assertEqual(list(data["results"]), ["batch_req"])
+            entry = data["results"]["batch_req"]
+            self.assertTrue(entry["classic"]["success"])
+            self.assertTrue(entry["llm"]["success"])
+            self.assertEqual(entry["llm"]["services"], ["batch_svc"])
+        finally:
+            app_state["services"].remove(svc)
+            del app_state["services_by_id"][svc.id]
+            del app_state["requests_by_id"][req.id]
+            app_state["results_classic"].pop(req.id, None)
+            app_state["results_llm"].pop(req.id, None)
+            reset_composers()
+            bump_services_version()
+
     def test_compose_compare_requires_request_id(self):
         resp = self.client.post("/api/compose/compare", json={})
         self.assertEqual(resp.status_code, 400)
@@ -120,6 +158,172 @@ class TestPOSTEndpoints(unittest.TestCase):
         resp = self.client.get("/api/services")
         self.assertEqual(resp.status_code, 200)
 
+    def test_services_list_cached_until_version_bump(self):
+        self.client.get("/api/services")
+        key = (app_state["services_version"], app_state["annotations_version"])
+        self.assertEqual(app_state["services_payload"][0], key)
+
+        app_state["services_payload"] = (key, b'{"services":[],"total":-1}')
+        self.assertEqual(self.client.get("/api/services").get_json()["total"], -1)
+
+        bump_services_version()
+        data = self.client.get("/api/services").get_json()
+        self.assertEqual(data["total"], len(app_state["services"]))
+
+    def test_annotation_status_cached_until_version_bump(self):
+        from models.service import WebService
+        before = self.client.get("/api/annotation/status").get_json()
+        svc = WebService("status_cache_svc")
+        app_state["services"].append(svc)
+        try:
+            self.assertEqual(
+                self.client.get("/api/annotation/status").get_json(), before
+            )
+            bump_services_version()
+            data = self.client.get("/api/annotation/status").get_json()
+            self.assertEqual(data["total_services"], before["total_services"] + 1)
+        finally:
+            app_state["services"].remove(svc)
+            bump_services_version()
+
+    def test_has_annotated_services_without_fresh_status(self):
+        from models.service import WebService
+        from state import has_annotated_services
+        svc = WebService("presence_svc")
+        svc.annotations = {}
+        app_state["services"].append(svc)
+        try:
+            bump_services_version()
+            self.assertTrue(has_annotated_services())
+        finally:
+            app_state["services"].remove(svc)
+            bump_services_version()
+
+    def test_subset_annotation_status_matches_full_count(self):
+        from models.service import WebService
+        from state import compute_annotation_status
+        svc = WebService("subset_status_svc")
+        svc.inputs, svc.outputs = ["subset_in"], ["subset_out"]
+        app_state["services"].append(svc)
+        app_state["services_by_id"][svc.id] = svc
+        saved_annotator = app_state["annotator"]
+        app_state["annotator"] = None
+        try:
+            bump_services_version()
+            before = compute_annotation_status()["annotation_count"]
+            resp = self.client.post(
+                "/api/annotate/start", json={"service_ids": [svc.id]}
+            )
+            self.assertEqual(resp.status_code, 202)
+            app_state["annotation_thread"].join(timeout=30)
+            status = app_state["annotation_status"]
+            self.assertEqual(status["annotation_count"], before + 1)
+            app_state["annotation_status_cache"] = None
+            self.assertEqual(compute_annotation_status(), status)
+
+            result = self.client.get("/api/annotate/progress").get_json()["result"]
+            self.assertEqual(result["services"], [
+                {"id": svc.id, "inputs": 1, "outputs": 1, "annotated": True},
+            ])
+        finally:
+            app_state["services"].remove(svc)
+            del app_state["services_by_id"][svc.id]
+            app_state["annotator"] = saved_annotator
+            bump_services_version()
+
+    def test_estimate_catalog_totals_follow_appends_and_removals(self):
+        from models.service import WebService
+        from routes.annotation import _catalog_io_totals
+        services = app_state["services"]
+        base = (len(services),
+                sum(len(s.inputs) for s in services),
+                sum(len(s.outputs) for s in services))
+        self.assertEqual(_catalog_io_totals(), base)
+        first, second = WebService("totals_a"), WebService("totals_b")
+        first.inputs, second.outputs = ["x", "y"], ["z"]
+        services.append(first)
+        try:
+            self.assertEqual(_catalog_io_totals(), (base[0] + 1, base[1] + 2, base[2]))
+            services.remove(first)
+            services.append(second)
+            self.assertEqual(_catalog_io_totals(), (base[0] + 1, base[1], base[2] + 1))
+        finally:
+            for s in (first, second):
+                if s in services:
+                    services.remove(s)
+        self.assertEqual(_catalog_io_totals(), base)
+
+    def test_estimate_io_profile_cached_until_version_bump(self):
+        from models.service import WebService
+        svc = WebService("estimate_svc")
+        svc.inputs, svc.outputs = ["a", "b", "c"], ["d"]
+        app_state["services"].append(svc)
+        app_state["services_by_id"][svc.id] = svc
+        try:
+            bump_services_version()
+            body = {"service_ids": ["estimate_svc", "missing"]}
+            data = self.client.post("/api/annotate/estimate", json=body).get_json()
+            self.assertEqual(data["avg_inputs"], 3.0)
+            self.assertEqual(data["avg_outputs"], 1.0)
+
+            svc.inputs = ["a"]  # not visible until the version moves on
+            data = self.client.post("/api/annotate/estimate", json=body).get_json()
+            self.assertEqual(data["avg_inputs"], 3.0)
+            bump_services_version()
+            data = self.client.post("/api/annotate/estimate", json=body).get_json()
+            self.assertEqual(data["avg_inputs"], 1.0)
+        finally:
+            app_state["services"].remove(svc)
+            del app_state["services_by_id"][svc.id]
+            bump_services_version()
+
+    def test_download_all_selected_ids(self):
+        import io
+        import zipfile
+        from models.service import WebService
+        added = [WebService(f"dl_svc_{i}") for i in range(3)]
+        app_state["services"].extend(added)
+        app_state["services_by_id"].update((s.id, s) for s in added)
+        try:
+            resp = self.client.get(
+                "/api/services/download-all?annotated_only=false&ids=dl_svc_2,missing,dl_svc_0"
+            )
+            self.assertEqual(resp.status_code, 200)
+            names = zipfile.ZipFile(io.BytesIO(resp.data)).namelist()
+            self.assertEqual(names, ["dl_svc_2_enriched.xml", "dl_svc_0_enriched.xml"])
+        finally:
+            for s in added:
+                app_state["services"].remove(s)
+                del app_state["services_by_id"][s.id]
+
+    def test_upload_services_defers_annotator(self):
+        import io
+        wsdl = b"""<definitions xmlns="http://schemas.xmlsoap.org/wsdl/">
+  <message name="lazyRequest"><part name="lazy_in"/></message>
+  <message name="lazyResponse"><part name="lazy_out"/></message>
+</definitions>"""
+        saved = (list(app_state["services"]), dict(app_state["services_by_id"]),
+                 app_state["annotator"], app_state["annotation_status"])
+        app_state["annotator"] = object()  # stands in for one built earlier
+        try:
+            resp = self.client.post(
+                "/api/services/upload",
+                data={"files": (io.BytesIO(wsdl), "servicep9a9.wsdl")},
+                content_type="multipart/form-data",
+            )
+            self.assertEqual(resp.status_code, 200)
+            self.assertIsNone(app_state["annotator"])
+        finally:
+            app_state["services"][:] = saved[0]
+            app_state["services_by_id"] = saved[1]
+            app_state["annotator"], app_state["annotation_status"] = saved[2:]
+            reset_composers()
+            bump_services_version()
+
+    def test_unknown_service_returns_404(self):
+        resp = self.client.get("/api/services/nonexistent_svc_999")
+        self.assertEqual(resp.status_code, 404)
+
     def test_requests_list(self):
         resp = self.client.get("/api/requests")
         self.assertEqual(resp.status_code, 200)
@@ -144,10 +348,225 @@ class TestPOSTEndpoints(unittest.TestCase):
         resp = self.client.get("/api/comparison")
         self.assertEqual(resp.status_code, 200)
 
+    def test_comparison_not_modified_until_results_change(self):
+        etag = self.client.get("/api/comparison").headers["ETag"]
+        resp = self.client.get("/api/comparison", headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.headers["ETag"], etag)
+
+        bump_results_version()
+        resp = self.client.get("/api/comparison", headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp.headers["ETag"], etag)
+
+    def test_comparison_body_cached_per_etag(self):
+        etag = self.client.get("/api/comparison").get_etag()[0]
+        self.assertEqual(app_state["comparison_payload"][0], etag)
+
+        app_state["comparison_payload"] = (etag, b'{"total_requests":-1}')
+        self.assertEqual(self.client.get("/api/comparison").get_json()["total_requests"], -1)
+
+        bump_results_version()
+        data = self.client.get("/api/comparison").get_json()
+        self.assertEqual(data["total_requests"], len(app_state["requests"]))
+
+    def test_comparison_serialises_each_result_once(self):
+        from unittest import mock
+        from models.service import CompositionResult
+        saved_ids = app_state["request_ids"]
+        result = CompositionResult()
+        app_state["request_ids"] = ["memo_req"]
+        app_state["results_classic"]["memo_req"] = result
+        try:
+            with mock.patch.object(result, "to_dict", wraps=result.to_dict) as to_dict:
+                for _ in range(2):
+                    bump_results_version()
+                    data = self.client.get("/api/comparison").get_json()
+                    self.assertFalse(data["comparisons"][0]["classic"]["success"])
+            self.assertEqual(to_dict.call_count, 1)
+        finally:
+            app_state["request_ids"] = saved_ids
+            app_state["results_classic"].pop("memo_req", None)
+            bump_results_version()
+
+    def test_comparison_follows_uploaded_request_order(self):
+        import io
+        xml = b"""<Requests>
+  <Request id="r2"><Provided>a</Provided><Resultant>b</Resultant></Request>
+  <Request id="r1"><Provided>b</Provided><Resultant>c</Resultant></Request>
+</Requests>"""
+        saved = {k: app_state[k] for k in ("requests", "requests_by_id", "request_ids")}
+        self.client.get("/api/requests")  # prime the cached payload
+        try:
+            resp = self.client.post(
+                "/api/requests/upload",
+                data={"file": (io.BytesIO(xml), "requests.xml")},
+                content_type="multipart/form-data",
+            )
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(app_state["request_ids"], ["r2", "r1"])
+            self.assertEqual(
+                [r["id"] for r in self.client.get("/api/requests").get_json()["requests"]],
+                ["r2", "r1"],
+            )
+            data = self.client.get("/api/comparison").get_json()
+            self.assertEqual(
+                [c["request_id"] for c in data["comparisons"]], ["r2", "r1"]
+            )
+        finally:
+            app_state.update(saved)
+
     def test_nonexistent_endpoint(self):
         resp = self.client.get("/api/does-not-exist")
         self.assertEqual(resp.status_code, 404)
 
 
+class TestLazyComposers(unittest.TestCase):
+    """Composers are built once and synced on first use after a bump."""
+
+    def test_appended_services_indexed_in_place(self):
+        from models.service import WebService
+        first = get_classic_composer()
+        svc = WebService("lazy_composer_svc")
+        svc.inputs, svc.outputs = ["lazy_in"], ["lazy_out"]
+        app_state["services"].append(svc)
+        try:
+            # not visible until the version moves on
+            self.assertNotIn(svc.id, get_classic_composer().service_dict)
+            bump_services_version()
+            synced = get_classic_composer()
+            self.assertIs(synced, first)
+            self.assertIs(synced.service_dict[svc.id], svc)
+            self.assertIn(svc, synced._output_index["lazy_out"])
+        finally:
+            app_state["services"].remove(svc)
+            reset_composers()
+            bump_services_version()
+
+    def test_composers_share_one_index(self):
+        from models.service import WebService
+        reset_composers()
+        classic = get_classic_composer()
+        svc = WebService("shared_index_svc")
+        svc.inputs, svc.outputs = ["shared_in"], ["shared_out"]
+        app_state["services"].append(svc)
+        try:
+            bump_services_version()
+            # built after the append: the shared index must catch up first
+            llm = get_llm_composer()
+            self.assertIs(llm.service_dict, classic.service_dict)
+            self.assertIs(llm.service_dict[svc.id], svc)
+            self.assertIn(svc, get_classic_composer()._output_index["shared_out"])
+        finally:
+            app_state["services"].remove(svc)
+            reset_composers()
+            bump_services_version()
+
+    def test_replaced_services_patched_in_shared_index(self):
+        from models.service import WebService
+        from state import replace_services
+        svc = WebService("replaced_svc")
+        svc.inputs, svc.outputs = ["replaced_in"], ["replaced_out"]
+        app_state["services"].append(svc)
+        try:
+            bump_services_version()
+            classic = get_classic_composer()
+            fresh = WebService(svc.id)
+            fresh.inputs, fresh.outputs = list(svc.inputs), list(svc.outputs)
+            app_state["services"][-1] = fresh
+            replace_services([fresh])
+            bump_services_version()
+            self.assertIs(get_classic_composer(), classic)
+            self.assertIs(classic.service_dict[svc.id], fresh)
+            self.assertEqual(classic._output_index["replaced_out"], [fresh])
+            self.assertEqual(classic._input_index["replaced_in"], [fresh])
+        finally:
+            app_state["services"].pop()
+            reset_composers()
+            bump_services_version()
+
+    def test_trained_composer_sees_replaced_services(self):
+        from models.service import WebService
+        from state import replace_services
+        svc = WebService("trained_replaced_svc")
+        svc.inputs, svc.outputs = ["trained_in"], ["trained_out"]
+        app_state["services"].append(svc)
+        training = app_state["training_data"]
+        learning = app_state["learning_state"]
+        saved_learning = dict(learning)
+        training["services"].append(svc)
+        try:
+            bump_services_version()
+            classic = get_classic_composer()
+            resp = app.test_client().post("/api/training/start", json={})
+            self.assertEqual(resp.status_code, 200)
+            llm = get_llm_composer()
+            self.assertIs(llm._index, classic._index)
+            fresh = WebService(svc.id)
+            fresh.inputs, fresh.outputs = list(svc.inputs), list(svc.outputs)
+            app_state["services"][-1] = fresh
+            replace_services([fresh])
+            bump_services_version()
+            self.assertIs(get_llm_composer(), llm)
+            self.assertIs(llm.service_dict[svc.id], fresh)
+            self.assertEqual(llm._output_index["trained_out"], [fresh])
+        finally:
+            training["services"].remove(svc)
+            learning.clear()
+            learning.update(saved_learning)
+            app_state["services"].pop()
+            reset_composers()
+            bump_services_version()
+
+    def test_reset_forces_rebuild(self):
+        first = get_classic_composer()
+        reset_composers()
+        self.assertIsNot(get_classic_composer(), first)
+
+
+class TestGetParser(unittest.TestCase):
+    """The WSDL parser is built on first use and then shared."""
+
+    def test_built_once(self):
+        from config import WSDL_CACHE_DIR
+        saved = app_state["parser"]
+        app_state["parser"] = None
+        try:
+            parser = get_parser()
+            self.assertEqual(parser.cache_dir, WSDL_CACHE_DIR)
+            self.assertIs(get_parser(), parser)
+        finally:
+            app_state["parser"] = saved
+
+
+class TestResultDict(unittest.TestCase):
+    """Stored results are serialised once and then reused."""
+
+    def test_memoised_on_result(self):
+        from models.service import CompositionResult
+        from routes.composition import _result_dict
+        result = CompositionResult()
+        self.assertIsNone(result._dict_cache)
+        first = _result_dict(result)
+        self.assertEqual(first, result.to_dict())
+        self.assertIs(_result_dict(result), first)
+
+    def test_plain_dict_passed_through(self):
+        from routes.composition import _result_dict
+        stored = {"success": True}
+        self.assertIs(_result_dict(stored), stored)
+        self.assertIsNone(_result_dict(None))
+
+
+class TestIndexById(unittest.TestCase):
+    """The id index must resolve duplicates like the linear scan it replaces."""
+
+    def test_first_item_wins(self):
+        a, b, c = (SimpleNamespace(id=i) for i in ("x", "y", "x"))
+        index = index_by_id([a, b, c])
+        self.assertIs(index["x"], a)
+        self.assertIs(index["y"], b)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -8,7 +8,7 @@ import tempfile
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from services.wsdl_parser import WSDLParser, parse_requests_xml
+from services.wsdl_parser import WSDLParser, parse_requests_xml, parse_best_solutions_xml
 
 
 SAMPLE_WSDL = """<?xml version="1.0" encoding="UTF-8"?>
@@ -76,11 +76,95 @@ class TestWSDLParser(unittest.TestCase):
         self.assertIsNotNone(service)
         self.assertGreater(len(service.inputs), 0)
 
+    def test_parse_file_cached_until_modified(self):
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".wsdl", delete=False, encoding="utf-8"
+        ) as f:
+            f.write(SAMPLE_WSDL)
+        try:
+            first = self.parser.parse_file(f.name)
+            first.inputs.append("mutated")
+            second = self.parser.parse_file(f.name)
+            self.assertIsNot(first, second)
+            self.assertNotIn("mutated", second.inputs)
+
+            with open(f.name, "w", encoding="utf-8") as fh:
+                fh.write(SAMPLE_WSDL.replace("paramA", "paramZ"))
+            st = os.stat(f.name)
+            os.utime(f.name, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+            third = self.parser.parse_file(f.name)
+            self.assertIn("paramZ", third.inputs)
+        finally:
+            os.unlink(f.name)
+
+    def test_parse_file_cache_bounded_lru(self):
+        from unittest import mock
+        import services.wsdl_parser as wp
+        with tempfile.TemporaryDirectory() as d:
+            paths = []
+            for name in ("a", "b", "c"):
+                path = os.path.join(d, f"{name}.wsdl")
+                with open(path, "w", encoding="utf-8") as fh:
+                    fh.write(SAMPLE_WSDL)
+                paths.append(path)
+            with mock.patch.object(wp, "FILE_CACHE_SIZE", 2):
+                self.parser.parse_file(paths[0])
+                self.parser.parse_file(paths[1])
+                self.parser.parse_file(paths[0])  # a is now most recent
+                self.parser.parse_file(paths[2])
+            self.assertEqual(list(self.parser._file_cache), [paths[0], paths[2]])
+
+    def test_parse_directory_sorted_and_filtered(self):
+        with tempfile.TemporaryDirectory() as d:
+            for name in ("servicep2a2.wsdl", "servicep1a1.xml", "notes.txt"):
+                with open(os.path.join(d, name), "w", encoding="utf-8") as fh:
+                    fh.write(SAMPLE_WSDL)
+            os.mkdir(os.path.join(d, "nested.wsdl"))
+            services = self.parser.parse_directory(d)
+        self.assertEqual([s.id for s in services], ["p1a1", "p2a2"])
+
+    def test_nested_qos_and_later_sections(self):
+        # Sections are dropped from the tree as they end; data read from
+        # nested and trailing elements must survive that
+        wsdl = SAMPLE_WSDL.replace("<QoS>", "<service name=\"S\"><QoS>").replace(
+            "</QoS>", "</QoS></service><portType name=\"PT\"/>"
+        )
+        service = self.parser.parse_content(wsdl, "test.wsdl")
+        self.assertEqual(service.inputs, ["paramA"])
+        self.assertEqual(service.outputs, ["paramB"])
+        self.assertAlmostEqual(service.qos.latency, 30.0)
+
+    def test_qos_from_comment(self):
+        base = '<definitions xmlns="http://schemas.xmlsoap.org/wsdl/">%s</definitions>'
+        plain = self.parser.parse_content(
+            base % "<!-- QoS: {'ResponseTime': 82, \"Latency\": 7.5e1,} -->", "a.wsdl"
+        )
+        self.assertEqual(plain.qos.response_time, 82.0)
+        self.assertEqual(plain.qos.latency, 75.0)
+        # not a plain name -> number dict: literal_eval still reads it
+        literal = self.parser.parse_content(
+            base % "<!-- QoS: {'ResponseTime': '82'} -->", "b.wsdl"
+        )
+        self.assertEqual(literal.qos.response_time, 82.0)
+
     def test_parse_invalid_returns_none(self):
         service = self.parser.parse_content("<invalid>xml", "bad.wsdl")
         self.assertIsNone(service)
 
 
+class TestTagKind(unittest.TestCase):
+    """Tag classification used by the single-pass scan."""
+
+    def test_namespaced_and_prefixed_tags(self):
+        from services import wsdl_parser as wp
+        wsdl = "{http://schemas.xmlsoap.org/wsdl/}"
+        self.assertEqual(wp._tag_kind(wsdl + "message"), wp._MESSAGE)
+        self.assertEqual(wp._tag_kind(wsdl + "part"), wp._PART)
+        self.assertEqual(wp._tag_kind("QoS"), wp._QOS)
+        self.assertEqual(wp._tag_kind("{urn:x}socialQoS"), wp._QOS)
+        self.assertEqual(wp._tag_kind(wsdl + "portType"), wp._OTHER)
+
+
 class TestParseRequestsXml(unittest.TestCase):
     """Tests for parse_requests_xml."""
 
@@ -143,6 +227,205 @@ class TestParseRequestsXml(unittest.TestCase):
         os.unlink(f.name)
         self.assertEqual(len(reqs), 0)
 
+    def test_file_object(self):
+        import io
+        xml_content = b"""<?xml version="1.0"?>
+<Requests>
+  <Request id="req1">
+    <Provided>p1;p2</Provided>
+    <Resultant>out1</Resultant>
+  </Request>
+</Requests>"""
+        reqs = parse_requests_xml(io.BytesIO(xml_content))
+        self.assertEqual([r.id for r in reqs], ["req1"])
+        self.assertEqual(reqs[0].provided, ["p1", "p2"])
+
+    def test_discovery_routines_take_precedence(self):
+        import io
+        xml_content = b"""<WSChallenge>
+  <CompositionRoutine name="cr1"><Provided>a</Provided><Resultant>c</Resultant></CompositionRoutine>
+  <group><DiscoveryRoutine name="dr1"><Provided>a</Provided><Resultant>b</Resultant></DiscoveryRoutine></group>
+</WSChallenge>"""
+        reqs = parse_requests_xml(io.BytesIO(xml_content))
+        self.assertEqual([r.id for r in reqs], ["dr1"])
+
+    def test_wschallenge_short_qos_padded_with_zeros(self):
+        import io
+        xml_content = b"""<WSChallenge>
+  <CompositionRoutine name="cr1">
+    <Provided>a</Provided><Resultant>c</Resultant><QoS>100, 90</QoS>
+  </CompositionRoutine>
+</WSChallenge>"""
+        qos = parse_requests_xml(io.BytesIO(xml_content))[0].qos_constraints
+        self.assertEqual(qos.response_time, 100.0)
+        self.assertEqual(qos.availability, 90.0)
+        self.assertEqual(qos.documentation, 0.0)
+
+
+class TestParseBestSolutionsXml(unittest.TestCase):
+    """parse_best_solutions_xml accepts paths and file objects alike."""
+
+    XML = b"""<?xml version="1.0"?>
+<WSChallenge>
+  <case name="c1"><service name="s1"/><service name="s2"/><utility value="12.5"/></case>
+</WSChallenge>"""
+
+    def test_file_object_matches_path(self):
+        import io
+        with tempfile.NamedTemporaryFile(suffix=".xml", delete=False) as f:
+            f.write(self.XML)
+        try:
+            from_path = parse_best_solutions_xml(f.name)
+        finally:
+            os.unlink(f.name)
+        from_stream = parse_best_solutions_xml(io.BytesIO(self.XML))
+        self.assertEqual(from_stream, from_path)
+        self.assertEqual(from_stream["c1"]["service_ids"], ["s1", "s2"])
+        self.assertEqual(from_stream["c1"]["utility"], 12.5)
+
+    def test_declared_encoding_is_honoured(self):
+        import io
+        xml = ('<?xml version="1.0" encoding="ISO-8859-1"?>'
+               '<root><case name="r\u00e9"><service name="s1"/></case></root>')
+        solutions = parse_best_solutions_xml(io.BytesIO(xml.encode("latin-1")))
+        self.assertEqual(list(solutions), ["r\u00e9"])
+
+    def test_malformed_input_still_sanitized(self):
+        import io
+        xml = b'<root><case name="c1"><service name="a&b"/><utility value="3"/></case></root>'
+        self.assertEqual(
+            parse_best_solutions_xml(io.BytesIO(xml))["c1"]["service_ids"], ["a&b"]
+        )
+
+
+class TestParseContentBytes(unittest.TestCase):
+    """Raw upload bytes must parse exactly like the decoded text."""
+
+    UNBOUND = SAMPLE_WSDL.replace(
+        "<definitions ", "<definitions qos:version=\"1\" ", 1
+    ).replace("</definitions>", "<semExt:note>x</semExt:note></definitions>")
+
+    def setUp(self):
+        self.parser = WSDLParser()
+
+    def _assert_same(self, text, filename="servicep1a1234567.wsdl"):
+        from_str = self.parser.parse_content(text, filename)
+        from_bytes = self.parser.parse_content(text.encode("utf-8"), filename)
+        self.assertIsNotNone(from_bytes)
+        self.assertEqual(from_bytes.inputs, from_str.inputs)
+        self.assertEqual(from_bytes.outputs, from_str.outputs)
+        self.assertEqual(from_bytes.qos.to_dict(), from_str.qos.to_dict())
+        self.assertEqual(from_bytes.wsdl_content, from_str.wsdl_content)
+        return from_bytes
+
+    def test_plain(self):
+        self._assert_same(SAMPLE_WSDL)
+
+    def test_bom_and_leading_whitespace(self):
+        self._assert_same("\ufeff  \n" + SAMPLE_WSDL)
+
+    def test_unbound_prefixes(self):
+        service = self._assert_same(self.UNBOUND)
+        self.assertIn('xmlns:semExt="urn:x-auto:semExt"', service.wsdl_content)
+        self.assertIn('xmlns:qos="urn:x-auto:qos"', service.wsdl_content)
+
+    def test_invalid_utf8_returns_none(self):
+        self.assertIsNone(self.parser.parse_content(b"\xff\xfe<a/>", "x.wsdl"))
+
+
+class TestParseCache(unittest.TestCase):
+    """On-disk parse cache keyed by content hash."""
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.parser = WSDLParser(cache_dir=self._dir.name)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_hit_matches_fresh_parse(self):
+        fresh = WSDLParser().parse_content(SAMPLE_WSDL, "servicep1a1.wsdl")
+        self.parser.parse_content(SAMPLE_WSDL, "servicep1a1.wsdl")
+        self.assertEqual(len(os.listdir(self._dir.name)), 1)
+
+        # bytes and text share the entry; the id still follows the filename
+        cached = self.parser.parse_content(SAMPLE_WSDL.encode("utf-8"), "servicep2a2.wsdl")
+        self.assertEqual(len(os.listdir(self._dir.name)), 1)
+        self.assertEqual(cached.id, "p2a2")
+        self.assertEqual(cached.inputs, fresh.inputs)
+        self.assertEqual(cached.outputs, fresh.outputs)
+        self.assertEqual(cached.qos.to_dict(), fresh.qos.to_dict())
+        self.assertEqual(cached.wsdl_content, fresh.wsdl_content)
+
+    def test_entry_holds_parsed_fields_only(self):
+        import json
+        self.parser.parse_content(SAMPLE_WSDL, "a.wsdl")
+        (entry,) = os.listdir(self._dir.name)
+        with open(os.path.join(self._dir.name, entry)) as fh:
+            self.assertEqual(sorted(json.load(fh)), ["inputs", "outputs", "qos"])
+
+    def test_corrupt_entry_reparses(self):
+        self.parser.parse_content(SAMPLE_WSDL, "a.wsdl")
+        (entry,) = os.listdir(self._dir.name)
+        with open(os.path.join(self._dir.name, entry), "w") as fh:
+            fh.write("{truncated")
+        service = self.parser.parse_content(SAMPLE_WSDL, "a.wsdl")
+        self.assertIn("paramA", service.inputs)
+
+    def test_failed_parse_not_cached(self):
+        self.assertIsNone(self.parser.parse_content("<broken", "bad.wsdl"))
+        self.assertEqual(os.listdir(self._dir.name), [])
+
+
+class TestParseWsdlContents(unittest.TestCase):
+    """Batch parsing used by the services upload route."""
+
+    def _items(self, n):
+        items = [(SAMPLE_WSDL, f"servicep1a{i}.wsdl") for i in range(n)]
+        items[1] = ("<broken", "bad.wsdl")
+        return items
+
+    def _summary(self, services):
+        return [s and (s.id, s.inputs, s.outputs) for s in services]
+
+    def test_inline_matches_parse_content(self):
+        import helpers
+        parser = WSDLParser()
+        items = self._items(3)
+        expected = [parser.parse_content(c, n) for c, n in items]
+        self.assertEqual(
+            self._summary(helpers.parse_wsdl_contents(items, parser)),
+            self._summary(expected),
+        )
+
+    def test_process_pool_matches_parse_content(self):
+        from unittest import mock
+        import helpers
+        parser = WSDLParser()
+        items = self._items(helpers.PARALLEL_PARSE_MIN_FILES)
+        expected = [parser.parse_content(c, n) for c, n in items]
+        with mock.patch.object(helpers, "UPLOAD_PARSE_WORKERS", 2):
+            result = helpers.parse_wsdl_contents(items, parser)
+        self.assertEqual(self._summary(result), self._summary(expected))
+        self.assertIsNone(result[1])
+
+
+class TestParseWsdlUploads(unittest.TestCase):
+    """Training uploads parse raw bytes, falling back to Latin-1."""
+
+    def test_utf8_latin1_and_invalid(self):
+        import helpers
+        parser = WSDLParser()
+        latin1 = SAMPLE_WSDL.replace("<definitions", "<!-- caf\u00e9 --><definitions", 1)
+        items = [
+            (SAMPLE_WSDL.encode("utf-8"), "servicep1a1.wsdl"),
+            (latin1.encode("latin-1"), "servicep1a2.wsdl"),
+            (b"<broken", "bad.wsdl"),
+        ]
+        utf8, fallback, broken = helpers.parse_wsdl_uploads(items, parser)
+        self.assertEqual(utf8.inputs, parser.parse_content(SAMPLE_WSDL).inputs)
+        self.assertIn("caf\u00e9", fallback.wsdl_content)
+        self.assertIsNone(broken)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,28 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn_config.py wsgi:app
+
+gunicorn does not run on Windows; there ``python wsgi.py`` serves the same
+app with waitress (one process, WAITRESS_THREADS threads).  ``python run.py``
+remains the development runner.
+"""
+
+import os
+
+from app import app
+
+__all__ = ["app"]
+
+
+if __name__ == "__main__":
+    from waitress import serve
+    from config import FLASK_HOST, FLASK_PORT, MAX_CONTENT_LENGTH
+
+    serve(
+        app,
+        host=FLASK_HOST,
+        port=FLASK_PORT,
+        threads=int(os.environ.get("WAITRESS_THREADS", "16")),
+        max_request_body_size=MAX_CONTENT_LENGTH,
+    )
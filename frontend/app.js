@@ -431,7 +431,7 @@ async function _doUpdateEstimation() {
     const types = getAnnotationTypes();
     if (!types.length) return;
     const useLLM = document.getElementById('use-llm-annotation').checked;
-    const maxWorkers = parseInt(document.getElementById('ann-workers')?.value || '10');
+    const maxWorkers = parseInt(document.getElementById('ann-workers')?.value || '4');
     const batchSize = parseInt(document.getElementById('ann-batch-size')?.value || '5');
     try {
         const r = await fetch(`${API}/annotate/estimate`, {
@@ -529,7 +529,7 @@ async function confirmAnnotation() {
     const types = getAnnotationTypes();
     const useLLM = document.getElementById('use-llm-annotation').checked;
     const ids = Array.from(selectedServiceIds);
-    const maxWorkers = parseInt(document.getElementById('ann-workers')?.value || '10');
+    const maxWorkers = parseInt(document.getElementById('ann-workers')?.value || '4');
     const batchSize = parseInt(document.getElementById('ann-batch-size')?.value || '5');
     const skipAnnotated = document.getElementById('ann-skip-annotated')?.checked || false;
 
@@ -653,7 +653,7 @@ function showAnnotationResults(data) {
                     <label style="display:flex;align-items:center;gap:10px;cursor:pointer;flex:1;min-width:0">
                         <input type="checkbox" class="ann-svc-cb" data-id="${escapeHtml(s.id)}" onchange="onAnnotatedCheckChange()" style="width:15px;height:15px;flex-shrink:0">
                         <span class="svc-id">${escapeHtml(s.id)}</span>
-                        <span style="font-size:12px;color:var(--text-muted)">${s.inputs.length} in / ${s.outputs.length} out ${s.annotations ? '&bull; Annotated' : ''}</span>
+                        <span style="font-size:12px;color:var(--text-muted)">${s.inputs} in / ${s.outputs} out ${s.annotated ? '&bull; Annotated' : ''}</span>
                     </label>
                     <button class="btn btn-sm" onclick="downloadAnnotated('${escapeHtml(s.id)}')" style="flex-shrink:0;margin-left:8px">Download</button>
                 </div>